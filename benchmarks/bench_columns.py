@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Times converting a day of pitches to typed column arrays, value by value and with columns.coerce_column
+
+Two conversions are timed over the pitches of 15 synthetic games:
+
+    records: PitchRecords to one array per column, as bulk consumers such as the pitch store need them
+    raw strings: GameDay attribute strings, with some missing, to typed columns
+
+Usage (with pygameday installed, e.g. with `pip install -e .`):
+    python benchmarks/bench_columns.py [n_games]
+"""
+import sys
+import time
+
+import numpy as np
+
+from pygameday.columns import coerce_column
+from pygameday.columns import pitch_columns
+from pygameday.models import Pitch
+from pygameday.records import PitchRecord
+from pygameday.records import converter
+
+from synthetic import synthetic_games
+
+NUMERIC_FIELDS = [name for name in PitchRecord._fields[1:] if converter(Pitch, name).__name__ != '_identity']
+
+
+def records_by_value(parsed_games):
+    """Builds the columns with a Python loop over every pitch and field"""
+    columns = {}
+    for name in PitchRecord._fields:
+        values = [getattr(pitch, name) for parsed in parsed_games for pitch in parsed.pitches]
+        columns[name] = np.array(values, dtype=np.float64 if name in NUMERIC_FIELDS else object)
+    return columns
+
+
+def raw_by_value(raw_columns):
+    columns = {}
+    for name, values in raw_columns.items():
+        convert = converter(Pitch, name)
+        columns[name] = np.array([convert(value) for value in values], dtype=np.float64)
+    return columns
+
+
+def raw_by_column(raw_columns):
+    return {name: coerce_column(values, Pitch.__table__.columns[name].type) for name, values in raw_columns.items()}
+
+
+def best_of(function, argument, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function(argument)
+        timings.append(time.perf_counter() - start_time)
+    return min(timings)
+
+
+if __name__ == '__main__':
+    parsed_games = synthetic_games(int(sys.argv[1]) if len(sys.argv) > 1 else 15)
+    pitches = [pitch for parsed in parsed_games for pitch in parsed.pitches]
+
+    # Raw strings as they come out of inning_all.xml; every 20th value of a column is missing
+    raw_columns = {name: ['' if i % 20 == 0 or value is None else str(value)
+                          for i, value in enumerate(getattr(pitch, name) for pitch in pitches)]
+                   for name in NUMERIC_FIELDS}
+
+    print('{} pitches, {} numeric columns'.format(len(pitches), len(NUMERIC_FIELDS)))
+    print('{:<12} {:>12} {:>12} {:>9}'.format('from', 'by value', 'by column', 'speedup'))
+    for name, by_value, by_column, argument in (('records', records_by_value, pitch_columns, parsed_games),
+                                                ('raw strings', raw_by_value, raw_by_column, raw_columns)):
+        value_time, column_time = best_of(by_value, argument), best_of(by_column, argument)
+        print('{:<12} {:10.2f}ms {:10.2f}ms {:8.1f}x'.format(name, value_time * 1000, column_time * 1000,
+                                                            value_time / column_time))
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Times parsing the start times of a season of scoreboard games, with dateutil and with parse.parse_game_time
+
+A season of scoreboard entries is generated: 2430 games over 183 days, starting between noon and 10 PM, in the
+offsets the scoreboards use.
+
+Usage (with pygameday installed, e.g. with `pip install -e .`):
+    python benchmarks/bench_game_time.py [n_repeats]
+"""
+import random
+import sys
+import time
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+from dateutil import parser
+
+from pygameday.parse import parse_game_time
+
+N_GAMES = 2430
+N_DAYS = 183
+
+
+def season_times(seed=0):
+    rng = random.Random(seed)
+    first_day = datetime(2018, 3, 29)
+    times = []
+    for _ in range(N_GAMES):
+        day = first_day + timedelta(days=rng.randrange(N_DAYS))
+        hour = rng.choice([12, 1, 3, 4, 6, 7, 8, 9, 10])
+        times.append(('{:%Y/%m/%d} {}:{:02d}'.format(day, hour, rng.choice([5, 10, 35, 40])),
+                      rng.choice(['-4', '-4', '-5', '-7']), 'PM'))
+    return times
+
+
+def dateutil_game_time(date_time, offset, ampm):
+    """The start time parsing parse._game_values did before parse_game_time"""
+    start_datetime = parser.parse(date_time)
+    start_datetime = start_datetime.replace(tzinfo=timezone(timedelta(hours=int(offset))))
+    if ampm == 'PM':
+        start_datetime += timedelta(hours=12)
+    return start_datetime
+
+
+def best_of(function, times, repeat):
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        for game_time in times:
+            function(*game_time)
+        timings.append(time.perf_counter() - start_time)
+    return min(timings)
+
+
+if __name__ == '__main__':
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    times = season_times()
+
+    old = best_of(dateutil_game_time, times, repeat)
+    new = best_of(parse_game_time, times, repeat)
+    print('{} games: dateutil {:.2f} ms, parse_game_time {:.2f} ms ({:.0f}x)'.format(
+        len(times), old * 1000, new * 1000, old / new))
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Times common analytic lookups with and without the secondary indexes declared in models.py
+
+Synthetic games are loaded into a fresh SQLite database with the indexes dropped, each query is timed, then the indexes
+are built with create_indexes and the queries are timed again.
+
+Usage (with pygameday installed, e.g. with `pip install -e .`):
+    python benchmarks/bench_lookups.py [n_games] [database_uri]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import text
+
+from pygameday import writer
+from pygameday.models import create_db_tables
+from pygameday.models import create_indexes
+from pygameday.models import db_connect
+from pygameday.models import drop_indexes
+
+from synthetic import synthetic_games
+
+PITCHER_ID = 400100
+QUERIES = [
+    ('pitches by pitcher', 'SELECT p.* FROM pitches p JOIN at_bats a ON p.at_bat_id = a.at_bat_id '
+                           'WHERE a.pitcher_id = :pitcher_id'),
+    ('pitcher x pitch type', 'SELECT count(*) FROM pitches p JOIN at_bats a ON p.at_bat_id = a.at_bat_id '
+                             "WHERE a.pitcher_id = :pitcher_id AND p.pitch_type = 'SL'"),
+    ('pitcher in one game', 'SELECT * FROM at_bats WHERE pitcher_id = :pitcher_id AND game_id = :game_id'),
+    ('at bats for game', 'SELECT * FROM at_bats WHERE game_id = :game_id'),
+    ('pitches for game', 'SELECT p.* FROM pitches p JOIN at_bats a ON p.at_bat_id = a.at_bat_id '
+                         'WHERE a.game_id = :game_id'),
+    ('hits in play for game', 'SELECT * FROM hits_in_play WHERE game_id = :game_id'),
+]
+
+
+def time_queries(engine, repeat=20):
+    parameters = {'pitcher_id': PITCHER_ID, 'game_id': 7}
+    timings = {}
+    with engine.connect() as connection:
+        for name, query in QUERIES:
+            start_time = time.perf_counter()
+            for _ in range(repeat):
+                connection.execute(text(query), parameters).fetchall()
+            timings[name] = (time.perf_counter() - start_time) / repeat
+    return timings
+
+
+def run(database_uri, n_games):
+    engine = db_connect(database_uri)
+    create_db_tables(engine)
+    drop_indexes(engine)
+
+    parsed_games = synthetic_games(n_games)
+    for i in range(0, n_games, 50):
+        with engine.begin() as connection:
+            writer.upsert_players(connection, [p for parsed in parsed_games[i:i + 50] for p in parsed.players])
+            writer.insert_games(connection, parsed_games[i:i + 50])
+    print('{} games, {} pitches'.format(n_games, sum(len(p.pitches) for p in parsed_games)))
+
+    before = time_queries(engine)
+    start_time = time.perf_counter()
+    create_indexes(engine)
+    print('Built indexes in {:.2f} s'.format(time.perf_counter() - start_time))
+    after = time_queries(engine)
+    engine.dispose()
+
+    print('{:<22} {:>12} {:>12} {:>9}'.format('query', 'no index', 'indexed', 'speedup'))
+    for name, _ in QUERIES:
+        print('{:<22} {:10.2f}ms {:10.2f}ms {:8.0f}x'.format(name, before[name] * 1000, after[name] * 1000,
+                                                           before[name] / after[name]))
+
+
+if __name__ == '__main__':
+    n_games = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    if len(sys.argv) > 2:
+        run(sys.argv[2], n_games)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            run('sqlite:///' + os.path.join(tmp_dir, 'bench.db'), n_games)
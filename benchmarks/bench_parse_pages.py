@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Times parsing players.xml and inning_hit.xml into records, the way parse did before and the way it does now
+
+Pages the size of a real game's are generated: two rosters of 40 players with the attributes GameDay lists, coaches
+and umpires, and 70 hits in play. 'before' re-creates the old parsers: a default parser and an XPath expression
+interpreted on every call.
+
+Usage (with pygameday installed, e.g. with `pip install -e .`):
+    python benchmarks/bench_parse_pages.py [n_documents]
+"""
+import sys
+import time
+
+from lxml import etree
+
+from pygameday import parse
+from pygameday.records import HitInPlayRecord
+from pygameday.records import PlayerRecord
+from pygameday.records import node_values
+from pygameday.scrape import Page
+
+PLAYER_ATTRIBUTES = ('first="Max" last="Scherzer" num="31" boxname="Scherzer" rl="R" bats="R" position="P" '
+                     'current_position="P" status="A" team_abbrev="WSH" team_id="120" parent_team_abbrev="WSH" '
+                     'parent_team_id="120" bat_order="9" game_position="P" avg=".083" hr="0" rbi="1" wins="1" '
+                     'losses="0" era="1.50"')
+
+
+def players_page():
+    teams = []
+    for side, team_id in (('home', 120), ('away', 121)):
+        players = ''.join('<player id="{}" {}/>\n'.format(400000 + team_id * 100 + i, PLAYER_ATTRIBUTES)
+                          for i in range(40))
+        coaches = ''.join('<coach position="coach" first="Dave" last="Martinez" id="{}" num="4"/>\n'.format(i)
+                          for i in range(8))
+        teams.append('<team type="{}" id="{}" name="Nationals">\n{}{}</team>\n'.format(side, team_id, players, coaches))
+    umpires = ''.join('<umpire position="home" name="Joe West" id="{}" first="Joe" last="West"/>\n'.format(i)
+                      for i in range(4))
+    content = '<?xml version="1.0" encoding="UTF-8"?>\n<game venue="Nationals Park" date="April 6, 2018">\n' \
+              '{}<umpires>\n{}</umpires>\n</game>\n'.format(''.join(teams), umpires)
+    return Page('players.xml', content.encode())
+
+
+def hit_chart_page():
+    hips = ''.join('<hip des="Groundout" x="{:.2f}" y="{:.2f}" batter="{}" pitcher="453286" type="O" team="A" '
+                   'inning="{}"/>\n'.format(100 + i * 0.5, 150 - i * 0.3, 412000 + i, 1 + i % 9) for i in range(70))
+    content = '<?xml version="1.0" encoding="UTF-8"?>\n<hitchart>\n{}</hitchart>\n'.format(hips)
+    return Page('inning_hit.xml', content.encode())
+
+
+def players_before(page):
+    root = etree.fromstring(page.content)
+    return [PlayerRecord._make(node_values(p, parse.PLAYER_SPEC)) for p in root.xpath('descendant::player')]
+
+
+def hit_chart_before(page):
+    root = etree.fromstring(page.content)
+    return [HitInPlayRecord._make(node_values(h, parse.HIT_IN_PLAY_SPEC)) for h in root.xpath('descendant::hip')]
+
+
+def per_document(function, page, n_documents):
+    timings = []
+    for _ in range(5):
+        start_time = time.perf_counter()
+        for _ in range(n_documents):
+            function(page)
+        timings.append(time.perf_counter() - start_time)
+    return min(timings) / n_documents
+
+
+if __name__ == '__main__':
+    n_documents = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    cases = [
+        ('players.xml', players_page(), players_before, parse.parse_players_records),
+        ('inning_hit.xml', hit_chart_page(), hit_chart_before, parse.parse_hit_chart_records),
+    ]
+    print('{:<16} {:>8} {:>12} {:>12} {:>9}'.format('page', 'bytes', 'before', 'now', 'speedup'))
+    for name, page, before, now in cases:
+        assert before(page) == now(page)
+        before_time, now_time = per_document(before, page, n_documents), per_document(now, page, n_documents)
+        print('{:<16} {:>8} {:10.1f}us {:10.1f}us {:8.2f}x'.format(name, len(page.content), before_time * 1e6,
+                                                                  now_time * 1e6, before_time / now_time))
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Times reading pitch columns from the database against reading them from the memory-mapped pitch store
+
+Synthetic games are loaded into a fresh SQLite database and a pitch store is built from it. The float columns of
+every pitch, and the pitches of one pitcher, are then read both ways.
+
+Usage (with pygameday installed, e.g. with `pip install -e .`):
+    python benchmarks/bench_pitch_store.py [n_games]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from pygameday import reader
+from pygameday import writer
+from pygameday.models import create_db_tables
+from pygameday.models import db_connect
+from pygameday.pitch_store import PITCH_STORE_COLUMNS
+from pygameday.pitch_store import PitchStore
+from pygameday.pitch_store import build_pitch_store
+
+from synthetic import synthetic_games
+
+PITCHER_ID = 400100
+
+
+def best_of(function, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start_time)
+    return min(timings)
+
+
+def run(tmp_dir, n_games):
+    engine = db_connect('sqlite:///' + os.path.join(tmp_dir, 'bench.db'))
+    create_db_tables(engine)
+
+    parsed_games = synthetic_games(n_games)
+    for i in range(0, n_games, 50):
+        with engine.begin() as connection:
+            writer.upsert_players(connection, [p for parsed in parsed_games[i:i + 50] for p in parsed.players])
+            writer.insert_games(connection, parsed_games[i:i + 50])
+
+    start_time = time.perf_counter()
+    build_pitch_store(engine, os.path.join(tmp_dir, 'store'))
+    print('{} games, {} pitches; built the store in {:.2f} s'.format(
+        n_games, sum(len(p.pitches) for p in parsed_games), time.perf_counter() - start_time))
+
+    store = PitchStore(os.path.join(tmp_dir, 'store'))
+    columns = list(PITCH_STORE_COLUMNS)
+    cases = [
+        ('all float columns',
+         lambda: reader.load_pitches(engine, columns),
+         lambda: {name: store[name].sum() for name in columns}),  # Touch every page, as an analysis would
+        ('one pitcher',
+         lambda: reader.load_pitches(engine, columns, filters={'pitcher_id': PITCHER_ID}),
+         lambda: store.select(columns, pitcher_id=PITCHER_ID)),
+    ]
+
+    print('{:<20} {:>12} {:>12} {:>9}'.format('read', 'database', 'store', 'speedup'))
+    for name, from_db, from_store in cases:
+        db_time, store_time = best_of(from_db), best_of(from_store)
+        print('{:<20} {:10.2f}ms {:10.2f}ms {:8.0f}x'.format(name, db_time * 1000, store_time * 1000,
+                                                           db_time / store_time))
+    engine.dispose()
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        run(tmp_dir, int(sys.argv[1]) if len(sys.argv) > 1 else 500)
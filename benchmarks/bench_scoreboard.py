@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Times decoding master_scoreboard.json with json.loads and with scoreboard.decode_scoreboard
+
+The test scoreboard's games are trimmed, so a full date is rebuilt from its first game: 15 games, each with the
+per-inning line score and the kind of extra fields (probable pitchers, broadcasts, links) real scoreboards carry.
+The size of the decoded result is measured with tracemalloc.
+
+Usage (with pygameday installed, e.g. with `pip install -e .`):
+    python benchmarks/bench_scoreboard.py [n_dates]
+"""
+import copy
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from pygameday.scoreboard import decode_scoreboard
+
+SCOREBOARD_PATH = os.path.join(os.path.dirname(__file__), '..', 'tests', 'data', 'components', 'game', 'mlb',
+                               'year_2018', 'month_04', 'day_06', 'master_scoreboard.json')
+N_GAMES = 15
+
+
+def full_scoreboard():
+    with open(SCOREBOARD_PATH) as f:
+        scoreboard = json.load(f)
+
+    template = scoreboard['data']['games']['game'][0]
+    games = []
+    for i in range(N_GAMES):
+        game = copy.deepcopy(template)
+        game['id'] = '{}-{}'.format(template['id'][:-2], i)
+        game['linescore']['inning'] = [{'home': str(inning % 3), 'away': str(inning % 2)} for inning in range(9)]
+        for side in ('home', 'away'):
+            game[side + '_probable_pitcher'] = {'id': '453286', 'first': 'Max', 'last': 'Scherzer', 'wins': '1',
+                                                'losses': '0', 'era': '1.50', 'throwinghand': 'RHP', 'number': '31'}
+            game[side + '_win'] = '1'
+            game[side + '_loss'] = '0'
+        game['broadcast'] = {side: {'tv': 'MASN', 'radio': '106.7 The Fan'} for side in ('home', 'away')}
+        game['links'] = {name: '/mlb/gameday/index.jsp?gid={}&mode={}'.format(game['id'], name)
+                         for name in ('wrapup', 'preview', 'home_audio', 'away_audio', 'tv_station', 'mlbtv')}
+        games.append(game)
+
+    scoreboard['data']['games']['game'] = games
+    return json.dumps(scoreboard).encode()
+
+
+def best_of(function, content, repeat):
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function(content)
+        timings.append(time.perf_counter() - start_time)
+    return min(timings)
+
+
+def retained_bytes(function, content):
+    tracemalloc.start()
+    snapshot = tracemalloc.take_snapshot()
+    decoded = function(content)
+    size = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(snapshot, 'filename'))
+    tracemalloc.stop()
+    del decoded
+    return size
+
+
+if __name__ == '__main__':
+    n_dates = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    content = full_scoreboard()
+    print('Scoreboard of {} games, {} bytes'.format(N_GAMES, len(content)))
+
+    for name, function in (('json.loads', json.loads), ('decode_scoreboard', decode_scoreboard)):
+        seconds = best_of(lambda c: [function(c) for _ in range(n_dates)], content, 3)
+        print('{:<18} {:8.1f} us/date, {:7.1f} KB decoded'.format(
+            name, seconds / n_dates * 1e6, retained_bytes(function, content) / 1024))
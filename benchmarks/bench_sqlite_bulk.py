@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compares SQLite load throughput with the default settings and with the bulk-load profile
+
+Each run writes the same synthetic games the way GameDayClient does (players upserted, then games, at bats, pitches
+and hits in play), committing every `commit_every` games, into a fresh database file.
+
+Usage (with pygameday installed, e.g. with `pip install -e .`):
+    python benchmarks/bench_sqlite_bulk.py [n_games] [commit_every]
+"""
+import os
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+
+from pygameday import writer
+from pygameday.models import create_db_tables
+from pygameday.models import db_connect
+from pygameday.models import deferred_indexes
+
+from synthetic import synthetic_games
+
+
+def load(engine, parsed_games, commit_every):
+    for i in range(0, len(parsed_games), commit_every):
+        batch = parsed_games[i:i + commit_every]
+        with engine.begin() as connection:
+            writer.upsert_players(connection, [p for parsed in batch for p in parsed.players])
+            writer.insert_games(connection, batch)
+
+
+def run(directory, n_games, commit_every):
+    parsed_games = synthetic_games(n_games)
+    n_rows = sum(1 + len(p.at_bats) + len(p.pitches) + len(p.hits_in_play) for p in parsed_games)
+    print('{} games, {} rows per run, {} games per commit'.format(n_games, n_rows, commit_every))
+
+    profiles = [
+        ('default', False, False),
+        ('pragmas', True, False),
+        ('pragmas+indexes', True, True),
+    ]
+
+    for name, bulk_load, defer_indexes in profiles:
+        path = os.path.join(directory, '{}.db'.format(name))
+        engine = db_connect('sqlite:///' + path, bulk_load=bulk_load)
+        create_db_tables(engine)
+
+        start_time = time.perf_counter()
+        with deferred_indexes(engine) if defer_indexes else nullcontext():
+            load(engine, parsed_games, commit_every)
+        seconds = time.perf_counter() - start_time
+        engine.dispose()
+
+        print('{:<16} {:8.2f} s {:10.0f} rows/s'.format(name, seconds, n_rows / seconds))
+
+
+if __name__ == '__main__':
+    n_games = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    commit_every = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        run(tmp_dir, n_games, commit_every)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compares rows per second written by the ORM path, the bulk Core writer and, on PostgreSQL, the COPY loader
+
+Usage (with pygameday installed, e.g. with `pip install -e .`):
+    python benchmarks/bench_writer.py [database_uri] [n_games]
+
+The database URI defaults to a temporary SQLite file. Pass a PostgreSQL URI to benchmark Postgres; the benchmark
+creates the tables if needed but does not clean up after itself, so use a scratch database.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from pygameday import writer
+from pygameday.models import AtBat, Game, HitInPlay, Pitch
+from pygameday.models import BASE
+from pygameday.models import create_db_tables
+from pygameday.models import db_connect
+
+from synthetic import synthetic_games
+
+
+def orm_insert(engine, parsed_games):
+    """Writes games the way GameDayClient used to: ORM objects added to a session, one commit per game"""
+    session = sessionmaker(bind=engine)()
+    for parsed in parsed_games:
+        db_game = Game(**parsed.game._asdict())
+        db_at_bats = [AtBat(**ab._asdict()) for ab in parsed.at_bats]
+        for pitch in parsed.pitches:
+            values = pitch._asdict()
+            db_at_bats[values.pop('at_bat_index')].pitches.append(Pitch(**values))
+        db_game.at_bats.extend(db_at_bats)
+        db_game.hits_in_play.extend(HitInPlay(**h._asdict()) for h in parsed.hits_in_play)
+        session.add(db_game)
+        session.commit()
+    session.close()
+
+
+def bulk_insert(engine, parsed_games):
+    """Writes games with the bulk Core writer, one transaction per game"""
+    for parsed in parsed_games:
+        with engine.begin() as connection:
+            writer.insert_games(connection, [parsed])
+
+
+def copy_load(engine, parsed_games, batch_size=50):
+    """Writes games with the PostgreSQL COPY loader, in batches of games"""
+    for i in range(0, len(parsed_games), batch_size):
+        with engine.begin() as connection:
+            writer.copy_games(connection, parsed_games[i:i + batch_size])
+
+
+def run(database_uri, n_games):
+    parsed_games = synthetic_games(n_games)
+    n_rows = sum(1 + len(p.at_bats) + len(p.pitches) + len(p.hits_in_play) for p in parsed_games)
+    print('{} games, {} rows per run'.format(n_games, n_rows))
+
+    loaders = [('ORM', orm_insert), ('Core bulk', bulk_insert)]
+    if database_uri.startswith('postgresql'):
+        loaders.append(('COPY', copy_load))
+
+    for name, insert in loaders:
+        engine = db_connect(database_uri)
+        BASE.metadata.drop_all(engine)
+        create_db_tables(engine)
+
+        start_time = time.perf_counter()
+        insert(engine, parsed_games)
+        seconds = time.perf_counter() - start_time
+        engine.dispose()
+
+        print('{:<10} {:8.2f} s {:10.0f} rows/s'.format(name, seconds, n_rows / seconds))
+
+
+if __name__ == '__main__':
+    n_games = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    if len(sys.argv) > 1:
+        run(sys.argv[1], n_games)
+    else:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            run('sqlite:///' + os.path.join(tmp_dir, 'bench.db'), n_games)
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Generates synthetic GameDay data of realistic size for the benchmarks
+"""
+import random
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+from pygameday.records import AtBatRecord
+from pygameday.records import GameRecord
+from pygameday.records import HitInPlayRecord
+from pygameday.records import ParsedGame
+from pygameday.records import PitchRecord
+from pygameday.records import PlayerRecord
+
+AT_BATS_PER_GAME = 78
+PITCHES_PER_AT_BAT = 4
+HITS_IN_PLAY_PER_GAME = 50
+PLAYERS_PER_GAME = 50
+PITCH_TYPES = ('FF', 'FT', 'SL', 'CU', 'CH', 'SI', 'FC')
+
+
+def synthetic_games(n_games, seed=0, n_players=1500):
+    """Returns n_games ParsedGames with about 300 pitches each
+
+    Parameters
+    ----------
+    n_games : int
+    seed : int
+        Seed for the random values, so runs are comparable
+    n_players : int
+        The size of the pool that the players of each game are drawn from
+    """
+    rng = random.Random(seed)
+    player_ids = list(range(400000, 400000 + n_players))
+    start = datetime(2018, 4, 1, 19, 5, tzinfo=timezone(timedelta(hours=-4)))
+    games = []
+
+    for g in range(n_games):
+        day = start + timedelta(days=g // 15)
+        game = GameRecord(gameday_id='{:%Y/%m/%d}/synmlb-synmlb-{}'.format(day, g), venue='Synthetic Park',
+                          start_time=day, game_data_directory='/synthetic/{}'.format(g), game_type='R',
+                          home_name_abbrev='HOM', home_team_city='Home', home_team_name='Homers',
+                          away_name_abbrev='AWY', away_team_city='Away', away_team_name='Aways',
+                          home_team_runs=rng.randint(0, 10), away_team_runs=rng.randint(0, 10), league='AN')
+
+        players = [PlayerRecord(pid, 'First', 'Last{}'.format(pid), 'Last', 'R', 'L')
+                   for pid in rng.sample(player_ids, PLAYERS_PER_GAME)]
+
+        at_bats = []
+        pitches = []
+        for a in range(AT_BATS_PER_GAME):
+            inning = a // 9 + 1
+            half = 'T' if a % 2 == 0 else 'B'
+            batter, pitcher = rng.choice(players).player_id, rng.choice(players).player_id
+            at_bats.append(AtBatRecord(inning, half, PITCHES_PER_AT_BAT, 1, 2, a % 3, batter, pitcher, 'R',
+                                       'Batter grounds out.', 'Groundout'))
+            for p in range(PITCHES_PER_AT_BAT):
+                pitches.append(PitchRecord(
+                    a, p, inning, half, 'Ball', 'B', '180406_170522',
+                    rng.uniform(50, 150), rng.uniform(100, 200), rng.uniform(75, 100), rng.uniform(70, 92),
+                    3.4, 1.6, rng.uniform(-10, 10), rng.uniform(-10, 10), rng.uniform(-2, 2), rng.uniform(0, 5),
+                    -1.5, 50.0, 5.7, 6.0, -138.0, -4.4, -11.7, 31.0, -13.6, 23.8, 30.6, 3.6,
+                    rng.choice(PITCH_TYPES), 0.9, rng.randint(1, 14), rng.randint(0, 100),
+                    rng.uniform(0, 360), rng.uniform(1000, 3000)))
+
+        hits = [HitInPlayRecord(rng.choice(players).player_id, rng.choice(players).player_id, 'Single', 'H', 'A',
+                                rng.randint(1, 9), rng.uniform(0, 250), rng.uniform(0, 250))
+                for _ in range(HITS_IN_PLAY_PER_GAME)]
+
+        games.append(ParsedGame(game, at_bats, pitches, hits, players))
+
+    return games
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Provides an asyncio layer over scrape for fetching many GameDay pages concurrently
+
+Requests are issued through the same pooled session as the synchronous scrape functions, so every page is fetched
+exactly the way scrape would fetch it.  What changes is scheduling: all files for all games on a date, or across many
+dates, are in flight at once, bounded by a single global limit.
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from . import scrape
+from .constants import ASYNC_MAX_IN_FLIGHT
+from .constants import GD_FINAL_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# Functions used to fetch the pages of a single game, keyed by the name the client uses for them
+GAME_PAGE_FETCHERS = (
+    ('hit_chart', scrape.fetch_hit_chart),
+    ('players', scrape.fetch_players),
+    ('inning_all', scrape.fetch_inning_all),
+)
+
+
+def is_final(game):
+    """Whether a scoreboard game entry has a final status, i.e., whether its pages are worth fetching
+
+    Parameters
+    ----------
+    game : dict
+        A game entry from master_scoreboard.json
+    """
+    return game['status']['status'] in GD_FINAL_STATUSES
+
+
+def scoreboard_games(scoreboard):
+    """Returns the list of games in a master scoreboard, which may be empty
+
+    Parameters
+    ----------
+    scoreboard : dict
+        The decoded master_scoreboard.json
+    """
+    if scoreboard is None:
+        return []
+
+    game_data = scoreboard['data']['games']
+    games = game_data.get('game', [])
+
+    # A day with a single game has a dict rather than a list
+    if isinstance(games, dict):
+        games = [games]
+
+    return games
+
+
+class AsyncFetcher(object):
+    """Fetches GameDay pages concurrently with a global limit on requests in flight
+    """
+    def __init__(self, max_in_flight=ASYNC_MAX_IN_FLIGHT):
+        """Constructor
+
+        Parameters
+        ----------
+        max_in_flight : int
+            The maximum number of requests outstanding at any one time, across all dates and games
+        """
+        self.max_in_flight = max(1, int(max_in_flight))
+        self._semaphore = None
+        self._executor = None
+
+    async def _fetch(self, fetch_function, *args):
+        """Runs a blocking scrape function under the in-flight limit"""
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fetch_function, *args)
+
+    async def fetch_game(self, game_directory):
+        """Fetches all pages for a single game concurrently
+
+        Parameters
+        ----------
+        game_directory : str
+            The relative path to the game directory
+
+        Returns
+        -------
+        dict
+            The pages keyed by 'hit_chart', 'players', and 'inning_all'. Pages that could not be fetched are None.
+        """
+        names = [name for name, _ in GAME_PAGE_FETCHERS]
+        pages = await asyncio.gather(*[self._fetch(fetcher, game_directory) for _, fetcher in GAME_PAGE_FETCHERS],
+                                     return_exceptions=True)
+
+        # A page whose fetch raised counts as not fetched, so only its game fails
+        for name, page in zip(names, pages):
+            if isinstance(page, Exception):
+                logger.error('Error fetching {} of {}: {}'.format(name, game_directory, page))
+        return {name: None if isinstance(page, Exception) else page for name, page in zip(names, pages)}
+
+    async def fetch_date(self, date, game_filter=is_final):
+        """Fetches the master scoreboard for a date, then all pages of the selected games on that date
+
+        Parameters
+        ----------
+        date : datetime.datetime
+            The date to fetch
+        game_filter : callable
+            Predicate on a scoreboard game entry; pages are only fetched for games where it returns True
+
+        Returns
+        -------
+        tuple
+            (scoreboard, pages) where pages maps each selected game's GameDay ID to its dict of pages
+        """
+        scoreboard = await self._fetch(scrape.fetch_master_scoreboard, date)
+        games = [g for g in scoreboard_games(scoreboard) if game_filter is None or game_filter(g)]
+
+        game_pages = await asyncio.gather(*[self.fetch_game(g['game_data_directory']) for g in games])
+        return scoreboard, {g['id']: p for g, p in zip(games, game_pages)}
+
+    async def fetch_dates(self, dates, game_filter=is_final):
+        """Fetches the scoreboards and game pages for many dates concurrently
+
+        Parameters
+        ----------
+        dates : iterable of datetime.datetime
+            The dates to fetch
+        game_filter : callable
+            Predicate on a scoreboard game entry; pages are only fetched for games where it returns True
+
+        Returns
+        -------
+        list
+            (date, scoreboard, pages) tuples in the same order as dates. The scoreboard of a date that could not be
+            fetched is None, and so is a page that could not be fetched.
+        """
+        dates = list(dates)
+        scrape.ensure_pool_size(self.max_in_flight)
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            self._executor = executor
+            try:
+                results = await asyncio.gather(*[self.fetch_date(d, game_filter) for d in dates],
+                                               return_exceptions=True)
+            finally:
+                self._executor = None
+
+        # A date whose scoreboard fetch raised is returned without one, so only that date is left partial
+        for d, result in zip(dates, results):
+            if isinstance(result, Exception):
+                logger.error('Error fetching the scoreboard of {}: {}'.format(d.date(), result))
+        return [(d,) + ((None, {}) if isinstance(result, Exception) else result) for d, result in zip(dates, results)]
+
+
+def fetch_dates(dates, max_in_flight=ASYNC_MAX_IN_FLIGHT, game_filter=is_final):
+    """Fetches scoreboards and game pages for many dates concurrently, blocking until all are done
+
+    Parameters
+    ----------
+    dates : iterable of datetime.datetime
+        The dates to fetch
+    max_in_flight : int
+        The maximum number of requests outstanding at any one time
+    game_filter : callable
+        Predicate on a scoreboard game entry; pages are only fetched for games where it returns True
+
+    Returns
+    -------
+    list
+        (date, scoreboard, pages) tuples in the same order as dates. See AsyncFetcher.fetch_date.
+    """
+    fetcher = AsyncFetcher(max_in_flight)
+    return asyncio.run(fetcher.fetch_dates(dates, game_filter))
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Defines PageCache, a persistent on-disk cache of raw GameDay pages
+"""
+import gzip
+import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+
+from .constants import CACHE_EVICT_TARGET
+from .constants import CACHE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILE_SUFFIX = '.gz'
+
+
+class PageCache(object):
+    """Stores compressed page bodies on disk, keyed by GameDay URL path
+
+    Each entry is a single file holding an expiry timestamp (0 for entries that never expire) followed by the
+    gzip-compressed body.  A file's modification time is its last use, so the least recently used entries are evicted
+    first once the cache grows past its byte budget.  Entries are written atomically, so several processes can share
+    one cache directory.
+    """
+    def __init__(self, directory, max_bytes=CACHE_MAX_BYTES):
+        """Constructor
+
+        Parameters
+        ----------
+        directory : str
+            The directory holding the cache. It is created if it does not exist.
+        max_bytes : int
+            The budget for the total size of the cached files, in bytes
+        """
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        self._size = None  # Running estimate of the total size of the cache, computed on first use
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+
+    def __getstate__(self):
+        # Locks can't be pickled; each process keeps its own size estimate
+        return {'directory': self.directory, 'max_bytes': self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(state['directory'], state['max_bytes'])
+
+    def _path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest + CACHE_FILE_SUFFIX)
+
+    def get(self, key):
+        """Returns the cached body for a key, or None if it is missing or expired
+
+        Parameters
+        ----------
+        key : str
+            The GameDay URL path of the page
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                expires = float(f.readline())
+                compressed = f.read()
+        except (OSError, ValueError):
+            return None
+
+        if expires and expires < time.time():
+            logger.debug('Cache entry for {} has expired'.format(key))
+            self._remove(path)
+            return None
+
+        try:
+            os.utime(path)  # Mark the entry as recently used
+        except OSError:
+            pass
+
+        return gzip.decompress(compressed)
+
+    def put(self, key, content, ttl=None):
+        """Stores a page body
+
+        Parameters
+        ----------
+        key : str
+            The GameDay URL path of the page
+        content : bytes
+            The page body
+        ttl : float
+            Seconds until the entry expires. If None, the entry never expires.
+        """
+        path = self._path(key)
+        expires = 0 if ttl is None else time.time() + ttl
+        data = '{:.0f}\n'.format(expires).encode('ascii') + gzip.compress(content)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = '{}.{}.tmp'.format(path, uuid.uuid4().hex)
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data)
+            over_budget = self._size > self.max_bytes
+
+        if over_budget:
+            self.evict()
+
+    def evict(self):
+        """Removes the least recently used entries until the cache is back under its budget
+        """
+        with self._lock:
+            entries = []
+            for path in self._iter_files():
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            size = sum(e[1] for e in entries)
+            target = self.max_bytes * CACHE_EVICT_TARGET
+            n_evicted = 0
+
+            for _, file_size, path in sorted(entries):
+                if size <= target:
+                    break
+                if self._remove(path):
+                    size -= file_size
+                    n_evicted += 1
+
+            self._size = size
+
+        logger.debug('Evicted {} entries from the page cache in {}'.format(n_evicted, self.directory))
+
+    def clear(self):
+        """Removes every entry from the cache
+        """
+        with self._lock:
+            for path in list(self._iter_files()):
+                self._remove(path)
+            self._size = 0
+
+    def size(self):
+        """Returns the total size of the cached files, in bytes
+        """
+        return self._scan_size()
+
+    def _iter_files(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(CACHE_FILE_SUFFIX):
+                    yield os.path.join(root, name)
+
+    def _scan_size(self):
+        size = 0
+        for path in self._iter_files():
+            try:
+                size += os.path.getsize(path)
+            except OSError:
+                pass
+        return size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
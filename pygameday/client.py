@@ -3,16 +3,34 @@
 """Defines GameDayClient, the primary class for scraping, parsing, and ingesting MLB GameDay data.
 """
 import logging
+import multiprocessing
+import os
+from contextlib import nullcontext
 from datetime import timedelta
-from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
 from tqdm import tqdm
 from sqlalchemy import func
-from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import sessionmaker
 
-from . import parse
+from . import async_scrape
+from . import manifest
+from . import parquet
+from . import pitch_store
+from . import reader
 from . import scrape
+from . import writer
+from .cache import PageCache
+from .sources import open_source
+from .constants import ASYNC_DATE_WINDOW
+from .constants import BULK_LOAD_DEFER_INDEXES_DATES
+from .constants import CACHE_MAX_BYTES
+from .constants import MANIFEST_DONE
+from .constants import MANIFEST_FAILED
+from .constants import MANIFEST_NOT_FINAL
+from .constants import MANIFEST_SPRING
+from .constants import PIPELINE_COMMIT_EVERY
+from .constants import READ_CHUNK_SIZE
 from .models import Game
 from .models import Player
 from .models import AtBat
@@ -20,14 +38,81 @@ from .models import Pitch
 from .models import HitInPlay
 from .models import create_db_tables
 from .models import db_connect
+from .models import deferred_indexes
+from .pipeline import GamePipeline
+from .policy import AdaptiveLimiter
 
 logger = logging.getLogger(__name__)
 
+# Functions that write parsed games to the database, by GameDayClient loader name
+LOADERS = {
+    'insert': writer.insert_games,
+    'copy': writer.copy_games,
+}
+
+
+def _init_worker(pool_maxsize, cache, source, fetch_policy, limiter=None):
+    """Configures the scrape layer of a worker process"""
+    scrape.configure_session(pool_maxsize)
+    scrape.configure_policy(fetch_policy)
+    scrape.configure_limiter(limiter)
+    scrape.configure_cache(cache)
+    scrape.configure_source(source)
+
+
+# Engines by database URI and options, each with the PID of the process that created it
+_engines = {}
+
+
+def _engine_key(database_uri, engine_options):
+    return database_uri, repr(sorted(engine_options.items()))
+
+
+def get_engine(database_uri, engine_options=None):
+    """Returns the engine for a database in the current process, creating it on first use
+
+    Each process has one engine, and so one connection pool, per database URI and set of options. A worker process
+    that inherits an engine through a fork drops the inherited pool without closing the parent's connections and
+    builds its own.
+
+    Parameters
+    ----------
+    database_uri : str
+        The database URI
+    engine_options : dict
+        Keyword arguments for sqlalchemy.create_engine, e.g. pool settings
+    """
+    engine_options = engine_options or {}
+    key = _engine_key(database_uri, engine_options)
+    pid = os.getpid()
+    engine_pid, engine = _engines.get(key, (None, None))
+
+    if engine is None or engine_pid != pid:
+        if engine is not None:
+            engine.dispose(close=False)
+
+        engine = db_connect(database_uri, **engine_options)
+        _engines[key] = (pid, engine)
+        logger.debug("Created database engine in process {}".format(pid))
+
+    return engine
+
+
+def dispose_engine(database_uri, engine_options=None):
+    """Closes the connections of the current process's engine for a database, if there is one"""
+    engine_pid, engine = _engines.pop(_engine_key(database_uri, engine_options or {}), (None, None))
+    if engine is not None and engine_pid == os.getpid():
+        engine.dispose()
+
 
 class GameDayClient(object):
     """Class for ingesting GameDay data into a database
     """
-    def __init__(self, database_uri, ingest_spring_training=False, n_workers=4):
+    def __init__(self, database_uri, ingest_spring_training=False, n_workers=4, max_in_flight=None,
+                 cache_dir=None, cache_max_bytes=CACHE_MAX_BYTES, source=None,
+                 fetch_policy=None, loader='insert', engine_options=None, commit_every=PIPELINE_COMMIT_EVERY,
+                 commit_every_rows=None, bulk_load=False, parquet_dir=None,
+                 pitch_store_dir=None):
         """Constructor
 
         Initializes database connection and session
@@ -47,26 +132,125 @@ class GameDayClient(object):
             Whether to ingest spring training games. [Default: False]
 
         n_workers : int
-            The number of parallel workers to use when ingesting games
+            The number of worker processes that fetch and parse games. Parsed games are written to the database by
+            the calling process alone, so this is safe with SQLite. This also sets the size of the keep-alive HTTP
+            connection pool used to fetch GameDay pages.
+
+        max_in_flight : int
+            If set, GameDay pages are fetched with the asyncio engine in async_scrape: all files for all games on a
+            window of dates are downloaded concurrently, with at most this many requests in flight.
+            If None, pages are fetched one after another by each worker. [Default: None]
+
+        cache_dir : str
+            If set, raw GameDay pages are cached on disk in this directory, so re-running an ingest doesn't download
+            them again. Pages of Final games are kept until evicted; recent scoreboards expire. [Default: None]
+
+        cache_max_bytes : int
+            The size budget of the page cache. Least recently used pages are evicted beyond it. [Default: 2 GB]
+
+        source : str or pygameday.sources.PageSource
+            Where to read GameDay pages from. A directory or a tar/zip archive laid out like the GameDay server (see
+            pygameday.mirror) is read with no network access; an 'http://' URL names another server.
+            If None, pages are fetched from the GameDay server. [Default: None]
+
+        fetch_policy : pygameday.policy.FetchPolicy
+            Timeouts, retries and backoff for HTTP requests. If None, the defaults in constants.py are used.
+
+        loader : str
+            How parsed games are written to the database. 'insert' uses batched INSERTs and works with any database.
+            'copy' streams rows into staging tables with COPY and moves them with set-based SQL; it is much faster
+            for large backfills but requires PostgreSQL with psycopg2 or psycopg. [Default: 'insert']
+
+        engine_options : dict
+            Keyword arguments for SQLAlchemy's create_engine, e.g. pool settings such as pool_size, max_overflow,
+            pool_recycle and pool_pre_ping. The client owns one engine per process, created on first use.
+
+        commit_every : int
+            The number of games written per transaction. Larger batches mean fewer commits, and so fewer fsyncs on
+            SQLite. If a batch fails, it is split until the bad game is isolated; the other games are still written.
+            [Default: 50]
+
+        commit_every_rows : int
+            If set, a transaction is also committed once its games add up to this many rows. [Default: None]
+
+        bulk_load : bool
+            Whether to use the SQLite bulk-load profile: WAL journaling and pragmas that trade durability of the last
+            few commits for speed (see models.db_connect). A process_date_range of at least 30 dates to ingest also
+            drops the non-unique indexes and rebuilds them at its end. Ignored for other databases. [Default: False]
+
+        parquet_dir : str
+            If set, every game ingested is also written to Parquet datasets under this directory, partitioned by
+            season and date (see pygameday.parquet). Requires PyArrow. [Default: None]
+
+        pitch_store_dir : str
+            If set, the pitches of every game ingested are also added to the memory-mapped pitch store in this
+            directory (see pygameday.pitch_store). Only one client may keep a given store; it is locked until the
+            client is closed. Requires NumPy.
+            [Default: None]
         """
-        engine = db_connect(database_uri)
+        if loader not in LOADERS:
+            raise ValueError("Unknown loader '{}'. Choose one of: {}".format(loader, ', '.join(LOADERS)))
+
+        self.database_uri = database_uri
+        self.engine_options = dict(engine_options or {})
+        if bulk_load:
+            self.engine_options['bulk_load'] = True  # db_connect takes it alongside the create_engine options
+
+        engine = self.engine
+        if loader == 'copy' and engine.dialect.name != 'postgresql':
+            raise ValueError("The 'copy' loader requires PostgreSQL, not {}".format(engine.dialect.name))
+
         create_db_tables(engine)
         logger.info("Initialized GameDayClient using '{}'".format(database_uri))
 
-        self.database_uri = database_uri
         self.ingest_spring_training = ingest_spring_training
         self.n_workers = n_workers
+        self.max_in_flight = max_in_flight
         self.player_ids = set()  # Player IDs that have already been inserted into the database
         self.gameday_ids = set()  # Game IDs that have already been inserted into the database
 
+        self.cache = PageCache(cache_dir, cache_max_bytes) if cache_dir else None
+        self.source = open_source(source) if isinstance(source, str) else source
+        self.fetch_policy = fetch_policy
+        self.loader = loader
+        self.commit_every = commit_every
+        self.commit_every_rows = commit_every_rows
+        self.sinks = [parquet.ParquetSink(parquet_dir)] if parquet_dir else []
+        if pitch_store_dir:
+            self.sinks.append(pitch_store.PitchStoreSink(pitch_store_dir, self.engine))
+
+        scrape.configure_session(pool_maxsize=max(n_workers, max_in_flight or 0))
+        scrape.configure_policy(self.fetch_policy)
+        scrape.configure_cache(self.cache)
+        scrape.configure_source(self.source)
         self.update_inserted_data()  # Update the set of players and games that are already inserted
 
+    @property
+    def engine(self):
+        """The SQLAlchemy engine for the client's database in the current process
+
+        See get_engine. Copies of the client sent to worker processes share their process's engine.
+        """
+        return get_engine(self.database_uri, self.engine_options)
+
+    def close(self):
+        """Closes the client's database connections in the current process, and releases its pitch store
+        """
+        for sink in self.sinks:
+            if isinstance(sink, pitch_store.PitchStoreSink):
+                sink.writer.close()
+        dispose_engine(self.database_uri, self.engine_options)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
     def db_stats(self):
         """Prints information about the current database contents
         """
-        engine = db_connect(self.database_uri)
-        session_maker = sessionmaker(bind=engine)
-        session = session_maker()
+        session = sessionmaker(bind=self.engine)()
 
         game_count = session.query(func.count(Game.game_id)).scalar()
         player_count = session.query(func.count(Player.player_id)).scalar()
@@ -95,9 +279,7 @@ class GameDayClient(object):
         Keeping track of games and players already inserted saves us from trying to insert objects that are already
         there.  It also helps with limiting the number of times we have to query the database.
         """
-        engine = db_connect(self.database_uri)
-        session_maker = sessionmaker(bind=engine)
-        session = session_maker()
+        session = sessionmaker(bind=self.engine)()
 
         self.gameday_ids = {gid[0] for gid in session.query(Game.gameday_id)}
         self.player_ids = {pid[0] for pid in session.query(Player.player_id)}
@@ -106,6 +288,112 @@ class GameDayClient(object):
         logger.debug('There are currently {} games and {} players in the database'.format(
                 len(self.gameday_ids), len(self.player_ids)))
 
+    def iter_pitches(self, filters=None, chunk_size=READ_CHUNK_SIZE, columns=None, as_frame=False):
+        """Streams pitches from the database in chunks of columns, in bounded memory
+
+        Parameters
+        ----------
+        filters : dict
+            Conditions on columns of the pitches, at_bats or games tables, e.g. {'pitcher_id': 453286} or
+            {'pitch_type': ['FF', 'FT']}. A list, tuple or set selects rows equal to any of its values.
+        chunk_size : int
+            The largest number of pitches per chunk
+        columns : list of str
+            The columns to read, from the same tables. [Default: every column of the pitches table]
+        as_frame : bool
+            Whether to yield pandas DataFrames rather than dicts of NumPy arrays
+
+        Yields
+        ------
+        dict or pandas.DataFrame
+            A chunk of pitches: a NumPy array per column, by column name, or a DataFrame. See pygameday.reader.
+        """
+        return reader.iter_pitches(self.engine, columns, filters, chunk_size, as_frame)
+
+    def load_pitches(self, columns=None, filters=None, chunk_size=READ_CHUNK_SIZE, as_frame=False):
+        """Reads pitches from the database into one NumPy array per column
+
+        See iter_pitches for the parameters.
+
+        Returns
+        -------
+        dict or pandas.DataFrame
+            A NumPy array per column, by column name, or a DataFrame
+        """
+        return reader.load_pitches(self.engine, columns, filters, chunk_size, as_frame)
+
+    def export_parquet(self, directory, start_date, end_date):
+        """Exports the games of a range of dates from the database to Parquet datasets
+
+        The dates' partitions are replaced, so a range can be exported again. See pygameday.parquet.
+
+        Parameters
+        ----------
+        directory : str
+            The root of the datasets
+        start_date : datetime.datetime
+            The first date to export
+        end_date : datetime.datetime
+            The last date to export (inclusive)
+
+        Returns
+        -------
+        int
+            The number of games exported
+        """
+        return parquet.export_date_range(self.engine, directory, start_date, end_date)
+
+    def build_pitch_store(self, directory):
+        """Adds the games in the database to a memory-mapped pitch store, creating it if needed
+
+        Games already in the store are left out. Open the store with pygameday.pitch_store.PitchStore.
+
+        Parameters
+        ----------
+        directory : str
+            The directory of the store
+
+        Returns
+        -------
+        int
+            The number of games added
+        """
+        return pitch_store.build_pitch_store(self.engine, directory)
+
+    def ingest_parquet(self, directory, start_date=None, end_date=None):
+        """Ingests games from Parquet datasets, such as those written with parquet_dir or export_parquet
+
+        Nothing is fetched or parsed. Games that are already in the database are skipped.
+
+        Parameters
+        ----------
+        directory : str
+            The root of the datasets
+        start_date : datetime.datetime
+            If set, only games on or after this date are ingested
+        end_date : datetime.datetime
+            If set, only games on or before this date are ingested
+
+        Returns
+        -------
+        pygameday.pipeline.IngestSummary
+            Which games were written, skipped, or failed
+        """
+        # The games came from Parquet, so they aren't written back to it
+        sinks = [sink for sink in self.sinks if not isinstance(sink, parquet.ParquetSink)]
+        with GamePipeline(self.write_games, commit_every=self.commit_every,
+                          commit_every_rows=self.commit_every_rows, sinks=sinks) as pipeline:
+            # A date at a time, so a season never has to fit in memory
+            for parsed_games in parquet.iter_parsed_games(directory, start_date, end_date):
+                for parsed in parsed_games:
+                    if parsed.game.gameday_id in self.gameday_ids:
+                        pipeline.skip(parsed.game.gameday_id, "It's already in the DB.")
+                    else:
+                        pipeline.submit_parsed(parsed)
+
+        self._log_summary(pipeline.summary)
+        return pipeline.summary
+
     def process_date_range(self, start_date, end_date):
         """Ingests GameDay data within a range of specified dates
 
@@ -120,6 +408,11 @@ class GameDayClient(object):
         end_date: datetime.date object
             The final date to process.
             Can also be a string, in which case the function will parse it into a datetime object.
+
+        Returns
+        -------
+        pygameday.pipeline.IngestSummary
+            The games that were written, skipped, or failed
         """
         if end_date < start_date:
             logger.info('Swapping start date and end date to preserve causality')
@@ -132,8 +425,45 @@ class GameDayClient(object):
 
         logger.info('Ingesting GameDay data within date range {} to {}'.format(start_date.date(), end_date.date()))
 
-        for date in tqdm(date_range, total=len(date_range)):
-            self.process_date(date)
+        # Dates the manifest says are done are skipped without fetching anything
+        with self.engine.connect() as connection:
+            finished = manifest.finished_dates(connection, date_range, self.ingest_spring_training)
+        if finished:
+            logger.info('Skipping {} dates that have already been ingested'.format(len(finished)))
+            date_range = [date for date in date_range if date.date() not in finished]
+
+        # Dates whose games are still in the pipeline, recorded in the manifest once they are all out
+        open_dates = {}
+
+        # With the bulk-load profile, secondary indexes are rebuilt once at the end instead of updated with every row.
+        # Rebuilding them costs a pass over the whole table, so it only pays for a long range.
+        if self.engine_options.get('bulk_load') and self.engine.dialect.name == 'sqlite' \
+                and len(date_range) >= BULK_LOAD_DEFER_INDEXES_DATES:
+            indexes = deferred_indexes(self.engine)
+        else:
+            indexes = nullcontext()
+
+        # One pipeline, and so one pool of worker processes, serves the whole range. Games of the following dates are
+        # scheduled as soon as a worker frees up, so workers don't go idle while the slowest game of a day finishes.
+        with indexes, self._pipeline() as pipeline, tqdm(total=len(date_range)) as progress:
+            if self.max_in_flight:
+                # Fetch a window of dates at a time concurrently, then ingest them
+                for i in range(0, len(date_range), ASYNC_DATE_WINDOW):
+                    window = date_range[i:i + ASYNC_DATE_WINDOW]
+                    fetched = async_scrape.fetch_dates(window, self.max_in_flight,
+                                                       partial(self._should_fetch_game, pipeline=pipeline))
+                    for date, scoreboard, pages in fetched:
+                        self._submit_scoreboard(pipeline, date, scoreboard, pages, open_dates)
+                        progress.update(1)
+            else:
+                for date in date_range:
+                    self._submit_scoreboard(pipeline, date, scrape.fetch_master_scoreboard(date), None, open_dates)
+                    progress.update(1)
+
+        self._checkpoint(pipeline, open_dates)
+        summary = pipeline.summary
+        self._log_summary(summary)
+        return summary
 
     def process_date(self, date):
         """Ingests one day of GameDay data
@@ -142,170 +472,215 @@ class GameDayClient(object):
         ----------
         date : datetime.datetime
             The date to process
+
+        Returns
+        -------
+        pygameday.pipeline.IngestSummary
+            The games that were written, skipped, or failed
+        """
+        if self.max_in_flight:
+            _, scoreboard, pages = async_scrape.fetch_dates([date], self.max_in_flight, self._should_fetch_game)[0]
+        else:
+            scoreboard = scrape.fetch_master_scoreboard(date)
+            pages = {}
+
+        return self.process_scoreboard(date, scoreboard, pages)
+
+    def process_scoreboard(self, date, scoreboard, pages=None):
+        """Ingests the games listed in one day's master scoreboard
+
+        Parameters
+        ----------
+        date : datetime.datetime
+            The date of the scoreboard
+        scoreboard : dict
+            The decoded master_scoreboard.json for the date
+        pages : dict
+            Pages that have already been fetched, keyed by GameDay ID (see async_scrape.AsyncFetcher.fetch_date).
+            Games without an entry fetch their own pages.
+
+        Returns
+        -------
+        pygameday.pipeline.IngestSummary
+            The games that were written, skipped, or failed
+        """
+        open_dates = {}
+
+        # Games are fetched and parsed by the workers, and written here, by a single writer
+        with self._pipeline() as pipeline:
+            self._submit_scoreboard(pipeline, date, scoreboard, pages, open_dates)
+
+        self._checkpoint(pipeline, open_dates)
+        return pipeline.summary
+
+    def _submit_scoreboard(self, pipeline, date, scoreboard, pages=None, open_dates=None):
+        """Submits the games listed in one day's master scoreboard to a pipeline
+
+        The date is added to open_dates, with the manifest status of the games that were skipped, and the dates whose
+        games have all come out of the pipeline are recorded in the manifest.
         """
-        scoreboard = scrape.fetch_master_scoreboard(date)
+        games = async_scrape.scoreboard_games(scoreboard)
+        pages = pages or {}
 
         # Check if there are games on the date. If not, skip it.
-        game_data = scoreboard['data']['games']
-        if 'game' not in game_data or len(game_data['game']) == 0:
+        if len(games) == 0:
             logger.warning('No games found on {}'.format(date.date()))
 
-        else:
-            games = scoreboard['data']['games']['game']
+        game_statuses = {}
+        for game in games:
+            status = self._submit_game(pipeline, game, pages.get(game['id']))
+            if status is not None:
+                game_statuses[game['id']] = (status, None)
+
+        if open_dates is not None:
+            open_dates[date] = (scoreboard, game_statuses)
+            self._checkpoint(pipeline, open_dates)
+
+    def _checkpoint(self, pipeline, open_dates):
+        """Records the open dates none of whose games are in the pipeline any more in the manifest"""
+        for date, (scoreboard, game_statuses) in list(open_dates.items()):
+            games = async_scrape.scoreboard_games(scoreboard)
+            if any(game['id'] in pipeline.in_flight for game in games):
+                continue
+
+            # The games that went through the pipeline were either written or failed
+            for game in games:
+                if game['id'] not in game_statuses:
+                    error = pipeline.summary.failed.get(game['id'])
+                    game_statuses[game['id']] = (MANIFEST_FAILED, error) if error else (MANIFEST_DONE, None)
+
+            with self.engine.begin() as connection:
+                manifest.record_date(connection, date, manifest.date_status(scoreboard, game_statuses), game_statuses)
+            del open_dates[date]
+
+    def _pipeline(self):
+        """Returns a pipeline whose workers fetch and parse games, and which writes them with this client"""
+        # Each worker gets its own HTTP session; connections are never shared across processes. Workers that fetch
+        # their own pages make one request at a time, so they share a concurrency limiter that backs all of them off.
+        limiter = None
+        if self.n_workers > 1 and not self.max_in_flight:
+            limiter = AdaptiveLimiter(self.n_workers, self.fetch_policy, context=multiprocessing.get_context())
+
+        return GamePipeline(self.write_games, n_workers=self.n_workers, commit_every=self.commit_every,
+                            commit_every_rows=self.commit_every_rows, initializer=_init_worker,
+                            initargs=(self.n_workers, self.cache, self.source, self.fetch_policy, limiter),
+                            sinks=self.sinks)
+
+    def _skip_reason(self, game, pipeline=None):
+        """Returns why a scoreboard game entry should not be ingested, or None if it should
+
+        The reason is a (manifest status, message) tuple. The status is None for a game that is in the pipeline already.
+
+        The client's process is the only one that knows which games and players are in the database: workers never
+        write, and every game they parse comes back here to be written. So a game is skipped if it is in the database,
+        or if it is in the pipeline already, e.g. a suspended game listed again on the date it was completed.
+        """
+        if game['id'] in self.gameday_ids:
+            # The game has been processed and should already be in the database
+            return MANIFEST_DONE, "It's already in the DB."
 
-            if self.n_workers > 1:
-                # Process games in parallel
-                with ProcessPoolExecutor(max_workers=self.n_workers) as executor:
-                    executor.map(self.process_game, games)
-            else:
-                # Process games serially
-                for game in games:
-                    self.process_game(game)
+        if pipeline is not None and game['id'] in pipeline.in_flight:
+            return None, "It's already being ingested."
+
+        # If the game isn't Final, there is no data to ingest yet
+        if not async_scrape.is_final(game):
+            return MANIFEST_NOT_FINAL, "It contained no data, probably because its status isn't Final"
+
+        # A games type of 'S' (spring training) or 'E' (exhibition) means we won't ingest it if the flag is False
+        if not self.ingest_spring_training and game['game_type'] in ('S', 'E'):
+            return MANIFEST_SPRING, "It's a spring training or exhibition game."
+
+        return None
+
+    def _should_fetch_game(self, game, pipeline=None):
+        """Whether the pages of a scoreboard game entry need to be fetched for ingest"""
+        return self._skip_reason(game, pipeline) is None
 
-    # TODO: clean up this function
-    def process_game(self, game):
+    def _submit_game(self, pipeline, game, pages=None):
+        """Submits a game to a pipeline, or records why it is skipped
+
+        Returns
+        -------
+        str
+            The manifest status of a skipped game, or None if the game is in the pipeline
+        """
+        skip = self._skip_reason(game, pipeline)
+        if skip is None:
+            logger.info('Processing game ID {}'.format(game['id']))
+            pipeline.submit(game, pages)
+            return None
+
+        status, reason = skip
+        logger.warning('Skipping game: {}. {}'.format(game['id'], reason))
+        pipeline.skip(game['id'], reason)
+        return status
+
+    def process_game(self, game, pages=None):
         """Ingests a single game's GameDay data
 
+        The game is fetched, parsed and written in this process.
+
         Parameters
         ----------
         game : dict
             The game to process
+        pages : dict
+            The game's pages if they have already been fetched, keyed by 'hit_chart', 'players' and 'inning_all'.
+            If None, the pages are fetched here.
+
+        Returns
+        -------
+        pygameday.pipeline.IngestSummary
+            Whether the game was written, skipped, or failed
         """
-        # Create a new connection for each game so we don't run into weirdness with connections shared across
-        # processes or threads
-        engine = db_connect(self.database_uri)
-        session_maker = sessionmaker(bind=engine)
-        session = session_maker()
+        with GamePipeline(self.write_games, sinks=self.sinks) as pipeline:
+            self._submit_game(pipeline, game, pages)
 
-        game_dir = game["game_data_directory"]
-        gameday_id = game["id"]
+        return pipeline.summary
 
-        if gameday_id in self.gameday_ids:
-            # The game has been processed and should already be in the database
-            logger.warning("Skipping game: {}. It's already in the DB.".format(gameday_id))
-            return
-
-        # Parse the game
-        db_game = parse.parse_game(game)
-
-        # If no data comes back, the game probably wasn't Final. Abort.
-        if db_game is None:
-            logger.warning("Skipping game: {}. It contained no data, probably because its status isn't Final".format(
-                gameday_id))
-            return
+    def write_games(self, parsed_games):
+        """Writes parsed games to the database in one transaction
 
-        # If the game is a spring training game, skip it if ingest_spring_training is False
-        # A games type of 'S' (spring training) or 'E' (exhibition) means we won't ingest it if the flag is False
-        if not self.ingest_spring_training and (db_game.game_type == "S" or db_game.game_type == "E"):
-            logger.warning("Skipping game: {}. It's a spring training or exhibition game.".format(gameday_id))
-            return
-
-        logger.info("Processing game ID {}".format(gameday_id))
-
-        #
-        # Fetch game data
-        #
-        hit_chart_page = scrape.fetch_hit_chart(game_dir)
-        players_page = scrape.fetch_players(game_dir)
-        inning_all_page = scrape.fetch_inning_all(game_dir)
-
-        # Do some error checking
-        if hit_chart_page is None:
-            logger.error("Error fetching hit chart page for game {}".format(gameday_id))
-        if players_page is None:
-            logger.error("Error fetching players page for game {}".format(gameday_id))
-        if inning_all_page is None:
-            logger.error("Error fetching inning events page for game {}".format(gameday_id))
-
-        #
-        # Parse AtBats (including Pitches), HitsInPlay, Players
-        #
-        db_at_bats = parse.parse_inning_all(inning_all_page)  # Appends Pitches to AtBats
-        db_hips = parse.parse_hit_chart(hit_chart_page)
-        db_players = parse.parse_players(players_page)
-
-        #
-        # Append the AtBats to the Game. Note that Pitches are appended to AtBats
-        # when the AtBats are parsed, so we don't have to do anything with Pitches.
-        #
-        db_game.at_bats.extend(db_at_bats)
-
-        #
-        # Append the hits in play to the Game
-        #
-        db_game.hits_in_play.extend(db_hips)
-
-        #
-        # Add the players using the database session and commit
-        # This has to be done one at a time (instead of using session.add_all)
-        # because add_all will fail if ANY of the players in the list are
-        # duplicated, which could lead to some players being excluded from
-        # the database.
-        #
-        for player in db_players:
-
-            if int(player.player_id) in self.player_ids:
-                # The player has been processed and should already be in the database
-                logger.debug("Skipping player {} because it has already been processed.".format(player.player_id))
-
-            else:
-                # We haven't inserted this player yet
-                error_occurred = False
-
-                try:
-                    session.add(player)
-                    session.commit()
-
-                except IntegrityError:
-                    # If an IntegrityError occurs, it's probably because the data
-                    # has already been inserted.
-                    session.rollback()
-                    msg = ("IntegrityError when inserting player {}, "
-                           "probably because it's already in the database".format(str(player)))
-                    logger.warning(msg)
-                    error_occurred = True
-
-                except Exception as ex:
-                    # Just log other exceptions for now, and continue
-                    session.rollback()
-                    logger.exception('An error occurred', ex)
-                    error_occurred = True
-
-                if not error_occurred:
-                    self.player_ids.add(player.player_id)
-
-        #
-        # Insert the game data
-        #
-        if db_game.gameday_id in self.gameday_ids:
-            # The game has been processed and should already be in the database
-            logger.info("Skipping game: {} because it has already been ingested.".format(db_game.gameday_id))
+        The players we haven't seen yet are inserted with a single upsert, then the games with their at bats, pitches
+        and hits in play. This is the pipeline's writer; it runs in the process that owns the client, and keeps the
+        client's record of the games and players in the database up to date.
 
-        else:
-            # We haven't inserted this game yet
-            error_occurred = False
-
-            try:
-                session.add(db_game)
-                session.commit()
-
-            except IntegrityError:
-                # If an IntegrityError occurs, it's probably because the data
-                # has already been inserted.
-                session.rollback()
-                msg = ("IntegrityError when inserting game: {}, "
-                       "probably because it's already in the database".format(db_game.gameday_id))
-                logger.error(msg)
-                error_occurred = True
-
-            except Exception as ex:
-                # Just log other exceptions for now, and continue
-                session.rollback()
-                logger.exception('Something went wrong', ex)
-                error_occurred = True
-
-            if not error_occurred:
-                self.gameday_ids.add(db_game.gameday_id)
-
-        # We are done
-        session.close()
+        Parameters
+        ----------
+        parsed_games : list of records.ParsedGame
+            The games to write
+
+        Returns
+        -------
+        writer.WriteStats
+            The number of rows written and the time it took, and the games that were left out because they were
+            already in the database
+        """
+        with self.engine.begin() as connection:
+            # Another client may have written some of these games since this one read the database. They are looked
+            # up with one query and left out, rather than letting the unique gameday_id fail the whole transaction.
+            existing = writer.existing_gameday_ids(connection, [parsed.game.gameday_id for parsed in parsed_games])
+            if existing:
+                logger.warning('Not writing {} games that are already in the DB: {}'.format(
+                    len(existing), ', '.join(sorted(existing))))
+                self.gameday_ids.update(existing)
+                parsed_games = [parsed for parsed in parsed_games if parsed.game.gameday_id not in existing]
+
+            new_players = [p for parsed in parsed_games for p in parsed.players if p.player_id not in self.player_ids]
+            player_ids = writer.upsert_players(connection, new_players)
+            stats = LOADERS[self.loader](connection, parsed_games)
+
+        stats.players = len(player_ids)
+        stats.existing = existing
+        self.player_ids.update(player_ids)
+        self.gameday_ids.update(parsed.game.gameday_id for parsed in parsed_games)
+        logger.debug('Inserted {} games and {} new players: {}'.format(len(parsed_games), len(player_ids), stats))
+        return stats
+
+    @staticmethod
+    def _log_summary(summary):
+        """Logs the outcome of an ingest"""
+        logger.info('Ingested {} games ({} rows); skipped {}; {} failed'.format(
+            len(summary.succeeded), summary.stats.rows, len(summary.skipped), len(summary.failed)))
+        for gameday_id, error in sorted(summary.failed.items()):
+            logger.error('Failed game {}: {}'.format(gameday_id, error))
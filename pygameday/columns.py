@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Provides batch type coercion of record columns with NumPy
+
+The parsers convert values one at a time as they build records. Bulk consumers (the pitch store, analysis code, column
+writers) want typed arrays instead, a column at a time, for a game or for a whole day of games. coerce_column converts
+a whole column in one call, whether it holds raw GameDay attribute strings or values that are already converted.
+
+Missing values are handled the same way everywhere, which is also how reader.column_arrays handles them:
+
+    - Float columns become float64 arrays. Missing values ('' or None) and malformed values become NaN.
+    - Integer columns become int64 arrays. If any value is missing they become float64 arrays with NaN, as with
+      pandas.read_sql.
+    - Other columns become object arrays of the values as they are.
+
+missing() returns where the values were missing, so writers can store NULL there.
+
+NumPy is needed for this module (pip install pygameday[analysis]).
+"""
+import logging
+
+from sqlalchemy import Float
+from sqlalchemy import Integer
+
+from .models import Pitch
+from .records import PitchRecord
+from .records import to_float
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; see the 'analysis' extra in setup.py
+    np = None
+
+logger = logging.getLogger(__name__)
+
+
+def coerce_column(values, column_type):
+    """Converts a column of values to a typed array in one call
+
+    Parameters
+    ----------
+    values : sequence
+        The values: raw GameDay attribute strings, Python numbers, or None for missing values
+    column_type : sqlalchemy type
+        The type of the column the values belong to, e.g. Float()
+
+    Returns
+    -------
+    numpy.ndarray
+        The values, typed as described in the module docstring
+    """
+    _require_numpy()
+    if isinstance(column_type, (Float, Integer)):
+        try:
+            # NumPy converts numbers, numeric strings and None (to NaN) without a Python call per value
+            array = np.array(values, dtype=np.float64)
+        except (TypeError, ValueError):
+            try:
+                # Empty strings are how GameDay attributes are usually missing
+                array = np.array([None if value == '' else value for value in values], dtype=np.float64)
+            except (TypeError, ValueError):
+                # Malformed values; only this column takes the slow path
+                array = np.array([to_float(value) for value in values], dtype=np.float64)
+                logger.debug('Coerced a column of {} values with malformed values'.format(len(values)))
+
+        if isinstance(column_type, Integer) and not np.isnan(array).any():
+            array = array.astype(np.int64)
+        return array
+
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def missing(array):
+    """Returns a boolean array that is True where a column coerced by coerce_column has no value (NaN or None)"""
+    if array.dtype == np.float64:
+        return np.isnan(array)
+    if array.dtype == object:
+        return np.equal(array, None)
+    return np.zeros(len(array), dtype=bool)
+
+
+def record_columns(records, record_class, column_types):
+    """Converts records to one typed array per field
+
+    Parameters
+    ----------
+    records : list of namedtuple
+        The records, e.g. every PitchRecord of a day
+    record_class : namedtuple class
+        The class of the records
+    column_types : dict
+        The sqlalchemy type of each field, by field name
+
+    Returns
+    -------
+    dict
+        The array of each field, by field name
+    """
+    _require_numpy()
+    values = list(zip(*records)) if records else [()] * len(record_class._fields)
+    return {name: coerce_column(field_values, column_types[name])
+            for name, field_values in zip(record_class._fields, values)}
+
+
+def pitch_columns(parsed_games):
+    """Converts the pitches of parsed games to one typed array per column
+
+    Parameters
+    ----------
+    parsed_games : list of records.ParsedGame
+        The games, e.g. a batch written by the ingest pipeline or a whole day
+
+    Returns
+    -------
+    dict
+        The array of each PitchRecord field, by name, plus 'game_index' (the position of each pitch's game in
+        parsed_games) and the 'batter_id' and 'pitcher_id' of each pitch's at bat
+    """
+    _require_numpy()
+    pitches = []
+    game_index = []
+    batter_ids = []
+    pitcher_ids = []
+
+    for index, parsed in enumerate(parsed_games):
+        pitches.extend(parsed.pitches)
+        game_index.extend([index] * len(parsed.pitches))
+        at_bats = parsed.at_bats
+        batter_ids.extend(at_bats[pitch.at_bat_index].batter_id for pitch in parsed.pitches)
+        pitcher_ids.extend(at_bats[pitch.at_bat_index].pitcher_id for pitch in parsed.pitches)
+
+    column_types = {name: Integer() if name == 'at_bat_index' else Pitch.__table__.columns[name].type
+                    for name in PitchRecord._fields}
+    columns = record_columns(pitches, PitchRecord, column_types)
+    columns['game_index'] = np.array(game_index, dtype=np.int64)
+    columns['batter_id'] = coerce_column(batter_ids, Integer())
+    columns['pitcher_id'] = coerce_column(pitcher_ids, Integer())
+    return columns
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError('Coercing columns requires NumPy: pip install pygameday[analysis]')
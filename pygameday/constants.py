@@ -7,6 +7,59 @@
 #
 GD_SERVER = 'gd2.mlb.com'
 GD_BASE_PATH = '/components/game/mlb'
+GD_FINAL_STATUSES = ('Final', 'Completed Early')  # Game statuses whose data will not change any more
+
+# ----------------------------------------------------------------------------------------------------------------------
+# HTTP session
+#
+HTTP_POOL_MAXSIZE = 4  # Connections kept alive per host, per process
+HTTP_HEADERS = {
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+FETCH_CONNECT_TIMEOUT = 5  # Seconds
+FETCH_READ_TIMEOUT = 30  # Seconds
+FETCH_MAX_RETRIES = 4
+FETCH_BACKOFF_FACTOR = 0.5  # Seconds before the first retry; doubles with each retry
+FETCH_BACKOFF_MAX = 30  # Seconds
+FETCH_RETRY_STATUSES = (429, 500, 502, 503, 504)
+FETCH_LATENCY_TARGET = 5.0  # Seconds; slower responses make the fetcher reduce its concurrency
+FETCH_ERROR_THRESHOLD = 0.2  # Fraction of failing requests that makes the fetcher reduce its concurrency
+ASYNC_MAX_IN_FLIGHT = 16  # Default limit on concurrent requests for the asyncio fetch engine
+ASYNC_DATE_WINDOW = 7  # Number of dates fetched concurrently before their games are ingested
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Ingest pipeline
+#
+PIPELINE_PENDING_PER_WORKER = 2  # Games being fetched or parsed, per worker process
+PIPELINE_COMMIT_EVERY = 50  # Games written per transaction
+MANIFEST_DONE = 'done'  # Game written, or date whose games will all never need ingesting again
+MANIFEST_NOT_FINAL = 'not_final'  # Game that wasn't final when it was seen
+MANIFEST_SPRING = 'spring'  # Spring training or exhibition game that was left out, or date done but for those
+MANIFEST_FAILED = 'failed'  # Game that could not be fetched, parsed or written
+MANIFEST_PARTIAL = 'partial'  # Date with games that may still need ingesting
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Database
+#
+READ_CHUNK_SIZE = 100000  # Rows converted to arrays at a time when reading pitches
+PITCH_STORE_BUILD_GAMES = 500  # Games read from the database at a time when building a pitch store
+BULK_LOAD_DEFER_INDEXES_DATES = 30  # Dates a bulk load must cover for its indexes to be dropped and rebuilt
+SQLITE_BULK_PRAGMAS = (  # Connection settings of the SQLite bulk-load profile
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),  # Sync at checkpoints only, not at every commit
+    ('cache_size', -262144),  # 256 MB; a negative size is in KiB
+    ('temp_store', 'MEMORY'),
+)
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Page cache
+#
+CACHE_MAX_BYTES = 2e9  # 2 GB
+CACHE_EVICT_TARGET = 0.9  # Eviction frees space until the cache is at this fraction of its budget
+CACHE_SCOREBOARD_TTL = 3600  # Seconds before a scoreboard for a recent or unfinished date is fetched again
+CACHE_SCOREBOARD_SETTLE_DAYS = 2  # Scoreboards older than this many days can be cached permanently
+CACHE_SETTLED_STATUSES = ('Final', 'Completed Early', 'Postponed', 'Cancelled')  # Statuses that won't change again
 
 # ----------------------------------------------------------------------------------------------------------------------
 # Logging
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Provides the ingest manifest, which records the outcome of every date and game an ingest has seen
+
+The manifest lets an interrupted ingest resume cheaply. GameDayClient.process_date_range skips the dates that are done
+without any network I/O; on the other dates, only games that are not in the database yet, such as failed ones, are
+fetched again.
+
+A date is done once its scoreboard was read and every game on it was written or is not final with a status that won't
+change (e.g. postponed). A date that would be done but for spring training games that were left out is recorded as
+spring: it is only skipped by clients that leave spring training out too. Otherwise a date is partial, and is looked
+at again next time.
+"""
+import logging
+from datetime import datetime
+
+from sqlalchemy import select
+
+from .async_scrape import scoreboard_games
+from .constants import CACHE_SETTLED_STATUSES
+from .constants import MANIFEST_DONE
+from .constants import MANIFEST_NOT_FINAL
+from .constants import MANIFEST_PARTIAL
+from .constants import MANIFEST_SPRING
+from .models import IngestDate
+from .models import IngestGame
+
+logger = logging.getLogger(__name__)
+
+
+def game_date(gameday_id):
+    """Returns the date of a game from its GameDay ID, e.g. 2018/04/06/nynmlb-wasmlb-1"""
+    return datetime.strptime(gameday_id[:10], '%Y/%m/%d').date()
+
+
+def date_status(scoreboard, game_statuses):
+    """Returns the manifest status of a date
+
+    Parameters
+    ----------
+    scoreboard : dict
+        The decoded master_scoreboard.json of the date, or None if it couldn't be fetched
+    game_statuses : dict
+        (status, error) tuples of the games on the scoreboard, by GameDay ID
+
+    Returns
+    -------
+    str
+        MANIFEST_DONE if no game on the date will ever need ingesting again, MANIFEST_SPRING if only the spring training
+        games that were left out might, MANIFEST_PARTIAL otherwise
+    """
+    if scoreboard is None:
+        return MANIFEST_PARTIAL
+
+    status = MANIFEST_DONE
+    for game in scoreboard_games(scoreboard):
+        game_status, _ = game_statuses.get(game['id'], (None, None))
+        if game_status == MANIFEST_DONE:
+            continue
+        if game_status == MANIFEST_SPRING:
+            # Left out because of a client option, so a client with the other setting must still see the date
+            status = MANIFEST_SPRING
+            continue
+        if game_status == MANIFEST_NOT_FINAL and game['status']['status'] in CACHE_SETTLED_STATUSES:
+            continue
+        return MANIFEST_PARTIAL
+
+    return status
+
+
+def finished_dates(connection, dates, ingest_spring_training=False):
+    """Returns which of the given dates are done
+
+    Parameters
+    ----------
+    connection : sqlalchemy.engine.Connection
+    dates : iterable of datetime.datetime or datetime.date
+    ingest_spring_training : bool
+        Whether spring training games are ingested. If so, dates with spring training games that were left out are not
+        done.
+
+    Returns
+    -------
+    set of datetime.date
+    """
+    days = {d.date() if isinstance(d, datetime) else d for d in dates}
+    if not days:
+        return set()
+
+    statuses = [MANIFEST_DONE] if ingest_spring_training else [MANIFEST_DONE, MANIFEST_SPRING]
+    table = IngestDate.__table__
+    query = select(table.c.date).where(table.c.status.in_(statuses)).where(table.c.date.in_(days))
+    return set(connection.execute(query).scalars())
+
+
+def record_date(connection, date, status, game_statuses):
+    """Records the outcome of a date and of its games in the manifest
+
+    Parameters
+    ----------
+    connection : sqlalchemy.engine.Connection
+        A connection in a transaction
+    date : datetime.datetime or datetime.date
+        The date
+    status : str
+        The date's manifest status
+    game_statuses : dict
+        (status, error) tuples of the date's games, by GameDay ID. error is None unless the game failed.
+    """
+    day = date.date() if isinstance(date, datetime) else date
+    now = datetime.now()
+
+    date_table = IngestDate.__table__
+    connection.execute(date_table.delete().where(date_table.c.date == day))
+    connection.execute(date_table.insert(), [{'date': day, 'status': status, 'n_games': len(game_statuses),
+                                              'updated': now}])
+
+    if game_statuses:
+        game_table = IngestGame.__table__
+        connection.execute(game_table.delete().where(game_table.c.gameday_id.in_(list(game_statuses))))
+        connection.execute(game_table.insert(), [
+            {'gameday_id': gameday_id, 'date': game_date(gameday_id), 'status': game_status, 'error': error,
+             'updated': now}
+            for gameday_id, (game_status, error) in game_statuses.items()])
+
+    logger.debug('Recorded {} as {} with {} games'.format(day, status, len(game_statuses)))
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Downloads GameDay pages for a range of dates into a local mirror directory
+
+The mirror has the same layout as the GameDay server, so it can be read back with sources.DirectorySource, or archived
+and read with sources.ArchiveSource:
+
+    <directory>/components/game/mlb/year_YYYY/month_MM/day_DD/master_scoreboard.json
+    <directory>/components/game/mlb/year_YYYY/month_MM/day_DD/gid_*/players.xml
+    <directory>/components/game/mlb/year_YYYY/month_MM/day_DD/gid_*/inning/inning_all.xml
+    <directory>/components/game/mlb/year_YYYY/month_MM/day_DD/gid_*/inning/inning_hit.xml
+
+Usage:
+    python -m pygameday.mirror 2018-04-01 2018-04-30 gameday_mirror
+"""
+import argparse
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from dateutil import parser
+from tqdm import tqdm
+
+from . import scrape
+from .async_scrape import GAME_PAGE_FETCHERS
+from .async_scrape import is_final
+from .async_scrape import scoreboard_games
+from .constants import ASYNC_DATE_WINDOW
+from .constants import ASYNC_MAX_IN_FLIGHT
+
+logger = logging.getLogger(__name__)
+
+
+# Paths of the game pages relative to the game directory, keyed like async_scrape.GAME_PAGE_FETCHERS
+GAME_PAGE_PATHS = {
+    'hit_chart': '/inning/inning_hit.xml',
+    'players': '/players.xml',
+    'inning_all': '/inning/inning_all.xml',
+}
+
+
+def mirror_path(directory, page):
+    """Returns the file path of a page within a mirror directory
+
+    Parameters
+    ----------
+    directory : str
+        The root of the mirror
+    page : scrape.Page
+        A page fetched from the GameDay server
+    """
+    return os.path.join(directory, *urlsplit(page.url).path.strip('/').split('/'))
+
+
+def mirror_date_range(start_date, end_date, directory, max_in_flight=ASYNC_MAX_IN_FLIGHT, final_only=True):
+    """Downloads the scoreboards and game pages for a range of dates into a mirror directory
+
+    Pages that are already in the mirror are not downloaded again.
+
+    Parameters
+    ----------
+    start_date : datetime.datetime
+        The first date to mirror
+    end_date : datetime.datetime
+        The last date to mirror (inclusive)
+    directory : str
+        The root of the mirror
+    max_in_flight : int
+        The maximum number of concurrent requests
+    final_only : bool
+        Whether to only download the pages of games whose status is final
+
+    Returns
+    -------
+    int
+        The number of pages written
+    """
+    if end_date < start_date:
+        start_date, end_date = end_date, start_date
+
+    date_range = [start_date + timedelta(day) for day in range((end_date - start_date).days + 1)]
+    n_written = 0
+
+    def save(page):
+        if page is None:
+            return 0
+        scrape.save_page(page, mirror_path(directory, page))
+        return 1
+
+    def fetch_missing(fetcher, game_directory, relative_path):
+        if os.path.exists(os.path.join(directory, *(game_directory + relative_path).strip('/').split('/'))):
+            return None
+        return fetcher(game_directory)
+
+    scrape.ensure_pool_size(max_in_flight)
+    logger.info('Mirroring GameDay data from {} to {} into {}'.format(start_date.date(), end_date.date(), directory))
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        for i in tqdm(range(0, len(date_range), ASYNC_DATE_WINDOW)):
+            window = date_range[i:i + ASYNC_DATE_WINDOW]
+            scoreboard_pages = list(executor.map(scrape.fetch_master_scoreboard_page, window))
+            n_written += sum(save(page) for page in scoreboard_pages)
+
+            futures = []
+            for page in scoreboard_pages:
+                games = scoreboard_games(scrape.decode_scoreboard_page(page)) if page is not None else []
+                for game in games:
+                    if final_only and not is_final(game):
+                        continue
+                    game_directory = game['game_data_directory']
+                    for name, fetcher in GAME_PAGE_FETCHERS:
+                        relative_path = GAME_PAGE_PATHS[name]
+                        futures.append(executor.submit(fetch_missing, fetcher, game_directory, relative_path))
+
+            n_written += sum(save(future.result()) for future in futures)
+
+    logger.info('Wrote {} pages to {}'.format(n_written, directory))
+    return n_written
+
+
+def main(args=None):
+    arg_parser = argparse.ArgumentParser(description='Download GameDay pages for a range of dates into a local mirror')
+    arg_parser.add_argument('start_date', help='The first date to mirror, e.g. 2018-04-01')
+    arg_parser.add_argument('end_date', help='The last date to mirror, e.g. 2018-04-30')
+    arg_parser.add_argument('directory', help='The root directory of the mirror')
+    arg_parser.add_argument('--max-in-flight', type=int, default=ASYNC_MAX_IN_FLIGHT,
+                            help='The maximum number of concurrent requests [Default: {}]'.format(ASYNC_MAX_IN_FLIGHT))
+    arg_parser.add_argument('--all-games', action='store_true',
+                            help='Also download the pages of games that are not final')
+    parsed = arg_parser.parse_args(args)
+
+    scrape.configure_session(pool_maxsize=parsed.max_in_flight)
+    mirror_date_range(parser.parse(parsed.start_date), parser.parse(parsed.end_date), parsed.directory,
+                      max_in_flight=parsed.max_in_flight, final_only=not parsed.all_games)
+
+
+if __name__ == '__main__':
+    main()
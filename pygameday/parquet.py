@@ -0,0 +1,462 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Provides export and ingest of parsed games as Parquet datasets, partitioned by season and date
+
+Each table is a Hive-partitioned dataset under a root directory:
+
+    <root>/pitches/season=2018/date=2018-04-06/part-<id>-0.parquet
+    <root>/at_bats/...
+    <root>/hits_in_play/...
+    <root>/games/...
+    <root>/players/...
+
+Schemas are typed from the columns in models.py. The database's surrogate keys (game_id, at_bat_id, ...) are replaced
+by keys that don't depend on the database, so exports from the ingest pipeline and from the database have the same
+layout: every row carries its game's gameday_id, at bats and pitches carry the at bat's position in the game,
+at_bat_index, and hits in play their position in the game, hip_index.
+
+The two paths hold the same at bats, pitches and hits in play, but the database keeps less than the GameDay pages do:
+
+    - The players dataset lists each game's players. The pipeline writes both rosters from players.xml; the
+      database doesn't record rosters, so an export lists the players who batted or pitched in the game.
+    - start_time is a wall time without a time zone, and utc_offset its offset from UTC in minutes. The pipeline
+      writes the scoreboard's local time and offset. The database doesn't store the local offset: an export from
+      SQLite, which drops time zones, has the local wall time and a null offset, and an export from a database that
+      keeps them, such as PostgreSQL, has the time in UTC and an offset of 0. Where the offset is known, the instant
+      is the same on every path.
+
+Downstream jobs can read only the columns they need, and filters on season and date prune whole partitions, e.g.
+
+    pyarrow.dataset.dataset('<root>/pitches', partitioning='hive').to_table(
+        columns=['px', 'pz'], filter=pyarrow.dataset.field('season') == 2018)
+
+PyArrow is needed for this module (pip install pygameday[parquet]).
+"""
+import logging
+import uuid
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+from sqlalchemy import Date
+from sqlalchemy import DateTime
+from sqlalchemy import Float
+from sqlalchemy import Integer
+from sqlalchemy import select
+
+from .models import AtBat
+from .models import Game
+from .models import HitInPlay
+from .models import Pitch
+from .models import Player
+from .records import AtBatRecord
+from .records import GameRecord
+from .records import HitInPlayRecord
+from .records import ParsedGame
+from .records import PitchRecord
+from .records import PlayerRecord
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:  # PyArrow is optional; see the 'parquet' extra in setup.py
+    pa = None
+    ds = None
+
+logger = logging.getLogger(__name__)
+
+# The datasets, with the record and model of their rows and the ParsedGame field they come from
+DATASETS = (
+    ('games', GameRecord, Game, 'game'),
+    ('at_bats', AtBatRecord, AtBat, 'at_bats'),
+    ('pitches', PitchRecord, Pitch, 'pitches'),
+    ('hits_in_play', HitInPlayRecord, HitInPlay, 'hits_in_play'),
+    ('players', PlayerRecord, Player, 'players'),
+)
+
+
+def _arrow_type(column):
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, DateTime):
+        # Wall times; the offset of a time zone aware column is stored next to it (see _extra_fields)
+        return pa.timestamp('us')
+    if isinstance(column.type, Date):
+        return pa.date32()
+    return pa.string()
+
+
+def partition_schema():
+    """Returns the schema of the season and date partition keys"""
+    _require_pyarrow()
+    return pa.schema([('season', pa.int16()), ('date', pa.date32())])
+
+
+def _key_fields(name):
+    """Returns the fields, besides the record's, that tie a dataset's rows to their game and position in it"""
+    if name == 'games':
+        return []
+    if name == 'at_bats':
+        return ['gameday_id', 'at_bat_index']
+    if name == 'hits_in_play':
+        return ['gameday_id', 'hip_index']
+    return ['gameday_id']
+
+
+def _extra_fields(name):
+    """Returns the names of the fields stored after the record's, which are derived from its values"""
+    return ['utc_offset'] if name == 'games' else []
+
+
+def _split_time(value):
+    """Splits a start time into its wall time and its offset from UTC in minutes (None if it has no time zone)"""
+    if value is None or value.utcoffset() is None:
+        return value, None
+    return value.replace(tzinfo=None), int(value.utcoffset().total_seconds()) // 60
+
+
+def _utc(value):
+    """Converts a time zone aware datetime to UTC, e.g. one a database returned in its session's time zone"""
+    if value is None or value.utcoffset() is None:
+        return value
+    return value.astimezone(timezone.utc)
+
+
+def _join_time(wall_time, utc_offset):
+    """Inverse of _split_time"""
+    if wall_time is None or utc_offset is None:
+        return wall_time
+    return wall_time.replace(tzinfo=timezone(timedelta(minutes=utc_offset)))
+
+
+def dataset_schema(name):
+    """Returns the Arrow schema of a dataset's files
+
+    Parameters
+    ----------
+    name : str
+        The dataset, one of the names in DATASETS
+
+    Returns
+    -------
+    pyarrow.Schema
+        The key fields (gameday_id, and the position in the game of at bats and hits in play), the fields of the
+        dataset's record, utc_offset for games, and the season and date partition keys
+    """
+    _require_pyarrow()
+    _, record_class, model, _ = _dataset(name)
+    fields = []
+    for field_name in _key_fields(name) + list(record_class._fields):
+        if field_name == 'gameday_id':
+            fields.append(pa.field(field_name, pa.string()))
+        elif field_name in ('at_bat_index', 'hip_index'):
+            fields.append(pa.field(field_name, pa.int32()))
+        else:
+            fields.append(pa.field(field_name, _arrow_type(model.__table__.columns[field_name])))
+    for field_name in _extra_fields(name):
+        fields.append(pa.field(field_name, pa.int16()))
+
+    return pa.schema(fields + list(partition_schema()))
+
+
+def _dataset(name):
+    for dataset in DATASETS:
+        if dataset[0] == name:
+            return dataset
+    raise ValueError("Unknown dataset '{}'".format(name))
+
+
+def _dataset_path(directory, name):
+    return '{}/{}'.format(directory.rstrip('/'), name)
+
+
+def games_table(parsed_games, name):
+    """Builds the Arrow table of one dataset from parsed games
+
+    Parameters
+    ----------
+    parsed_games : list of records.ParsedGame
+    name : str
+        The dataset, one of the names in DATASETS
+
+    Returns
+    -------
+    pyarrow.Table
+    """
+    _, _, _, parsed_field = _dataset(name)
+    schema = dataset_schema(name)
+    columns = {column_name: [] for column_name in schema.names}
+
+    for parsed in parsed_games:
+        gameday_id = parsed.game.gameday_id
+        day = datetime.strptime(gameday_id[:10], '%Y/%m/%d').date()
+        records = [parsed.game] if parsed_field == 'game' else getattr(parsed, parsed_field)
+
+        for record in records:
+            for field_name, value in zip(record._fields, record):
+                columns[field_name].append(value)
+        if name == 'games':
+            wall_time, utc_offset = _split_time(parsed.game.start_time)
+            columns['start_time'][-1] = wall_time
+            columns['utc_offset'].append(utc_offset)
+
+        if name != 'games':
+            columns['gameday_id'].extend([gameday_id] * len(records))
+        if name in ('at_bats', 'hits_in_play'):
+            columns[_key_fields(name)[1]].extend(range(len(records)))
+        columns['season'].extend([day.year] * len(records))
+        columns['date'].extend([day] * len(records))
+
+    return pa.table(columns, schema=schema)
+
+
+def write_parsed_games(directory, parsed_games, replace=False):
+    """Writes parsed games to the Parquet datasets under a directory
+
+    Parameters
+    ----------
+    directory : str
+        The root of the datasets
+    parsed_games : list of records.ParsedGame
+        The games to write
+    replace : bool
+        Whether to delete the files already in the dates being written. Otherwise new files are added next to them.
+    """
+    _require_pyarrow()
+    if not parsed_games:
+        return
+
+    partitioning = ds.partitioning(partition_schema(), flavor='hive')
+    basename = 'part-{}-{{i}}.parquet'.format(uuid.uuid4().hex)
+    behavior = 'delete_matching' if replace else 'overwrite_or_ignore'
+
+    for name, _, _, _ in DATASETS:
+        ds.write_dataset(games_table(parsed_games, name), _dataset_path(directory, name), format='parquet',
+                         partitioning=partitioning, basename_template=basename, existing_data_behavior=behavior)
+
+    logger.debug('Wrote {} games to {}'.format(len(parsed_games), directory))
+
+
+class ParquetSink(object):
+    """Writes every batch of games the ingest pipeline stores in the database to Parquet datasets as well
+    """
+    def __init__(self, directory):
+        """Constructor
+
+        Parameters
+        ----------
+        directory : str
+            The root of the datasets
+        """
+        _require_pyarrow()
+        self.directory = directory
+
+    def __call__(self, parsed_games):
+        write_parsed_games(self.directory, parsed_games)
+
+    def __repr__(self):
+        return '<ParquetSink({})>'.format(self.directory)
+
+
+def db_parsed_games(connection, date):
+    """Reads the games of a date back from the database as parsed games
+
+    Parameters
+    ----------
+    connection : sqlalchemy.engine.Connection
+    date : datetime.datetime or datetime.date
+
+    Returns
+    -------
+    list of records.ParsedGame
+        The games, with their players being those who batted or pitched in them. SQLite doesn't store time zones, so
+        start times read from it are local wall times without one; start times read from databases that store them
+        are in UTC, whatever the session's time zone.
+    """
+    games, at_bats, pitches, hips, players = (model.__table__ for model in (Game, AtBat, Pitch, HitInPlay, Player))
+    prefix = '{:%Y/%m/%d}/'.format(date)
+
+    game_rows = connection.execute(select(games).where(games.c.gameday_id.startswith(prefix))
+                                   .order_by(games.c.gameday_id)).all()
+    if not game_rows:
+        return []
+
+    game_ids = [row.game_id for row in game_rows]
+    at_bat_rows = connection.execute(select(at_bats).where(at_bats.c.game_id.in_(game_ids))
+                                     .order_by(at_bats.c.at_bat_id)).all()
+    at_bat_ids = [row.at_bat_id for row in at_bat_rows]
+    pitch_rows = connection.execute(select(pitches).where(pitches.c.at_bat_id.in_(at_bat_ids))
+                                    .order_by(pitches.c.pitch_id)).all() if at_bat_ids else []
+    hip_rows = connection.execute(select(hips).where(hips.c.game_id.in_(game_ids))
+                                  .order_by(hips.c.hip_id)).all()
+
+    # Position of each at bat within its game
+    at_bat_positions = {}
+    at_bats_by_game = {game_id: [] for game_id in game_ids}
+    for row in at_bat_rows:
+        at_bat_positions[row.at_bat_id] = (row.game_id, len(at_bats_by_game[row.game_id]))
+        at_bats_by_game[row.game_id].append(AtBatRecord(*(row._mapping[f] for f in AtBatRecord._fields)))
+
+    pitches_by_game = {game_id: [] for game_id in game_ids}
+    for row in pitch_rows:
+        game_id, at_bat_index = at_bat_positions[row.at_bat_id]
+        values = [at_bat_index] + [row._mapping[f] for f in PitchRecord._fields[1:]]
+        pitches_by_game[game_id].append(PitchRecord(*values))
+
+    hips_by_game = {game_id: [] for game_id in game_ids}
+    for row in hip_rows:
+        hips_by_game[row.game_id].append(HitInPlayRecord(*(row._mapping[f] for f in HitInPlayRecord._fields)))
+
+    player_ids_by_game = {game_id: set() for game_id in game_ids}
+    for row in at_bat_rows:
+        player_ids_by_game[row.game_id].update((row.batter_id, row.pitcher_id))
+    all_player_ids = set().union(*player_ids_by_game.values())
+    player_records = {row.player_id: PlayerRecord(*(row._mapping[f] for f in PlayerRecord._fields))
+                      for row in connection.execute(select(players).where(players.c.player_id.in_(all_player_ids)))}
+
+    return [ParsedGame(game=GameRecord(*(row._mapping[f] for f in GameRecord._fields))._replace(
+                           start_time=_utc(row.start_time)),
+                       at_bats=at_bats_by_game[row.game_id],
+                       pitches=pitches_by_game[row.game_id],
+                       hits_in_play=hips_by_game[row.game_id],
+                       players=[player_records[pid] for pid in sorted(player_ids_by_game[row.game_id])
+                                if pid in player_records])
+            for row in game_rows]
+
+
+def export_date_range(engine, directory, start_date, end_date):
+    """Exports the games of a range of dates from the database to Parquet datasets
+
+    Each date's partitions are replaced, so exporting a date again doesn't duplicate its rows.
+
+    Parameters
+    ----------
+    engine : sqlalchemy engine instance
+    directory : str
+        The root of the datasets
+    start_date : datetime.datetime or datetime.date
+        The first date to export
+    end_date : datetime.datetime or datetime.date
+        The last date to export (inclusive)
+
+    Returns
+    -------
+    int
+        The number of games exported
+    """
+    _require_pyarrow()
+    start_date, end_date = _as_date(start_date), _as_date(end_date)
+    n_games = 0
+
+    with engine.connect() as connection:
+        for day in range((end_date - start_date).days + 1):
+            parsed_games = db_parsed_games(connection, start_date + timedelta(day))
+            write_parsed_games(directory, parsed_games, replace=True)
+            n_games += len(parsed_games)
+
+    logger.info('Exported {} games from {} to {} into {}'.format(n_games, start_date, end_date, directory))
+    return n_games
+
+
+def read_parsed_games(directory, start_date=None, end_date=None):
+    """Reads parsed games back from the Parquet datasets under a directory
+
+    Parameters
+    ----------
+    directory : str
+        The root of the datasets
+    start_date : datetime.datetime or datetime.date
+        If set, only games on or after this date are read
+    end_date : datetime.datetime or datetime.date
+        If set, only games on or before this date are read
+
+    Returns
+    -------
+    list of records.ParsedGame
+        The games, in order of GameDay ID
+    """
+    return [parsed for day_games in iter_parsed_games(directory, start_date, end_date) for parsed in day_games]
+
+
+def iter_parsed_games(directory, start_date=None, end_date=None):
+    """Reads parsed games back from the Parquet datasets under a directory, a date at a time
+
+    Only one date's rows are held in memory at once, so a whole season can be read this way.
+
+    Parameters
+    ----------
+    directory : str
+        The root of the datasets
+    start_date : datetime.datetime or datetime.date
+        If set, only games on or after this date are read
+    end_date : datetime.datetime or datetime.date
+        If set, only games on or before this date are read
+
+    Yields
+    ------
+    list of records.ParsedGame
+        The games of each date, in order of date and then of GameDay ID
+    """
+    _require_pyarrow()
+    condition = None
+    if start_date is not None:
+        condition = ds.field('date') >= _as_date(start_date)
+    if end_date is not None:
+        before_end = ds.field('date') <= _as_date(end_date)
+        condition = before_end if condition is None else condition & before_end
+
+    partitioning = ds.partitioning(partition_schema(), flavor='hive')
+    datasets = {name: ds.dataset(_dataset_path(directory, name), format='parquet', partitioning=partitioning)
+                for name, _, _, _ in DATASETS}
+
+    # Only the partition key is read to find the dates
+    days = datasets['games'].to_table(columns=['date'], filter=condition).column('date').unique().to_pylist()
+    for day in sorted(days):
+        # The date filter prunes every other partition
+        yield _read_date(datasets, ds.field('date') == day)
+
+
+def _read_date(datasets, condition):
+    """Reads the parsed games of one date from the datasets"""
+    # Rows of each dataset, grouped by game
+    records = {}
+    for name, record_class, _, _ in DATASETS:
+        key_fields = _key_fields(name)
+        columns = key_fields + list(record_class._fields) + _extra_fields(name)
+        table = datasets[name].to_table(columns=columns, filter=condition)
+        rows = list(zip(*[table.column(column).to_pylist() for column in columns]))
+
+        if name == 'games':
+            games = [GameRecord(*row[:-1]) for row in rows]
+            games = [game._replace(start_time=_join_time(game.start_time, row[-1])) for game, row in zip(games, rows)]
+            records[name] = sorted(games, key=lambda game: game.gameday_id)
+            continue
+
+        # Keep at bats, hits in play, and pitches within an at bat, in their order in the game
+        if name in ('at_bats', 'hits_in_play'):
+            rows.sort(key=lambda row: row[:2])
+        elif name == 'pitches':
+            rows.sort(key=lambda row: (row[0], row[1], row[columns.index('at_bat_pitch_num')] or 0))
+
+        by_game = {}
+        for row in rows:
+            by_game.setdefault(row[0], []).append(record_class(*row[len(key_fields):]))
+        records[name] = by_game
+
+    return [ParsedGame(game=game,
+                       at_bats=records['at_bats'].get(game.gameday_id, []),
+                       pitches=records['pitches'].get(game.gameday_id, []),
+                       hits_in_play=records['hits_in_play'].get(game.gameday_id, []),
+                       players=records['players'].get(game.gameday_id, []))
+            for game in records['games']]
+
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError('Parquet export requires PyArrow: pip install pygameday[parquet]')
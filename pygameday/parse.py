@@ -4,20 +4,71 @@
 Defines functionality for parsing MLB GameDay data from web content into database classes
 """
 import logging
-from datetime import timezone
+import threading
+from datetime import datetime
 from datetime import timedelta
+from datetime import timezone
+from functools import lru_cache
+from io import BytesIO
 
 from dateutil import parser
 from lxml import etree
 
+from .constants import GD_FINAL_STATUSES
 from .models import AtBat
 from .models import Game
 from .models import HitInPlay
 from .models import Pitch
 from .models import Player
+from .records import AT_BAT_ATTRIBUTES
+from .records import HIT_IN_PLAY_ATTRIBUTES
+from .records import PITCH_ATTRIBUTES
+from .records import PLAYER_ATTRIBUTES
+from .records import AtBatRecord
+from .records import GameRecord
+from .records import HitInPlayRecord
+from .records import ParsedGame
+from .records import PitchRecord
+from .records import PlayerRecord
+from .records import attribute_spec
+from .records import node_values
+from .records import to_int
 
 logger = logging.getLogger(__name__)
 
+# Elements of inning_all.xml that the streaming parser reacts to
+INNING_ALL_TAGS = ('inning', 'top', 'bottom', 'atbat', 'pitch')
+
+# XPath expressions, compiled once rather than on every call
+EPG_GAME_NODES = etree.XPath('descendant::game')
+PLAYER_NODES = etree.XPath('descendant::player')
+HIT_IN_PLAY_NODES = etree.XPath('descendant::hip')
+PITCH_NODES = etree.XPath('descendant::pitch')
+
+# How record fields are read from XML nodes. The leading fields of at bats and pitches come from their context.
+AT_BAT_SPEC = attribute_spec(AtBatRecord, AtBat, AT_BAT_ATTRIBUTES, context=('inning', 'inning_half', 'n_pitches'))
+PITCH_SPEC = attribute_spec(PitchRecord, Pitch, PITCH_ATTRIBUTES,
+                            context=('at_bat_index', 'at_bat_pitch_num', 'inning', 'inning_half'))
+HIT_IN_PLAY_SPEC = attribute_spec(HitInPlayRecord, HitInPlay, HIT_IN_PLAY_ATTRIBUTES)
+PLAYER_SPEC = attribute_spec(PlayerRecord, Player, PLAYER_ATTRIBUTES)
+
+
+_parsers = threading.local()
+
+
+def xml_parser():
+    """Returns this thread's XML parser for GameDay pages
+
+    The parser is created once per thread (and so once per worker process) and reused. GameDay pages have no DTDs,
+    entities or comments worth keeping, so none are loaded, resolved or kept, and nothing is fetched from the network.
+    """
+    parser = getattr(_parsers, 'parser', None)
+    if parser is None:
+        parser = etree.XMLParser(load_dtd=False, dtd_validation=False, resolve_entities=False, no_network=True,
+                                 huge_tree=False, remove_comments=True, remove_pis=True, collect_ids=False)
+        _parsers.parser = parser
+    return parser
+
 
 def parse_epg(epg_page):
     """Parse epg.xml to find all games in a given day
@@ -32,8 +83,8 @@ def parse_epg(epg_page):
     game_nodes : lxml list
 
     """
-    root = etree.fromstring(epg_page.content)
-    game_nodes = root.xpath('descendant::game')  # find all <game> nodes in the tree
+    root = etree.fromstring(epg_page.content, xml_parser())
+    game_nodes = EPG_GAME_NODES(root)  # find all <game> nodes in the tree
     return game_nodes
 
 
@@ -49,43 +100,109 @@ def parse_game(game):
     -------
     A Game object
     """
-    db_game = None
+    values = _game_values(game)
+    if values is None:
+        return None
+
+    return Game(**values)
+
+
+def parse_game_record(game):
+    """Parses a game dictionary to build a game record
+
+    Parameters
+    ----------
+    game : dict
+        The raw dictionary format of a game, probably parsed from a master_scoreboard.json or similar document
+
+    Returns
+    -------
+    GameRecord
+        The game's row, or None if the game is not final
+    """
+    values = _game_values(game)
+    if values is None:
+        return None
+
+    values['home_team_runs'] = to_int(values['home_team_runs'])
+    values['away_team_runs'] = to_int(values['away_team_runs'])
+    return GameRecord(**values)
+
+
+@lru_cache(maxsize=None)
+def _time_zone(offset):
+    """Returns the fixed time zone for a scoreboard offset in hours, e.g. '-4'. Each offset's tzinfo is built once."""
+    return timezone(timedelta(hours=int(offset)))
+
+
+def _hour_24(hour, ampm):
+    """Converts an hour on the 12-hour clock to the 24-hour clock. 12 AM is midnight and 12 PM is noon."""
+    if hour > 12:  # Already on the 24-hour clock
+        return hour
+    return hour % 12 + (12 if ampm == 'PM' else 0)
+
+
+def parse_game_time(date_time, offset, ampm):
+    """Parses a game's start time from master_scoreboard.json
+
+    Scoreboard times look like '2018/04/06 7:05', on a 12-hour clock, with the offset and AM/PM given separately.
+    Those are parsed directly; anything else falls back to dateutil's parser.
+
+    Parameters
+    ----------
+    date_time : str
+        The date and time, e.g. the game's time_date_hm_lg
+    offset : str
+        The offset from UTC in hours, e.g. time_zone_hm_lg
+    ampm : str
+        'AM' or 'PM', e.g. hm_lg_ampm
+
+    Returns
+    -------
+    datetime.datetime
+        The start time, with a fixed time zone
+    """
+    try:
+        date_part, time_part = date_time.split(' ')
+        year, month, day = date_part.split('/')
+        hour, minute = time_part.split(':')
+        return datetime(int(year), int(month), int(day), _hour_24(int(hour), ampm), int(minute),
+                        tzinfo=_time_zone(offset))
+    except ValueError:
+        logger.debug("Parsing unexpected game time '{}' with dateutil".format(date_time))
+
+    start_datetime = parser.parse(date_time)
+    return start_datetime.replace(hour=_hour_24(start_datetime.hour, ampm), tzinfo=_time_zone(offset))
+
+
+def _game_values(game):
+    """Returns the column values of a final game, or None if the game is not final"""
     status = game['status']['status']
 
     # Only parse games if they are final
-    if status in ['Final', 'Completed Early']:
-        # Use the *_hm_lg versions of dates and times
-        start_datetime = parser.parse(game['time_date_hm_lg'])
-        time_zone_offset = int(game['time_zone_hm_lg'])
-        time_ampm = game['hm_lg_ampm']
-
-        start_datetime = start_datetime.replace(tzinfo=timezone(timedelta(hours=time_zone_offset)))
-
-        # Game times in the data are given using a 12-hour clock. If game time is in the afternoon, we need to add
-        # 12 hours. Otherwise the database will think games start at times like 7:05 in the morning
-        if time_ampm == 'PM':
-            start_datetime += timedelta(hours=12)
-
-        db_game = Game(gameday_id=game['id'],
-                       venue=game['venue'],
-                       start_time=start_datetime,
-                       game_data_directory=game['game_data_directory'],
-                       game_type=game['game_type'],
-                       home_name_abbrev=game['home_name_abbrev'],
-                       home_team_city=game['home_team_city'],
-                       home_team_name=game['home_team_name'],
-                       away_name_abbrev=game['away_name_abbrev'],
-                       away_team_city=game['away_team_city'],
-                       away_team_name=game['away_team_name'],
-                       home_team_runs=game['linescore']['r']['home'],
-                       away_team_runs=game['linescore']['r']['away'],
-                       league=game['league']
-                       )
-    else:
+    if status not in GD_FINAL_STATUSES:
         # If the status is something else (e.g., Postponed or Preview), log it and continue
         logger.info('GameDay ID {} was not parsed because its status is {}'.format(game['id'], status))
-
-    return db_game
+        return None
+
+    # Use the *_hm_lg versions of dates and times
+    start_datetime = parse_game_time(game['time_date_hm_lg'], game['time_zone_hm_lg'], game['hm_lg_ampm'])
+
+    return dict(gameday_id=game['id'],
+                venue=game['venue'],
+                start_time=start_datetime,
+                game_data_directory=game['game_data_directory'],
+                game_type=game['game_type'],
+                home_name_abbrev=game['home_name_abbrev'],
+                home_team_city=game['home_team_city'],
+                home_team_name=game['home_team_name'],
+                away_name_abbrev=game['away_name_abbrev'],
+                away_team_city=game['away_team_city'],
+                away_team_name=game['away_team_name'],
+                home_team_runs=game['linescore']['r']['home'],
+                away_team_runs=game['linescore']['r']['away'],
+                league=game['league']
+                )
 
 
 def parse_players(players_page):
@@ -101,12 +218,29 @@ def parse_players(players_page):
     list
         A list of Player database objects
     """
-    root = etree.fromstring(players_page.content)
-    player_nodes = root.xpath('descendant::player')  # find all <player> nodes
+    root = etree.fromstring(players_page.content, xml_parser())
+    player_nodes = PLAYER_NODES(root)  # find all <player> nodes
     db_players_list = [parse_player_node(p) for p in player_nodes]
     return db_players_list
 
 
+def parse_players_records(players_page):
+    """Parses a players.xml page into player records
+
+    Parameters
+    ----------
+    players_page : XML data
+        The player page
+
+    Returns
+    -------
+    list
+        A list of PlayerRecords
+    """
+    root = etree.fromstring(players_page.content, xml_parser())
+    return [PlayerRecord._make(node_values(p, PLAYER_SPEC)) for p in PLAYER_NODES(root)]
+
+
 def parse_player_node(player_node):
     """Parses a player XML node
 
@@ -137,12 +271,29 @@ def parse_hit_chart(hit_chart_page):
     hit_chart_page
         The data from inning_hit.xml
     """
-    root = etree.fromstring(hit_chart_page.content)
-    hip_nodes = root.xpath('descendant::hip')  # find all <hip> nodes
+    root = etree.fromstring(hit_chart_page.content, xml_parser())
+    hip_nodes = HIT_IN_PLAY_NODES(root)  # find all <hip> nodes
     db_hips_list = [parse_hit_in_play_node(h) for h in hip_nodes]
     return db_hips_list
 
 
+def parse_hit_chart_records(hit_chart_page):
+    """Parses inning_hit.xml into hit in play records
+
+    Parameters
+    ----------
+    hit_chart_page
+        The data from inning_hit.xml
+
+    Returns
+    -------
+    list
+        A list of HitInPlayRecords
+    """
+    root = etree.fromstring(hit_chart_page.content, xml_parser())
+    return [HitInPlayRecord._make(node_values(h, HIT_IN_PLAY_SPEC)) for h in HIT_IN_PLAY_NODES(root)]
+
+
 def parse_hit_in_play_node(hip_node):
     """Parses a Hit In Play node
 
@@ -170,42 +321,137 @@ def parse_hit_in_play_node(hip_node):
 def parse_inning_all(inning_all_page):
     """Parses inning_all.xml for atbats and pitches
 
+    The document is parsed in a single forward pass with iterparse. Each at bat is built as soon as its closing tag
+    is read, then the at bat and everything before it is discarded, so memory use stays flat however long the game.
+
     Parameters
     ----------
     inning_all_page
         The data from inning_all.xml
+
+    Returns
+    -------
+    list
+        AtBat database objects in the order they occurred, with their Pitches appended
     """
-    root = etree.fromstring(inning_all_page.content)
-    inning_nodes = root.xpath('descendant::inning')  # Find all <atbat> nodes
+    return [parse_at_bat(node, inning_num, inning_half, pitch_nodes)
+            for node, inning_num, inning_half, pitch_nodes in _iter_at_bat_nodes(inning_all_page)]
+
+
+def parse_inning_all_records(inning_all_page):
+    """Parses inning_all.xml into at bat and pitch records
+
+    Like parse_inning_all, this is a single streaming pass over the document.
+
+    Parameters
+    ----------
+    inning_all_page
+        The data from inning_all.xml
+
+    Returns
+    -------
+    tuple
+        (at_bats, pitches): a list of AtBatRecords in the order they occurred, and a list of all PitchRecords of the
+        game. Each pitch's at_bat_index is the position of its at bat in the first list.
+    """
+    at_bats = []
+    pitches = []
+
+    for node, inning_num, inning_half, pitch_nodes in _iter_at_bat_nodes(inning_all_page):
+        inning = to_int(inning_num)
+        at_bat_index = len(at_bats)
+
+        at_bats.append(AtBatRecord(inning, inning_half, len(pitch_nodes), *node_values(node, AT_BAT_SPEC)))
+        pitches.extend(PitchRecord(at_bat_index, index, inning, inning_half, *node_values(pitch, PITCH_SPEC))
+                       for index, pitch in enumerate(pitch_nodes))
+
+    return at_bats, pitches
+
+
+def parse_game_records(game, hit_chart_page, players_page, inning_all_page):
+    """Parses everything about a game into records
+
+    Parameters
+    ----------
+    game : dict
+        The game's entry in master_scoreboard.json
+    hit_chart_page
+        The data from inning_hit.xml
+    players_page
+        The data from players.xml
+    inning_all_page
+        The data from inning_all.xml
+
+    Returns
+    -------
+    ParsedGame
+        The game's records, or None if the game is not final
+    """
+    game_record = parse_game_record(game)
+    if game_record is None:
+        return None
+
+    at_bats, pitches = parse_inning_all_records(inning_all_page)
+    return ParsedGame(game=game_record,
+                      at_bats=at_bats,
+                      pitches=pitches,
+                      hits_in_play=parse_hit_chart_records(hit_chart_page),
+                      players=parse_players_records(players_page))
+
+
+def _iter_at_bat_nodes(inning_all_page):
+    """Streams the at bats of inning_all.xml
+
+    Yields
+    ------
+    tuple
+        (at bat node, inning number, inning half, pitch nodes). The nodes are discarded once the consumer moves on.
+    """
+    inning_num = None
+    inning_half = None
+    pitch_nodes = []
+
+    events = etree.iterparse(BytesIO(inning_all_page.content), events=('start', 'end'), tag=INNING_ALL_TAGS,
+                             resolve_entities=False, no_network=True)
 
-    db_at_bat_list = []
-    ab_nodes_top = []
-    ab_nodes_bot = []
+    for event, node in events:
+        tag = node.tag
 
-    for inn in inning_nodes:
-        inning_num = inn.get('num')  # the inning number
+        if event == 'start':
+            if tag == 'inning':
+                inning_num = node.get('num')  # the inning number
+            elif tag == 'top':
+                inning_half = 'T'
+            elif tag == 'bottom':
+                inning_half = 'B'
+            elif tag == 'atbat':
+                pitch_nodes = []
 
-        inning_top = inn.xpath('top')  # the top of the inning, as a list
-        inning_bot = inn.xpath('bottom')  # the bottom of the inning, as a list
+        elif tag == 'pitch':
+            pitch_nodes.append(node)
 
-        if inning_top:  # if the top of the inning exists (is not empty)
-            ab_nodes_top = inning_top[0].xpath('descendant::atbat')
+        elif tag == 'atbat':
+            yield node, inning_num, inning_half, pitch_nodes
+            _discard(node)
 
-        if inning_bot:  # if the bottom of the inning exists (is not empty)
-            ab_nodes_bot = inning_bot[0].xpath('descendant::atbat')
+        elif tag in ('top', 'bottom'):
+            inning_half = None
+            _discard(node)
 
-        for ab in ab_nodes_top:
-            db_at_bat = parse_at_bat(ab, inning_num, 'T')
-            db_at_bat_list.append(db_at_bat)
+        elif tag == 'inning':
+            _discard(node)
 
-        for ab in ab_nodes_bot:
-            db_at_bat = parse_at_bat(ab, inning_num, 'B')
-            db_at_bat_list.append(db_at_bat)
 
-    return db_at_bat_list
+def _discard(node):
+    """Frees a fully read node and any earlier siblings (e.g., <action> nodes) during iterparse"""
+    node.clear()
+    parent = node.getparent()
+    if parent is not None:
+        while node.getprevious() is not None:
+            del parent[0]
 
 
-def parse_at_bat(at_bat, inning_num, inning_half):
+def parse_at_bat(at_bat, inning_num, inning_half, pitches=None):
     """Parses an at bat XML node
 
     Parameters
@@ -216,12 +462,15 @@ def parse_at_bat(at_bat, inning_num, inning_half):
         The inning number (e.g., 1 for first inning)
     inning_half : str
         'T' if top of the inning, 'B' if bottom of the inning
+    pitches : list of lxml nodes
+        The at bat's pitch nodes, if they are already known. Otherwise they are found in the at bat node.
 
     Returns
     -------
     An AtBat database object
     """
-    pitches = at_bat.xpath('descendant::pitch')  # find all <pitch> nodes
+    if pitches is None:
+        pitches = PITCH_NODES(at_bat)  # find all <pitch> nodes
 
     db_at_bat = AtBat(
             inning=inning_num,
@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Provides the staged ingest pipeline: worker processes fetch and parse games, and a single writer loads them
+
+Only the process that owns the pipeline touches the database. Workers return compact ParsedGame records, which pickle
+cheaply; the owner collects them and writes them in batches from one connection, so SQLite never sees concurrent
+writers. The number of games being fetched, parsed or waiting to be written is bounded (max_pending in the workers,
+plus one batch), so a slow database holds the workers back instead of filling memory. Errors raised in workers or by
+the writer are recorded against the game they belong to and reported in an IngestSummary.
+"""
+import logging
+from concurrent.futures import ALL_COMPLETED
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
+
+from . import parse
+from . import scrape
+from .constants import PIPELINE_PENDING_PER_WORKER
+from .writer import WriteStats
+
+logger = logging.getLogger(__name__)
+
+
+class IngestSummary(object):
+    """The outcome of an ingest: which games were written, which were skipped, and which failed
+    """
+    def __init__(self):
+        self.succeeded = []  # GameDay IDs of the games written
+        self.skipped = {}  # Reason each skipped game was not ingested, by GameDay ID
+        self.failed = {}  # Error each failed game ran into, by GameDay ID
+        self.stats = WriteStats()
+
+    def add(self, other):
+        """Adds the games and counts of another IngestSummary to this one"""
+        self.succeeded.extend(other.succeeded)
+        self.skipped.update(other.skipped)
+        self.failed.update(other.failed)
+        self.stats.add(other.stats)
+
+    def __repr__(self):
+        return '<IngestSummary(succeeded={}, skipped={}, failed={}, rows={})>'.format(
+            len(self.succeeded), len(self.skipped), len(self.failed), self.stats.rows)
+
+
+def load_game(game, pages=None):
+    """Fetches a game's pages, unless they are given, and parses them into records
+
+    This is the work done by the pipeline's worker processes.
+
+    Parameters
+    ----------
+    game : dict
+        The game's entry in master_scoreboard.json. The game must be final.
+    pages : dict
+        The game's pages if they have already been fetched, keyed by 'hit_chart', 'players' and 'inning_all'
+
+    Returns
+    -------
+    records.ParsedGame
+        The game's records
+
+    Raises
+    ------
+    ValueError
+        If any of the game's pages could not be fetched, or the game is not final
+    """
+    if pages is None:
+        game_dir = game['game_data_directory']
+        pages = {
+            'hit_chart': scrape.fetch_hit_chart(game_dir),
+            'players': scrape.fetch_players(game_dir),
+            'inning_all': scrape.fetch_inning_all(game_dir),
+        }
+
+    # A game with a missing page is skipped rather than ingested partially
+    missing = [name for name in ('hit_chart', 'players', 'inning_all') if pages.get(name) is None]
+    if missing:
+        raise ValueError('Could not fetch the {} page(s) of game {}'.format(', '.join(missing), game['id']))
+
+    parsed = parse.parse_game_records(game, pages['hit_chart'], pages['players'], pages['inning_all'])
+    if parsed is None:
+        raise ValueError('Game {} is not final'.format(game['id']))
+
+    return parsed
+
+
+def parsed_rows(parsed):
+    """Returns the number of rows a parsed game adds to the database, counting its players"""
+    return 1 + len(parsed.at_bats) + len(parsed.pitches) + len(parsed.hits_in_play) + len(parsed.players)
+
+
+class GamePipeline(object):
+    """Fetches and parses games in worker processes and writes them from the owning process
+
+    Use it as a context manager: submit games, and leaving the block waits for all of them and writes the last batch.
+
+        with GamePipeline(write_games, n_workers=4) as pipeline:
+            for game in games:
+                pipeline.submit(game)
+        print(pipeline.summary)
+    """
+    def __init__(self, write_games, n_workers=1, max_pending=None, commit_every=1, commit_every_rows=None,
+                 initializer=None, initargs=(), sinks=()):
+        """Constructor
+
+        Parameters
+        ----------
+        write_games : callable
+            Writes a list of records.ParsedGame to the database in one transaction, returning a writer.WriteStats.
+            It is only ever called from the process that owns the pipeline. The games it lists in the stats' existing
+            are not passed to the sinks.
+        n_workers : int
+            The number of worker processes. With 1, games are fetched and parsed in the owning process.
+        max_pending : int
+            The largest number of games being fetched or parsed by the workers. submit blocks while that many are.
+            Parsed games then wait for their batch to be written, so up to commit_every more games (or
+            commit_every_rows rows' worth) are held in memory. [Default: PIPELINE_PENDING_PER_WORKER games per worker]
+        commit_every : int
+            The number of games written per transaction
+        commit_every_rows : int
+            If set, a transaction is also committed as soon as its games add up to this many rows, whatever their
+            number. See parsed_rows.
+        initializer : callable
+            Called at the start of each worker process, e.g. to configure the scrape layer
+        initargs : tuple
+            Arguments for initializer
+        sinks : list of callable
+            Called with every list of parsed games once it is written to the database, e.g. a parquet.ParquetSink.
+            A sink that raises is logged; the games stay written. A sink's close method, if it has one, is called
+            when the pipeline closes.
+        """
+        self.write_games = write_games
+        self.n_workers = max(1, int(n_workers))
+        self.max_pending = max(1, int(max_pending or self.n_workers * PIPELINE_PENDING_PER_WORKER))
+        self.commit_every = max(1, int(commit_every))
+        self.commit_every_rows = commit_every_rows
+        self.initializer = initializer
+        self.initargs = initargs
+        self.sinks = list(sinks)
+        self.summary = IngestSummary()
+
+        self.in_flight = set()  # GameDay IDs of the games submitted and neither written nor failed yet
+
+        self._executor = None
+        self._pending = {}  # Futures of games in the workers, mapped to their GameDay IDs
+        self._batch = []  # Parsed games waiting to be written
+        self._batch_rows = 0
+
+    def __enter__(self):
+        if self.n_workers > 1:
+            self._executor = ProcessPoolExecutor(max_workers=self.n_workers, initializer=self.initializer,
+                                                 initargs=self.initargs)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif self._executor is not None:
+            # Don't write anything more, and don't wait for games that haven't started
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    @property
+    def n_pending(self):
+        """The number of games being fetched, parsed or waiting to be written"""
+        return len(self._pending) + len(self._batch)
+
+    def submit(self, game, pages=None):
+        """Queues a game to be fetched, parsed and written
+
+        Blocks while max_pending games are already in the workers, writing finished games in the meantime.
+
+        Parameters
+        ----------
+        game : dict
+            The game's entry in master_scoreboard.json
+        pages : dict
+            The game's pages if they have already been fetched (see load_game)
+        """
+        gameday_id = game['id']
+        self.in_flight.add(gameday_id)
+
+        if self._executor is None:
+            try:
+                parsed = load_game(game, pages)
+            except Exception as ex:
+                self._fail([gameday_id], ex)
+            else:
+                self._queue(parsed)
+            return
+
+        while len(self._pending) >= self.max_pending:
+            self._collect(FIRST_COMPLETED)
+
+        self._pending[self._executor.submit(load_game, game, pages)] = gameday_id
+
+    def submit_parsed(self, parsed):
+        """Queues a game that is already parsed, e.g. read back from Parquet, to be written
+
+        Parameters
+        ----------
+        parsed : records.ParsedGame
+        """
+        self.in_flight.add(parsed.game.gameday_id)
+        self._queue(parsed)
+
+    def skip(self, gameday_id, reason):
+        """Records that a game was not submitted, and why"""
+        self.summary.skipped[gameday_id] = reason
+
+    def _collect(self, return_when):
+        """Waits for games to come back from the workers and queues them to be written"""
+        done, _ = wait(list(self._pending), return_when=return_when)
+        for future in done:
+            gameday_id = self._pending.pop(future)
+            try:
+                parsed = future.result()
+            except Exception as ex:
+                self._fail([gameday_id], ex)
+            else:
+                self._queue(parsed)
+
+    def _queue(self, parsed):
+        self._batch.append(parsed)
+        self._batch_rows += parsed_rows(parsed)
+        if len(self._batch) >= self.commit_every or \
+                (self.commit_every_rows is not None and self._batch_rows >= self.commit_every_rows):
+            self.flush()
+
+    def _fail(self, gameday_ids, error):
+        for gameday_id in gameday_ids:
+            self.summary.failed[gameday_id] = '{}: {}'.format(type(error).__name__, error)
+            self.in_flight.discard(gameday_id)
+        logger.error('Failed to ingest game(s) {}: {}'.format(', '.join(gameday_ids), error))
+
+    def flush(self):
+        """Writes the parsed games that are waiting, in one transaction"""
+        batch, self._batch = self._batch, []
+        self._batch_rows = 0
+        self._write(batch)
+
+    def _write(self, batch):
+        """Writes a batch of parsed games in one transaction
+
+        If the transaction fails, the batch is split in halves that are written separately, until the games that
+        can't be written are isolated. Only those are recorded as failed; the good games of the batch are kept.
+        """
+        if not batch:
+            return
+
+        gameday_ids = [parsed.game.gameday_id for parsed in batch]
+        try:
+            stats = self.write_games(batch)
+        except Exception as ex:
+            if len(batch) == 1:
+                self._fail(gameday_ids, ex)
+                return
+
+            logger.warning('Failed to write a batch of {} games ({}); splitting it'.format(len(batch), ex))
+            middle = len(batch) // 2
+            self._write(batch[:middle])
+            self._write(batch[middle:])
+        else:
+            self.summary.succeeded.extend(gameday_ids)
+            for gameday_id in gameday_ids:
+                self.summary.failed.pop(gameday_id, None)  # A game listed twice may fail once and succeed later
+            self.summary.stats.add(stats)
+            self.in_flight.difference_update(gameday_ids)
+
+            # Games another writer had already stored were written to the sinks along with them
+            written = [parsed for parsed in batch if parsed.game.gameday_id not in stats.existing]
+            for sink in self.sinks if written else ():
+                try:
+                    sink(written)
+                except Exception as ex:
+                    logger.error('Sink {} failed on game(s) {}: {}'.format(sink, ', '.join(gameday_ids), ex))
+
+    def close(self):
+        """Waits for every submitted game, writes the remaining ones and stops the workers
+
+        Returns
+        -------
+        IngestSummary
+            The outcome of every game submitted or skipped
+        """
+        if self._pending:
+            self._collect(ALL_COMPLETED)
+        self.flush()
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+        for sink in self.sinks:
+            if hasattr(sink, 'close'):
+                sink.close()
+
+        return self.summary
@@ -0,0 +1,444 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Provides the pitch store, a memory-mapped columnar copy of the float columns of the pitches table
+
+Each column is a flat file of float64 values, one per pitch, next to the pitcher of each pitch and a table of the rows
+each game occupies:
+
+    <directory>/store.json           The columns, and how many rows the saved pitcher index covers
+    <directory>/games.i8             (game_id, first row, end row) of each game, in the order they were added
+    <directory>/pitcher_id.i8        The pitcher of each row
+    <directory>/columns/<name>.f8    The values of a float column of models.Pitch, NaN where missing
+    <directory>/pitcher_order-N.i8   Rows sorted by pitcher, for the first N rows
+    <directory>/pitchers-N.i8        (pitcher_id, first, end) of each pitcher's run in pitcher_order-N
+    <directory>/writer.lock          Locked by the store's writer
+
+A game's pitches are contiguous, so they are a slice of every column. PitchStore maps the files read-only with
+numpy.memmap: any number of processes can open the same store and share its pages through the OS page cache, with no
+copy and no database query.
+
+The store is append-only and has one writer, PitchStoreWriter, which holds an exclusive lock on the store while it is
+open (on platforms with fcntl). Rows are written before the games table that covers them, so readers never see a
+partially added game, and a writer that was interrupted drops the rows no game covers.
+GameDayClient(pitch_store_dir=...) keeps a store up to date during ingests; build_pitch_store fills one from the
+database.
+
+NumPy is needed for this module (pip install pygameday[analysis]).
+"""
+import json
+import logging
+import os
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, where the writer lock isn't taken
+    fcntl = None
+
+from sqlalchemy import Float
+from sqlalchemy import select
+
+from . import reader
+from .columns import missing
+from .columns import pitch_columns
+from .constants import PITCH_STORE_BUILD_GAMES
+from .models import AtBat
+from .models import Game
+from .models import Pitch
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; see the 'analysis' extra in setup.py
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# The columns of the store: every float column of the pitches table
+PITCH_STORE_COLUMNS = tuple(column.name for column in Pitch.__table__.columns if isinstance(column.type, Float))
+
+
+def _map(path, dtype, n_values, width=1):
+    """Maps the first n_values records of a file read-only, or returns an empty array if there are none"""
+    shape = (n_values, width) if width > 1 else (n_values,)
+    if n_values == 0:
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=shape)
+
+
+class PitchStore(object):
+    """A read-only view of a pitch store
+
+        store = PitchStore('pitch_store')
+        speeds = store['start_speed']  # Every pitch, as a memory-mapped array
+        game = store.select(['px', 'pz'], game_id=1234)  # Slices of the columns, with no copy
+        pitcher = store.select(['px', 'pz'], pitcher_id=453286)
+
+    The view covers the games in the store when it was opened; refresh() picks up games added since.
+    """
+    def __init__(self, directory):
+        """Constructor
+
+        Parameters
+        ----------
+        directory : str
+            The directory of the store
+        """
+        _require_numpy()
+        self.directory = directory
+        self.refresh()
+
+    def refresh(self):
+        """Maps the store again, to include the games added since it was opened"""
+        with open(os.path.join(self.directory, 'store.json')) as f:
+            meta = json.load(f)
+
+        games_path = os.path.join(self.directory, 'games.i8')
+        n_games = os.path.getsize(games_path) // (3 * 8)
+        self.games = _map(games_path, np.int64, n_games, width=3)
+        self.n_rows = int(self.games[-1, 2]) if n_games else 0
+        self.columns = tuple(meta['columns'])
+
+        self._arrays = {name: _map(os.path.join(self.directory, 'columns', name + '.f8'), np.float64, self.n_rows)
+                        for name in self.columns}
+        self._arrays['pitcher_id'] = _map(os.path.join(self.directory, 'pitcher_id.i8'), np.int64, self.n_rows)
+        self._game_rows = {int(game_id): slice(int(start), int(stop)) for game_id, start, stop in self.games}
+
+        if meta.get('index_rows') == self.n_rows:
+            order_path, pitchers_path = _index_paths(self.directory, self.n_rows)
+            self._pitcher_order = _map(order_path, np.int64, self.n_rows)
+            pitchers = _map(pitchers_path, np.int64, os.path.getsize(pitchers_path) // (3 * 8), width=3)
+        else:
+            # The saved index is missing or doesn't cover the latest games, so it's built in memory
+            logger.debug('Indexing the {} pitches of {} by pitcher'.format(self.n_rows, self.directory))
+            self._pitcher_order, pitchers = pitcher_index(self._arrays['pitcher_id'])
+        self._pitcher_rows = {int(pitcher_id): (int(start), int(stop)) for pitcher_id, start, stop in pitchers}
+
+    @property
+    def game_ids(self):
+        """The IDs of the games in the store"""
+        return list(self._game_rows)
+
+    @property
+    def pitcher_ids(self):
+        """The IDs of the pitchers in the store"""
+        return list(self._pitcher_rows)
+
+    def __len__(self):
+        return self.n_rows
+
+    def __getitem__(self, name):
+        """Returns a column, or pitcher_id, as a read-only memory-mapped array"""
+        try:
+            return self._arrays[name]
+        except KeyError:
+            raise KeyError("Unknown column '{}'. The store has: pitcher_id, {}".format(name, ', '.join(self.columns)))
+
+    def game_rows(self, game_id):
+        """Returns the slice of rows holding a game's pitches
+
+        Raises
+        ------
+        KeyError
+            If the game isn't in the store
+        """
+        return self._game_rows[game_id]
+
+    def pitcher_rows(self, pitcher_id):
+        """Returns the rows holding a pitcher's pitches, in increasing order, or an empty array if there are none"""
+        start, stop = self._pitcher_rows.get(pitcher_id, (0, 0))
+        return self._pitcher_order[start:stop]
+
+    def select(self, columns=None, game_id=None, pitcher_id=None):
+        """Returns columns for all pitches, or for those of one game or pitcher
+
+        Parameters
+        ----------
+        columns : list of str
+            The columns to return. [Default: every column]
+        game_id : int
+            If set, only the pitches of this game, as views of the memory-mapped files
+        pitcher_id : int
+            If set, only the pitches of this pitcher. The rows are gathered, which copies them.
+
+        Returns
+        -------
+        dict
+            The array of each column, by column name
+        """
+        rows = slice(None)
+        if game_id is not None:
+            rows = self.game_rows(game_id)
+        if pitcher_id is not None:
+            pitcher_rows = self.pitcher_rows(pitcher_id)
+            if game_id is not None:
+                pitcher_rows = pitcher_rows[(pitcher_rows >= rows.start) & (pitcher_rows < rows.stop)]
+            rows = pitcher_rows
+
+        return {name: self[name][rows] for name in (columns or self.columns)}
+
+    def __repr__(self):
+        return '<PitchStore({}, games={}, rows={})>'.format(self.directory, len(self._game_rows), self.n_rows)
+
+
+def pitcher_index(pitcher_ids):
+    """Indexes rows by pitcher
+
+    Parameters
+    ----------
+    pitcher_ids : numpy.ndarray
+        The pitcher of each row
+
+    Returns
+    -------
+    tuple
+        The rows sorted by pitcher, and (pitcher_id, first, end) positions of each pitcher's rows in them
+    """
+    order = np.argsort(pitcher_ids, kind='stable')  # Stable, so each pitcher's rows stay in increasing order
+    ordered_ids = pitcher_ids[order]
+    unique_ids, starts = np.unique(ordered_ids, return_index=True)
+    stops = np.append(starts[1:], len(ordered_ids))
+    return order, np.column_stack([unique_ids, starts, stops]).astype(np.int64)
+
+
+class PitchStoreWriter(object):
+    """Appends games to a pitch store, creating it if needed
+
+    Only one writer may have a store open at a time: opening a second one raises RuntimeError until the first is
+    closed. Games that are already in the store are left out, so adding a game twice is harmless.
+    """
+    def __init__(self, directory):
+        """Constructor
+
+        Parameters
+        ----------
+        directory : str
+            The directory of the store
+        """
+        _require_numpy()
+        self.directory = directory
+        os.makedirs(os.path.join(directory, 'columns'), exist_ok=True)
+
+        # Taken before anything is read, since opening the store truncates rows another writer may be appending
+        self._lock_file = _lock_writer(directory)
+
+        meta_path = os.path.join(directory, 'store.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if tuple(meta['columns']) != PITCH_STORE_COLUMNS:
+                raise ValueError('The pitch store in {} has different columns; build a new one'.format(directory))
+            self.index_rows = meta.get('index_rows')
+        else:
+            self._write_meta(index_rows=None)
+            self.index_rows = None
+
+        games_path = os.path.join(directory, 'games.i8')
+        with open(games_path, 'ab') as f:
+            # Drop a games record that was only partly written
+            f.truncate(os.path.getsize(games_path) // (3 * 8) * (3 * 8))
+        games = np.fromfile(games_path, dtype=np.int64).reshape(-1, 3)
+
+        self.n_rows = int(games[-1, 2]) if len(games) else 0
+        self.game_ids = set(games[:, 0].tolist())
+
+        # Drop rows that no game covers, left by a writer that was interrupted
+        for path in self._row_paths():
+            with open(path, 'ab') as f:
+                f.truncate(self.n_rows * 8)
+
+    def close(self):
+        """Releases the store's writer lock"""
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _row_paths(self):
+        yield os.path.join(self.directory, 'pitcher_id.i8')
+        for name in PITCH_STORE_COLUMNS:
+            yield os.path.join(self.directory, 'columns', name + '.f8')
+
+    def _write_meta(self, index_rows):
+        meta_path = os.path.join(self.directory, 'store.json')
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump({'columns': list(PITCH_STORE_COLUMNS), 'index_rows': index_rows}, f)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def append(self, game_ids, pitcher_ids, columns):
+        """Appends pitches to the store
+
+        Parameters
+        ----------
+        game_ids : numpy.ndarray
+            The game of each pitch. A game's pitches are kept in the order given, but needn't be contiguous.
+        pitcher_ids : numpy.ndarray
+            The pitcher of each pitch
+        columns : dict
+            The values of each of PITCH_STORE_COLUMNS, by column name
+
+        Returns
+        -------
+        int
+            The number of games added
+        """
+        game_ids = np.asarray(game_ids, dtype=np.int64)
+        keep = ~np.isin(game_ids, list(self.game_ids))
+        order = np.flatnonzero(keep)
+        order = order[np.argsort(game_ids[order], kind='stable')]  # Make each game's rows contiguous
+        if len(order) == 0:
+            return 0
+
+        sorted_ids = game_ids[order]
+        unique_ids, starts = np.unique(sorted_ids, return_index=True)
+        stops = np.append(starts[1:], len(sorted_ids))
+
+        arrays = [np.asarray(pitcher_ids, dtype=np.int64)[order]]
+        arrays.extend(np.asarray(columns[name], dtype=np.float64)[order] for name in PITCH_STORE_COLUMNS)
+        for path, array in zip(self._row_paths(), arrays):
+            with open(path, 'ab') as f:
+                array.tofile(f)
+
+        # The games are recorded last, which makes the new rows visible to readers
+        games = np.column_stack([unique_ids, starts + self.n_rows, stops + self.n_rows]).astype(np.int64)
+        with open(os.path.join(self.directory, 'games.i8'), 'ab') as f:
+            games.tofile(f)
+
+        self.n_rows += len(order)
+        self.game_ids.update(unique_ids.tolist())
+        return len(unique_ids)
+
+    def append_parsed(self, parsed_games, game_ids):
+        """Appends the pitches of parsed games
+
+        Parameters
+        ----------
+        parsed_games : list of records.ParsedGame
+        game_ids : list of int
+            The database ID of each game
+        """
+        columns = pitch_columns(parsed_games)
+        pitch_game_ids = np.asarray(game_ids, dtype=np.int64)[columns['game_index']]
+        pitcher_ids = np.where(missing(columns['pitcher_id']), -1, columns['pitcher_id'])  # -1 for a missing pitcher
+        return self.append(pitch_game_ids, pitcher_ids, columns)
+
+    def write_index(self):
+        """Saves the pitcher index, so readers don't have to build it
+
+        The index files are named after the number of rows they cover, and replaced ones are only deleted once the
+        store points at the new ones, so readers never map an index that doesn't match their rows. Nothing is done if
+        no rows were added since the index was last saved.
+
+        Returns
+        -------
+        bool
+            Whether the index was saved
+        """
+        if self.index_rows == self.n_rows and all(os.path.exists(path)
+                                                  for path in _index_paths(self.directory, self.n_rows)):
+            return False
+
+        pitcher_ids = _map(os.path.join(self.directory, 'pitcher_id.i8'), np.int64, self.n_rows)
+        order, pitchers = pitcher_index(pitcher_ids)
+        order_path, pitchers_path = _index_paths(self.directory, self.n_rows)
+        order.tofile(order_path)
+        pitchers.tofile(pitchers_path)
+        self._write_meta(index_rows=self.n_rows)
+        self.index_rows = self.n_rows
+
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith(('pitcher_order-', 'pitchers-')) and path not in (order_path, pitchers_path):
+                os.remove(path)
+        logger.debug('Indexed {} pitches by pitcher in {}'.format(self.n_rows, self.directory))
+        return True
+
+
+def _lock_writer(directory):
+    """Takes the writer lock of a store, which is held until the returned file is closed"""
+    lock_file = open(os.path.join(directory, 'writer.lock'), 'w')
+    if fcntl is not None:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            raise RuntimeError('The pitch store in {} is already open for writing'.format(directory))
+    return lock_file
+
+
+def _index_paths(directory, n_rows):
+    return (os.path.join(directory, 'pitcher_order-{}.i8'.format(n_rows)),
+            os.path.join(directory, 'pitchers-{}.i8'.format(n_rows)))
+
+
+class PitchStoreSink(object):
+    """Adds every batch of games the ingest pipeline stores in the database to a pitch store
+    """
+    def __init__(self, directory, engine):
+        """Constructor
+
+        Parameters
+        ----------
+        directory : str
+            The directory of the store
+        engine : sqlalchemy engine instance
+            The database the games are written to, where their IDs are looked up
+        """
+        self.writer = PitchStoreWriter(directory)
+        self.engine = engine
+
+    def __call__(self, parsed_games):
+        games = Game.__table__
+        gameday_ids = [parsed.game.gameday_id for parsed in parsed_games]
+        with self.engine.connect() as connection:
+            query = select(games.c.gameday_id, games.c.game_id).where(games.c.gameday_id.in_(gameday_ids))
+            game_ids = dict(connection.execute(query).all())
+        self.writer.append_parsed(parsed_games, [game_ids[gameday_id] for gameday_id in gameday_ids])
+
+    def close(self):
+        """Saves the pitcher index once the pipeline is done
+
+        The writer stays open, since the client uses the sink again for its next pipeline.
+        """
+        self.writer.write_index()
+
+    def __repr__(self):
+        return '<PitchStoreSink({})>'.format(self.writer.directory)
+
+
+def build_pitch_store(engine, directory, batch_size=PITCH_STORE_BUILD_GAMES):
+    """Adds the games in the database that a pitch store doesn't have yet to it, creating it if needed
+
+    Parameters
+    ----------
+    engine : sqlalchemy engine instance
+    directory : str
+        The directory of the store
+    batch_size : int
+        The number of games read from the database at a time
+
+    Returns
+    -------
+    int
+        The number of games added
+    """
+    writer = PitchStoreWriter(directory)
+    try:
+        with engine.connect() as connection:
+            game_ids = connection.execute(select(AtBat.__table__.c.game_id).distinct()).scalars().all()
+        game_ids = sorted(game_id for game_id in game_ids if game_id not in writer.game_ids)
+
+        n_games = 0
+        columns = ['game_id', 'pitcher_id'] + list(PITCH_STORE_COLUMNS)
+        for i in range(0, len(game_ids), batch_size):
+            pitches = reader.load_pitches(engine, columns, filters={'game_id': game_ids[i:i + batch_size]})
+            pitcher_ids = np.where(missing(pitches['pitcher_id']), -1, pitches['pitcher_id'])
+            n_games += writer.append(pitches['game_id'], pitcher_ids, pitches)
+
+        writer.write_index()
+    finally:
+        writer.close()
+    logger.info('Added {} games to the pitch store in {}'.format(n_games, directory))
+    return n_games
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError('The pitch store requires NumPy: pip install pygameday[analysis]')
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Defines the fetch policy (timeouts and retries) and the adaptive concurrency limiter used by scrape
+"""
+import logging
+import random
+import threading
+
+from .constants import FETCH_BACKOFF_FACTOR
+from .constants import FETCH_BACKOFF_MAX
+from .constants import FETCH_CONNECT_TIMEOUT
+from .constants import FETCH_ERROR_THRESHOLD
+from .constants import FETCH_LATENCY_TARGET
+from .constants import FETCH_MAX_RETRIES
+from .constants import FETCH_READ_TIMEOUT
+from .constants import FETCH_RETRY_STATUSES
+
+logger = logging.getLogger(__name__)
+
+
+class FetchPolicy(object):
+    """Timeouts, retries and backoff for fetching GameDay pages over HTTP
+    """
+    def __init__(self, connect_timeout=FETCH_CONNECT_TIMEOUT, read_timeout=FETCH_READ_TIMEOUT,
+                 max_retries=FETCH_MAX_RETRIES, backoff_factor=FETCH_BACKOFF_FACTOR, backoff_max=FETCH_BACKOFF_MAX,
+                 retry_statuses=FETCH_RETRY_STATUSES, latency_target=FETCH_LATENCY_TARGET,
+                 error_threshold=FETCH_ERROR_THRESHOLD):
+        """Constructor
+
+        Parameters
+        ----------
+        connect_timeout : float
+            Seconds to wait for a connection to the server
+        read_timeout : float
+            Seconds to wait between bytes received from the server
+        max_retries : int
+            The number of times a request is retried after a connection error, a timeout or a retryable status
+        backoff_factor : float
+            The delay before the first retry, in seconds. It doubles with every further retry.
+        backoff_max : float
+            The longest delay between retries, in seconds
+        retry_statuses : tuple of int
+            HTTP statuses that are retried
+        latency_target : float
+            Response time, in seconds, above which the concurrency limiter backs off
+        error_threshold : float
+            Recent error rate above which the concurrency limiter backs off
+        """
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.retry_statuses = tuple(retry_statuses)
+        self.latency_target = latency_target
+        self.error_threshold = error_threshold
+
+    @property
+    def timeout(self):
+        """The (connect, read) timeout tuple to pass to requests"""
+        return self.connect_timeout, self.read_timeout
+
+    def should_retry(self, status_code):
+        """Whether a response with the given HTTP status should be retried"""
+        return status_code in self.retry_statuses
+
+    def backoff(self, attempt, retry_after=None):
+        """Returns how long to wait before a retry
+
+        Parameters
+        ----------
+        attempt : int
+            The number of the retry, starting at 0
+        retry_after : str
+            The value of the response's Retry-After header, if any. A number of seconds there is honored, up to
+            backoff_max.
+
+        Returns
+        -------
+        float
+            The delay in seconds, with jitter so that concurrent workers don't retry in lockstep. The jitter never
+            brings the delay under the server's Retry-After.
+        """
+        delay = min(self.backoff_factor * 2 ** attempt, self.backoff_max) * random.uniform(0.5, 1.0)
+        if retry_after is not None:
+            try:
+                delay = max(delay, min(float(retry_after), self.backoff_max))
+            except ValueError:
+                pass
+
+        return delay
+
+    def __repr__(self):
+        return ('<FetchPolicy(timeout={}, max_retries={}, backoff_factor={}, backoff_max={})>'
+                .format(self.timeout, self.max_retries, self.backoff_factor, self.backoff_max))
+
+
+class AdaptiveLimiter(object):
+    """Limits the number of concurrent requests, adapting the limit to how the server is coping
+
+    The limit follows additive-increase / multiplicative-decrease: it grows by one after a full window of healthy
+    requests and is halved when the recent error rate or response time rises above the policy's thresholds. Recent
+    rates are exponentially weighted moving averages over about one window of requests.
+
+    A limiter built with a multiprocessing context keeps its state in shared memory, so that worker processes given the
+    limiter when they start (e.g. through a pool initializer) share one limit and one view of the server's health.
+    """
+    # Positions of the limiter's state in its state array
+    _LIMIT, _ERROR_RATE, _LATENCY, _IN_FLIGHT, _SINCE_CHANGE = range(5)
+
+    def __init__(self, max_limit, policy=None, min_limit=1, context=None):
+        """Constructor
+
+        Parameters
+        ----------
+        max_limit : int
+            The largest number of concurrent requests allowed
+        policy : FetchPolicy
+            The policy holding the latency and error thresholds
+        min_limit : int
+            The smallest number of concurrent requests allowed
+        context : multiprocessing.context.BaseContext
+            If given, the limiter is shared by the processes it is passed to when they are started. Otherwise it is
+            shared by the threads of this process only.
+        """
+        self.policy = policy or FetchPolicy()
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, int(max_limit))
+
+        if context is None:
+            self._condition = threading.Condition()
+            self._state = [0.0] * 5
+        else:
+            self._condition = context.Condition()
+            self._state = context.RawArray('d', 5)
+        self._state[self._LIMIT] = self.max_limit
+
+    @property
+    def limit(self):
+        return int(self._state[self._LIMIT])
+
+    @property
+    def error_rate(self):
+        return self._state[self._ERROR_RATE]
+
+    @property
+    def latency(self):
+        return self._state[self._LATENCY]
+
+    @property
+    def in_flight(self):
+        return int(self._state[self._IN_FLIGHT])
+
+    def acquire(self):
+        """Blocks until a request may be started"""
+        state = self._state
+        with self._condition:
+            while state[self._IN_FLIGHT] >= state[self._LIMIT]:
+                self._condition.wait()
+            state[self._IN_FLIGHT] += 1
+
+    def release(self, ok, latency):
+        """Records the outcome of a request and frees its slot
+
+        Parameters
+        ----------
+        ok : bool
+            Whether the request succeeded
+        latency : float
+            The request's response time in seconds
+        """
+        state = self._state
+        with self._condition:
+            state[self._IN_FLIGHT] -= 1
+            state[self._SINCE_CHANGE] += 1
+            limit = self.limit
+
+            alpha = 2.0 / (limit + 1)
+            state[self._ERROR_RATE] += alpha * ((0.0 if ok else 1.0) - state[self._ERROR_RATE])
+            state[self._LATENCY] += alpha * (latency - state[self._LATENCY])
+
+            unhealthy = self.error_rate > self.policy.error_threshold or self.latency > self.policy.latency_target
+
+            # Change the limit at most once per window, so one burst of failures doesn't collapse it to the minimum
+            if state[self._SINCE_CHANGE] >= limit:
+                if unhealthy and limit > self.min_limit:
+                    state[self._LIMIT] = max(self.min_limit, limit // 2)
+                    state[self._SINCE_CHANGE] = 0
+                    logger.warning('Reduced fetch concurrency to {} (error rate {:.2f}, latency {:.2f}s)'.format(
+                        self.limit, self.error_rate, self.latency))
+                elif not unhealthy and limit < self.max_limit:
+                    state[self._LIMIT] = limit + 1
+                    state[self._SINCE_CHANGE] = 0
+                    logger.debug('Increased fetch concurrency to {}'.format(self.limit))
+
+            self._condition.notify_all()
+
+    def __repr__(self):
+        return '<AdaptiveLimiter(limit={}, max_limit={}, in_flight={})>'.format(self.limit, self.max_limit,
+                                                                               self.in_flight)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Provides chunked, column-oriented reads of pitch data using SQLAlchemy Core
+
+Rows are streamed from the database (with a server-side cursor where the driver has one) and converted a chunk at a
+time into one NumPy array per column, or a pandas DataFrame, so a season of pitches can be scanned in bounded memory
+and without building an ORM object per row.
+
+Columns and filters can name any column of the pitches table, or of the at_bats and games tables the pitches belong
+to, e.g. pitcher_id, game_id or gameday_id; the joins are added as needed.
+
+NumPy is needed for these reads, and pandas for DataFrames (pip install pygameday[analysis]).
+"""
+import logging
+
+from sqlalchemy import select
+
+from .columns import coerce_column
+from .constants import READ_CHUNK_SIZE
+from .models import AtBat
+from .models import Game
+from .models import Pitch
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; see the 'analysis' extra in setup.py
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Tables that pitch queries can take columns and filters from, in the order names are looked up
+PITCH_QUERY_TABLES = (Pitch.__table__, AtBat.__table__, Game.__table__)
+PITCH_COLUMNS = tuple(column.name for column in Pitch.__table__.columns)
+
+
+def _column(name):
+    """Returns the column of the pitch query tables with the given name, pitches first"""
+    for table in PITCH_QUERY_TABLES:
+        if name in table.columns:
+            return table.columns[name]
+    raise ValueError("Unknown column '{}'. Pitches can be read with the columns of: {}".format(
+        name, ', '.join(table.name for table in PITCH_QUERY_TABLES)))
+
+
+def pitch_query(columns=None, filters=None):
+    """Builds the select statement for reading pitches
+
+    Parameters
+    ----------
+    columns : list of str
+        The columns to read. [Default: every column of the pitches table]
+    filters : dict
+        Conditions on columns. A value selects rows equal to it; a list, tuple or set selects rows equal to any of
+        its values.
+
+    Returns
+    -------
+    sqlalchemy.sql.Select
+        The query, ordered by pitch_id
+    """
+    pitches, at_bats, games = PITCH_QUERY_TABLES
+    selected = [_column(name) for name in (columns or PITCH_COLUMNS)]
+    needed = {column.table for column in selected}
+    conditions = []
+
+    for name, value in (filters or {}).items():
+        column = _column(name)
+        needed.add(column.table)
+        if isinstance(value, (list, tuple, set, frozenset)):
+            conditions.append(column.in_(list(value)))
+        elif value is None:
+            conditions.append(column.is_(None))
+        else:
+            conditions.append(column == value)
+
+    # Join the at bats and games only when a column or a filter needs them
+    source = pitches
+    if at_bats in needed or games in needed:
+        source = source.join(at_bats, pitches.c.at_bat_id == at_bats.c.at_bat_id)
+    if games in needed:
+        source = source.join(games, at_bats.c.game_id == games.c.game_id)
+
+    return select(*selected).select_from(source).where(*conditions).order_by(pitches.c.pitch_id)
+
+
+def column_arrays(rows, columns):
+    """Converts rows to one NumPy array per column
+
+    Float columns become float64 arrays, with NaN for missing values. Integer columns become int64 arrays, or
+    float64 arrays with NaN if the rows have missing values, as with pandas.read_sql. Other columns become object
+    arrays.
+
+    Parameters
+    ----------
+    rows : list of tuple
+        The rows, with values in the order of columns
+    columns : list of sqlalchemy.Column
+        The columns
+
+    Returns
+    -------
+    dict
+        The array of each column, by column name
+    """
+    _require_numpy()
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    return {column.name: coerce_column(column_values, column.type) for column, column_values in zip(columns, values)}
+
+
+def iter_pitches(engine, columns=None, filters=None, chunk_size=READ_CHUNK_SIZE, as_frame=False):
+    """Streams pitches from the database in chunks of columns
+
+    Parameters
+    ----------
+    engine : sqlalchemy engine instance
+    columns : list of str
+        The columns to read; see pitch_query. [Default: every column of the pitches table]
+    filters : dict
+        Conditions on columns; see pitch_query
+    chunk_size : int
+        The largest number of pitches per chunk
+    as_frame : bool
+        Whether to yield pandas DataFrames rather than dicts of arrays
+
+    Yields
+    ------
+    dict or pandas.DataFrame
+        A chunk of pitches: the array of each column, by column name, or a DataFrame with those columns
+    """
+    _require_numpy()
+    if as_frame:
+        import pandas as pd
+
+    query = pitch_query(columns, filters)
+    selected = list(query.selected_columns)
+
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=chunk_size).execute(query)
+        for rows in result.partitions(chunk_size):
+            arrays = column_arrays(rows, selected)
+            yield pd.DataFrame(arrays, copy=False) if as_frame else arrays
+
+
+def load_pitches(engine, columns=None, filters=None, chunk_size=READ_CHUNK_SIZE, as_frame=False):
+    """Reads pitches from the database into one array per column
+
+    The pitches are streamed in chunks (see iter_pitches), so only the requested columns are ever held in memory.
+
+    Parameters
+    ----------
+    engine : sqlalchemy engine instance
+    columns : list of str
+        The columns to read; see pitch_query. [Default: every column of the pitches table]
+    filters : dict
+        Conditions on columns; see pitch_query
+    chunk_size : int
+        The number of pitches converted at a time
+    as_frame : bool
+        Whether to return a pandas DataFrame rather than a dict of arrays
+
+    Returns
+    -------
+    dict or pandas.DataFrame
+        The array of each column, by column name, or a DataFrame with those columns
+    """
+    _require_numpy()
+    selected = list(pitch_query(columns, filters).selected_columns)
+    chunks = list(iter_pitches(engine, columns, filters, chunk_size))
+
+    if chunks:
+        arrays = {column.name: np.concatenate([chunk[column.name] for chunk in chunks]) for column in selected}
+    else:
+        arrays = column_arrays([], selected)
+
+    if as_frame:
+        import pandas as pd
+        return pd.DataFrame(arrays, copy=False)
+
+    return arrays
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError('Reading pitches into arrays requires NumPy: pip install pygameday[analysis]')
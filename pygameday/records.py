@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Defines compact row records that the parsers can produce instead of database objects
+
+Records are namedtuples whose fields are the columns of the corresponding table in models.py, with numeric values
+already converted to int or float (missing or malformed values become None). They are much cheaper to build than
+SQLAlchemy objects, pickle compactly between processes, and can be handed straight to a bulk writer.
+
+Primary keys and foreign keys are left out, since the writer assigns them. Pitches refer to their at bat by position
+in the game's list of at bats instead (at_bat_index).
+"""
+from collections import namedtuple
+
+from sqlalchemy import Float
+from sqlalchemy import Integer
+
+from .models import AtBat
+from .models import Game
+from .models import HitInPlay
+from .models import Pitch
+from .models import Player
+
+
+def _column_names(model, exclude=()):
+    return [column.name for column in model.__table__.columns if column.name not in exclude]
+
+
+GameRecord = namedtuple('GameRecord', _column_names(Game, exclude=('game_id',)))
+AtBatRecord = namedtuple('AtBatRecord', _column_names(AtBat, exclude=('at_bat_id', 'game_id')))
+PitchRecord = namedtuple('PitchRecord', ['at_bat_index'] + _column_names(Pitch, exclude=('pitch_id', 'at_bat_id')))
+HitInPlayRecord = namedtuple('HitInPlayRecord', _column_names(HitInPlay, exclude=('hip_id', 'game_id')))
+PlayerRecord = namedtuple('PlayerRecord', _column_names(Player))
+
+# Everything parsed for one game
+ParsedGame = namedtuple('ParsedGame', ['game', 'at_bats', 'pitches', 'hits_in_play', 'players'])
+
+# XML attribute names that differ from the column names they are stored in
+AT_BAT_ATTRIBUTES = {
+    'n_balls': 'b',
+    'n_strikes': 's',
+    'n_outs': 'o',
+    'batter_id': 'batter',
+    'pitcher_id': 'pitcher',
+    'batter_stance': 'stand',
+}
+PITCH_ATTRIBUTES = {
+    'result_type': 'type',
+    'gameday_sv_id': 'sv_id',
+}
+HIT_IN_PLAY_ATTRIBUTES = {
+    'batter_id': 'batter',
+    'pitcher_id': 'pitcher',
+    'hip_type': 'type',
+}
+PLAYER_ATTRIBUTES = {
+    'player_id': 'id',
+}
+
+
+def to_int(value):
+    """Converts a GameDay attribute to an int, returning None for missing or malformed values"""
+    if value is None or value == '':
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return int(float(value))
+        except ValueError:
+            return None
+
+
+def to_float(value):
+    """Converts a GameDay attribute to a float, returning None for missing or malformed values"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _identity(value):
+    return value
+
+
+def converter(model, column_name):
+    """Returns the function that converts a raw value for a column to the column's Python type
+
+    Parameters
+    ----------
+    model : declarative class
+        The model the column belongs to
+    column_name : str
+        The name of the column
+    """
+    column_type = model.__table__.columns[column_name].type
+    if isinstance(column_type, Integer):
+        return to_int
+    if isinstance(column_type, Float):
+        return to_float
+    return _identity
+
+
+def attribute_spec(record_class, model, attributes, context=()):
+    """Builds the (converter, XML attribute) pairs used to fill a record from an XML node
+
+    Parameters
+    ----------
+    record_class : namedtuple class
+        The record to fill
+    model : declarative class
+        The model whose column types the record follows
+    attributes : dict
+        XML attribute names that differ from the column names
+    context : tuple of str
+        Fields that don't come from the node, but from the caller. They must be the record's first fields.
+
+    Returns
+    -------
+    tuple
+        (converter, attribute name) pairs for the record's remaining fields, in order
+    """
+    fields = record_class._fields[len(context):]
+    assert tuple(record_class._fields[:len(context)]) == tuple(context)
+    return tuple((converter(model, field), attributes.get(field, field)) for field in fields)
+
+
+def node_values(node, spec):
+    """Returns the converted values of an XML node's attributes, following an attribute spec"""
+    get = node.get
+    return [convert(get(attribute)) for convert, attribute in spec]
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Provides decoding of master_scoreboard.json that keeps only the fields pygameday reads
+
+A scoreboard lists every game of a date with dozens of fields each: links, media, alerts, probable pitchers, the line
+score of every inning, and so on. Ingest reads about fifteen of them. With msgspec installed, scoreboards are decoded
+against the typed structs below, which skip every other field while decoding, so nothing is allocated for them. The
+result is the same nested dicts json.loads returns, restricted to those fields.
+
+Without msgspec, or if a scoreboard doesn't fit the structs (e.g. a field has an unexpected type), the whole
+scoreboard is decoded with the json module instead.
+"""
+import json
+import logging
+from typing import List
+from typing import Optional
+from typing import Union
+
+try:
+    import msgspec
+except ImportError:  # msgspec is optional; see the 'speedups' extra in setup.py
+    msgspec = None
+
+logger = logging.getLogger(__name__)
+
+
+if msgspec is not None:
+    # Fields missing from a scoreboard are left out of the decoded dicts, as with json.loads (omit_defaults)
+
+    class _Status(msgspec.Struct, omit_defaults=True):
+        status: Optional[str] = None
+
+    class _Runs(msgspec.Struct, omit_defaults=True):
+        home: Optional[str] = None
+        away: Optional[str] = None
+
+    class _Linescore(msgspec.Struct, omit_defaults=True):
+        r: Optional[_Runs] = None
+
+    class _Game(msgspec.Struct, omit_defaults=True):
+        id: Optional[str] = None
+        status: Optional[_Status] = None
+        game_type: Optional[str] = None
+        game_data_directory: Optional[str] = None
+        time_date_hm_lg: Optional[str] = None
+        time_zone_hm_lg: Optional[str] = None
+        hm_lg_ampm: Optional[str] = None
+        venue: Optional[str] = None
+        league: Optional[str] = None
+        home_name_abbrev: Optional[str] = None
+        home_team_city: Optional[str] = None
+        home_team_name: Optional[str] = None
+        away_name_abbrev: Optional[str] = None
+        away_team_city: Optional[str] = None
+        away_team_name: Optional[str] = None
+        linescore: Optional[_Linescore] = None
+
+    class _Games(msgspec.Struct, omit_defaults=True):
+        # A date with a single game has an object rather than a list
+        game: Union[List[_Game], _Game, None] = None
+
+    class _Data(msgspec.Struct):
+        games: _Games
+
+    class _Scoreboard(msgspec.Struct):
+        data: _Data
+
+    _decoder = msgspec.json.Decoder(_Scoreboard)
+
+
+def decode_scoreboard(content):
+    """Decodes a master_scoreboard.json page
+
+    Parameters
+    ----------
+    content : bytes
+        The page's body
+
+    Returns
+    -------
+    dict
+        The scoreboard, as nested dicts and lists like json.loads returns. With msgspec, only the fields of the games
+        that pygameday reads are present.
+
+    Raises
+    ------
+    ValueError
+        If the page is not JSON, e.g. because it was cut off
+    """
+    if msgspec is not None:
+        try:
+            return msgspec.to_builtins(_decoder.decode(content))
+        except msgspec.ValidationError as ex:
+            logger.debug('Decoding a scoreboard with the json module: {}'.format(ex))
+
+    return json.loads(content)
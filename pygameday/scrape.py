@@ -2,39 +2,410 @@
 # -*- coding: utf-8 -*-
 """Provides functionality for scraping MLB GameDay data from the GameDay website
 """
+import os
+import json
+import time
+import uuid
 import requests
 import logging
 from datetime import datetime
+from datetime import timedelta
+from functools import partial
+from urllib.parse import urlsplit
 
+from requests.adapters import HTTPAdapter
+
+from .constants import CACHE_SCOREBOARD_SETTLE_DAYS
+from .constants import CACHE_SCOREBOARD_TTL
+from .constants import CACHE_SETTLED_STATUSES
 from .constants import GD_SERVER
 from .constants import GD_BASE_PATH
+from .constants import HTTP_HEADERS
+from .constants import HTTP_POOL_MAXSIZE
+from .policy import AdaptiveLimiter
+from .policy import FetchPolicy
+from .scoreboard import decode_scoreboard
 
 logger = logging.getLogger(__name__)
 
+# The session is created lazily and is owned by the process that created it. Worker processes inherit the module
+# state when they are forked, so we remember the PID and build a fresh session rather than sharing sockets.
+_session = None
+_session_pid = None
+_pool_maxsize = HTTP_POOL_MAXSIZE
+_policy = FetchPolicy()
+_limiter = None
+_limiter_pid = None
+_shared_limiter = None  # A limiter shared with other processes, used instead of this process's own
+_cache = None
+_source = None  # None means fetching from the GameDay server over HTTP
+
+
+class Page(object):
+    """The body of a fetched GameDay page
+
+    Pages are returned by get_url whether they came from the network or from the page cache. They offer the parts of
+    the requests response interface that the parsers use.
+    """
+    ok = True
+
+    def __init__(self, url, content):
+        self.url = url
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def __repr__(self):
+        return "<Page(url=\'{}\', {} bytes)>".format(self.url, len(self.content))
+
+
+def configure_session(pool_maxsize=HTTP_POOL_MAXSIZE):
+    """Configures the connection-pooled HTTP session used by this process
+
+    Any existing session is closed; a new one is created on the next request.  This function is also suitable as a
+    ``ProcessPoolExecutor`` initializer so that each worker process gets its own pool.
+
+    Parameters
+    ----------
+    pool_maxsize : int
+        The maximum number of keep-alive connections to hold open to the GameDay server
+    """
+    global _pool_maxsize, _limiter
+    close_session()
+    _pool_maxsize = max(1, int(pool_maxsize))
+    _limiter = None
+
+
+def ensure_pool_size(pool_maxsize):
+    """Grows the session's connection pool, and the concurrency limit that follows it, to at least pool_maxsize
 
-def get_url(url):
+    Parameters
+    ----------
+    pool_maxsize : int
+        The number of concurrent requests the caller is about to make
+    """
+    if _pool_maxsize < pool_maxsize:
+        configure_session(pool_maxsize)
+
+
+def close_session():
+    """Closes the HTTP session for this process, if there is one
+    """
+    global _session, _session_pid
+    if _session is not None and _session_pid == os.getpid():
+        _session.close()
+    _session = None
+    _session_pid = None
+
+
+def configure_policy(policy):
+    """Sets the fetch policy (timeouts, retries, backoff) used by get_url in this process
+
+    Parameters
+    ----------
+    policy : pygameday.policy.FetchPolicy
+        The policy to use, or None for the default policy
+    """
+    global _policy, _limiter
+    _policy = policy or FetchPolicy()
+    _limiter = None
+
+
+def configure_limiter(limiter):
+    """Sets a concurrency limiter that get_url in this process shares with other processes
+
+    Worker processes each make one request at a time, so a limiter of their own never has anything to hold back. Given
+    a limiter created with a multiprocessing context, the workers and their parent throttle against one limit instead.
+
+    Parameters
+    ----------
+    limiter : pygameday.policy.AdaptiveLimiter
+        The shared limiter, or None to go back to this process's own limiter
+    """
+    global _shared_limiter
+    _shared_limiter = limiter
+
+
+def get_limiter():
+    """Returns the adaptive concurrency limiter for this process, creating it if necessary
+
+    The limiter allows as many concurrent requests as the session's connection pool holds, and backs off when the
+    server's error rate or response time rises. A limiter set with configure_limiter takes precedence.
+    """
+    global _limiter, _limiter_pid
+    if _shared_limiter is not None:
+        return _shared_limiter
+
+    pid = os.getpid()
+
+    if _limiter is None or _limiter_pid != pid:
+        _limiter = AdaptiveLimiter(_pool_maxsize, _policy)
+        _limiter_pid = pid
+
+    return _limiter
+
+
+def configure_cache(cache):
+    """Sets the page cache used by get_url in this process
+
+    Parameters
+    ----------
+    cache : pygameday.cache.PageCache
+        The cache to use, or None to disable caching
+    """
+    global _cache
+    _cache = cache
+
+
+def configure_source(source):
+    """Sets the page source that the fetch_* functions read from in this process
+
+    Parameters
+    ----------
+    source : pygameday.sources.PageSource
+        The source to use, e.g. a local mirror directory or archive. If None, pages are fetched from the GameDay
+        server over HTTP.
+    """
+    global _source
+    _source = source
+
+
+def get_session():
+    """Returns the HTTP session for this process, creating it if necessary
+
+    Returns
+    -------
+    requests.Session
+        A session with keep-alive connection pooling and gzip negotiation
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+
+    if _session is None or _session_pid != pid:
+        session = requests.Session()
+        session.headers.update(HTTP_HEADERS)
+        adapter = HTTPAdapter(pool_maxsize=_pool_maxsize)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        _session = session
+        _session_pid = pid
+        logger.debug('Created HTTP session with pool size {} in process {}'.format(_pool_maxsize, pid))
+
+    return _session
+
+
+def get_url(url, ttl=None):
     """Fetches a URL, returning the page content
 
+    If a page cache is configured, the page is served from the cache when possible and stored in it otherwise.
+
+    Requests follow the configured FetchPolicy: they time out, and connection errors, timeouts and server errors are
+    retried with exponential backoff. The number of concurrent requests in this process is limited adaptively.
+
     Parameters
     ----------
     url : str
         The URL to get
+    ttl : float or callable
+        Seconds until a cached copy of the page expires, or a function of the fetched Page returning that number.
+        If None, the cached page never expires.
 
     Returns
     -------
-    requests response
-        The requests page corresonding to the URL
+    Page
+        The page corresponding to the URL, or None if it could not be fetched
     """
-    logger.debug('Fetching URL: {}'.format(url))
-    page = requests.get(url)
+    cache = _cache
+    cache_key = urlsplit(url).path
 
-    if not page.ok:
-        logger.error('Error fetching {}'.format(url))
+    if cache is not None:
+        content = cache.get(cache_key)
+        if content is not None:
+            logger.debug('Fetched URL from cache: {}'.format(url))
+            return Page(url, content)
+
+    response = _fetch(url)
+    if response is None:
         return None
 
+    page = Page(url, response.content)
+
+    if cache is not None:
+        cache.put(cache_key, page.content, ttl(page) if callable(ttl) else ttl)
+
     return page
 
 
+def _fetch(url):
+    """Fetches a URL over HTTP according to the fetch policy
+
+    Returns
+    -------
+    requests.Response
+        The successful response, or None if the URL could not be fetched
+    """
+    policy = _policy
+    limiter = get_limiter()
+    session = get_session()
+
+    for attempt in range(policy.max_retries + 1):
+        logger.debug('Fetching URL: {}'.format(url))
+        retry_after = None
+
+        limiter.acquire()
+        start_time = time.monotonic()
+        healthy = False
+        try:
+            response = session.get(url, timeout=policy.timeout)
+            # A definitive answer from the server, even a 404, says it is healthy
+            retryable = policy.should_retry(response.status_code)
+            healthy = not retryable
+        except requests.RequestException as ex:
+            # Connection errors and timeouts, but also bodies cut off or garbled in transit and redirect loops
+            response = None
+            error = '{}: {}'.format(type(ex).__name__, ex)
+        finally:
+            # Free the slot whatever happened, or the limiter would eventually block every worker
+            limiter.release(healthy, time.monotonic() - start_time)
+
+        if response is not None:
+            if response.ok:
+                return response
+            if not retryable:
+                logger.error('Error fetching {}: HTTP {}'.format(url, response.status_code))
+                return None
+
+            error = 'HTTP {}'.format(response.status_code)
+            retry_after = response.headers.get('Retry-After')
+
+        if attempt < policy.max_retries:
+            delay = policy.backoff(attempt, retry_after)
+            logger.warning('Error fetching {} ({}); retrying in {:.1f}s'.format(url, error, delay))
+            time.sleep(delay)
+
+    logger.error('Error fetching {} ({}) after {} attempts'.format(url, error, policy.max_retries + 1))
+    return None
+
+
+def get_page(path, ttl=None):
+    """Fetches a GameDay page by its path from the configured page source
+
+    Parameters
+    ----------
+    path : str
+        The GameDay URL path of the page, e.g. '/components/game/mlb/year_2018/.../players.xml'
+    ttl : float or callable
+        The cache TTL of the page (see get_url). Only used when fetching over HTTP.
+
+    Returns
+    -------
+    Page
+        The page, or None if it could not be fetched
+    """
+    source = _source
+    if source is not None:
+        return source.get(path, ttl)
+
+    return get_url('http://' + GD_SERVER + path, ttl)
+
+
+def date_path(date, filename):
+    """Returns the GameDay URL path of a file in a date's directory
+
+    Parameters
+    ----------
+    date : datetime.datetime
+        The date
+    filename : str
+        The file name, e.g. 'master_scoreboard.json'
+    """
+    return "{}/year_{:d}/month_{:02d}/day_{:02d}/{}".format(GD_BASE_PATH, date.year, date.month, date.day, filename)
+
+
+def scoreboard_ttl(date, page):
+    """Returns how long a master scoreboard page may be cached
+
+    A scoreboard never changes once its date is a few days old and every game on it is settled (e.g., Final or
+    Postponed). Until then, it is refetched after CACHE_SCOREBOARD_TTL seconds.
+
+    Parameters
+    ----------
+    date : datetime.datetime
+        The date of the scoreboard
+    page : Page
+        The scoreboard page
+
+    Returns
+    -------
+    float
+        The TTL in seconds, or None if the page never expires
+    """
+    if date.date() > (datetime.now() - timedelta(days=CACHE_SCOREBOARD_SETTLE_DAYS)).date():
+        return CACHE_SCOREBOARD_TTL
+
+    scoreboard = decode_scoreboard_page(page)
+    if scoreboard is None:
+        return CACHE_SCOREBOARD_TTL  # A malformed page is fetched again soon
+
+    games = scoreboard['data']['games'].get('game', [])
+    if isinstance(games, dict):
+        games = [games]
+
+    if all(game['status']['status'] in CACHE_SETTLED_STATUSES for game in games):
+        return None
+
+    return CACHE_SCOREBOARD_TTL
+
+
+def decode_scoreboard_page(page):
+    """Decodes a master_scoreboard.json page
+
+    Parameters
+    ----------
+    page : Page
+        The scoreboard page
+
+    Returns
+    -------
+    dict
+        The decoded scoreboard (see scoreboard.decode_scoreboard), or None if the page is malformed, e.g. cut off
+    """
+    try:
+        scoreboard = decode_scoreboard(page.content)
+        games = scoreboard['data']['games']  # Every reader of a scoreboard relies on this much of its structure
+    except (ValueError, KeyError, TypeError) as ex:
+        logger.error('Malformed scoreboard {}: {}: {}'.format(page.url, type(ex).__name__, ex))
+        return None
+
+    if not isinstance(games, dict):
+        logger.error('Malformed scoreboard {}: its games are not an object'.format(page.url))
+        return None
+
+    return scoreboard
+
+
+def fetch_master_scoreboard_page(date):
+    """Fetch the raw master_scoreboard.json page for a given day
+
+    Parameters
+    ----------
+    date : datetime.datetime
+        The day to fetch
+
+    Returns
+    -------
+    Page
+        The undecoded scoreboard page, or None if it could not be fetched
+    """
+    return get_page(date_path(date, 'master_scoreboard.json'), ttl=partial(scoreboard_ttl, date))
+
+
 def fetch_master_scoreboard(date):
     """Fetch the master scoreboard page containing of games on a given day
 
@@ -46,17 +417,16 @@ def fetch_master_scoreboard(date):
     Returns
     -------
     dict
-        Dictionary of games data on the given day
-    """
-    url = "http://{}{}/year_{:d}/month_{:02d}/day_{:02d}/master_scoreboard.json".format(
-        GD_SERVER, GD_BASE_PATH, date.year, date.month, date.day)
-    response = requests.get(url)
-    if response.ok:
-        return response.json()
-    else:
-        logger.error('Error fetching URL {}'.format(url))
+        Dictionary of games data on the given day, with the fields of each game that pygameday reads (see
+        scoreboard.decode_scoreboard), or None if the page could not be fetched or is malformed. Use
+        fetch_master_scoreboard_page for the whole page.
+    """
+    response = fetch_master_scoreboard_page(date)
+    if response is None:
         return None
 
+    return decode_scoreboard_page(response)
+
 
 def fetch_epg(date):
     """Fetch epg.xml (possibly stands for "event page"?) for a given day
@@ -73,9 +443,7 @@ def fetch_epg(date):
         place on the given day.
 
     """
-    url = "http://{}{}/year_{:d}/month_{:02d}/day_{:02d}/epg.xml".format(
-        GD_SERVER, GD_BASE_PATH, date.year, date.month, date.day)
-    return get_url(url)
+    return get_page(date_path(date, 'epg.xml'))
 
 
 def fetch_inning_all(game_directory):
@@ -94,8 +462,7 @@ def fetch_inning_all(game_directory):
         XML-formatted data containing game event data.
 
     """
-    url = 'http://' + GD_SERVER + game_directory + '/inning/inning_all.xml'
-    return get_url(url)
+    return get_page(game_directory + '/inning/inning_all.xml')
 
 
 def fetch_hit_chart(game_directory):
@@ -114,8 +481,7 @@ def fetch_hit_chart(game_directory):
         XML-formatted data containing ball-in-play data.
 
     """
-    url = 'http://' + GD_SERVER + game_directory + '/inning/inning_hit.xml'
-    return get_url(url)
+    return get_page(game_directory + '/inning/inning_hit.xml')
 
 
 def fetch_players(game_directory):
@@ -134,23 +500,31 @@ def fetch_players(game_directory):
         XML-formatted data containing player data.
 
     """
-    url = 'http://' + GD_SERVER + game_directory + '/players.xml'
-    return get_url(url)
+    return get_page(game_directory + '/players.xml')
 
 
 def save_page(page, file_path):
     """Save page content to disk
 
+    The raw bytes of the page are written, creating parent directories as needed. The file is replaced atomically so
+    a partially written page is never left behind.
+
     Parameters
     ----------
-    page : requests get result
+    page : Page
 
     file_path : str
         The path to the file that will store the page contents
 
     """
-    with open(file_path, 'w') as f:
-        f.write(page.text)
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = '{}.{}.tmp'.format(file_path, uuid.uuid4().hex)
+    with open(tmp_path, 'wb') as f:
+        f.write(page.content)
+    os.replace(tmp_path, file_path)
 
 
 def test():
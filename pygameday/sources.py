@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Defines page sources, which let the scrape functions read GameDay pages from places other than the GameDay server
+
+A page source maps a GameDay URL path such as
+'/components/game/mlb/year_2018/month_04/day_06/gid_2018_04_06_nynmlb_wasmlb_1/players.xml' to a Page. Local
+sources read a mirror laid out exactly like the server, either as a directory tree or as a tar or zip archive.
+"""
+import bz2
+import gzip
+import logging
+import lzma
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import weakref
+import zipfile
+
+from . import scrape
+from .constants import GD_SERVER
+
+logger = logging.getLogger(__name__)
+
+# Archive members are matched on the part of their name starting here, so archives may have any top-level directory
+GD_ROOT_DIRECTORY = 'components/'
+
+# Leading bytes of the compressions a tar may use, and how to open each for reading
+COMPRESSED_MAGIC = (
+    (b'\x1f\x8b', gzip.open),
+    (b'BZh', bz2.open),
+    (b'\xfd7zXZ\x00', lzma.open),
+)
+ARCHIVE_COPY_BUFFER = 1 << 20  # Bytes copied at a time when decompressing a tar
+
+
+class PageSource(object):
+    """Base class for page sources
+    """
+    def get(self, path, ttl=None):
+        """Returns the page at a GameDay URL path
+
+        Parameters
+        ----------
+        path : str
+            The GameDay URL path of the page
+        ttl : float or callable
+            The cache TTL of the page, for sources that cache
+
+        Returns
+        -------
+        Page
+            The page, or None if it does not exist
+        """
+        raise NotImplementedError
+
+
+class HttpSource(PageSource):
+    """Fetches pages from a GameDay server over HTTP, through the pooled session and page cache of scrape
+    """
+    def __init__(self, server=GD_SERVER, scheme='http'):
+        """Constructor
+
+        Parameters
+        ----------
+        server : str
+            The host (and optionally port) of the server
+        scheme : str
+            'http' or 'https'
+        """
+        self.server = server
+        self.scheme = scheme
+
+    def get(self, path, ttl=None):
+        return scrape.get_url('{}://{}{}'.format(self.scheme, self.server, path), ttl)
+
+    def __repr__(self):
+        return "<HttpSource(\'{}://{}\')>".format(self.scheme, self.server)
+
+
+class DirectorySource(PageSource):
+    """Reads pages from a local mirror directory, such as one written by pygameday.mirror
+    """
+    def __init__(self, root):
+        """Constructor
+
+        Parameters
+        ----------
+        root : str
+            The directory that contains the 'components' directory of the mirror
+        """
+        self.root = root
+
+    def get(self, path, ttl=None):
+        file_path = os.path.join(self.root, *path.strip('/').split('/'))
+        try:
+            with open(file_path, 'rb') as f:
+                content = f.read()
+        except OSError:
+            logger.warning('Page {} not found in {}'.format(path, self.root))
+            return None
+
+        return scrape.Page(file_path, content)
+
+    def __repr__(self):
+        return "<DirectorySource(\'{}\')>".format(self.root)
+
+
+class ArchiveSource(PageSource):
+    """Reads pages from a tar (optionally compressed) or zip archive of a mirror
+
+    Zip archives and uncompressed tars are read in place. Members of a compressed tar can only be reached by
+    decompressing the stream from its start, so a compressed tar is decompressed once, when the source is created, into
+    an uncompressed tar in the temporary directory, which needs as much free space as the uncompressed mirror. It is
+    deleted when the source is closed or garbage collected.
+
+    The member index of a tar is built when the source is created and travels with the source when it is handed to
+    worker processes, which read members at their offsets without scanning the archive again. Zip archives, whose
+    index is stored at their end, are opened lazily in each process. Reads are serialized because file, tarfile and
+    zipfile objects are not safe to share between threads.
+    """
+    def __init__(self, archive_path):
+        """Constructor
+
+        Parameters
+        ----------
+        archive_path : str
+            The path to a .tar, .tar.gz, .tgz, .tar.bz2, .tar.xz, or .zip archive
+        """
+        self.archive_path = archive_path
+        self._tar_path = None  # The uncompressed tar that tar members are read from
+        self._tar_members = None  # GameDay path -> (offset, size) of each file in _tar_path
+        self._temporary = None  # Deletes the temporary uncompressed tar, in the process that created it
+        self._file = None  # The open archive (a file for tars, a ZipFile for zips) in the process _pid
+        self._zip_members = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+        if not zipfile.is_zipfile(archive_path):
+            self._index_tar()
+
+    def __getstate__(self):
+        return {'archive_path': self.archive_path, 'tar_path': self._tar_path, 'tar_members': self._tar_members}
+
+    def __setstate__(self, state):
+        self.archive_path = state['archive_path']
+        self._tar_path = state['tar_path']
+        self._tar_members = state['tar_members']
+        self._temporary = None
+        self._file = None
+        self._zip_members = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _index_tar(self):
+        """Indexes the files of a tar archive, decompressing it first if it is compressed"""
+        tar_path = self.archive_path
+        with open(self.archive_path, 'rb') as f:
+            magic = f.read(6)
+        open_compressed = next((opener for prefix, opener in COMPRESSED_MAGIC if magic.startswith(prefix)), None)
+
+        if open_compressed is not None:
+            start_time = time.perf_counter()
+            fd, tar_path = tempfile.mkstemp(prefix='pygameday-', suffix='.tar')
+            self._temporary = weakref.finalize(self, _remove_temporary, tar_path, os.getpid())
+            with open_compressed(self.archive_path) as compressed, os.fdopen(fd, 'wb') as uncompressed:
+                shutil.copyfileobj(compressed, uncompressed, ARCHIVE_COPY_BUFFER)
+            logger.info('Decompressed {} to {} in {:.1f} s'.format(self.archive_path, tar_path,
+                                                                   time.perf_counter() - start_time))
+
+        members = {}
+        with tarfile.open(tar_path) as archive:
+            for info in archive:
+                index = info.name.find(GD_ROOT_DIRECTORY)
+                if info.isfile() and index >= 0:
+                    members['/' + info.name[index:]] = (info.offset_data, info.size)
+
+        logger.debug('Indexed archive {} with {} GameDay files'.format(self.archive_path, len(members)))
+        self._tar_path = tar_path
+        self._tar_members = members
+
+    def _open(self):
+        if self._tar_members is not None:
+            self._file = open(self._tar_path, 'rb')
+        else:
+            archive = zipfile.ZipFile(self.archive_path)
+            members = {}
+            for info in archive.infolist():
+                index = info.filename.find(GD_ROOT_DIRECTORY)
+                if not info.is_dir() and index >= 0:
+                    members['/' + info.filename[index:]] = info
+            logger.debug('Opened archive {} with {} GameDay files'.format(self.archive_path, len(members)))
+            self._file = archive
+            self._zip_members = members
+        self._pid = os.getpid()
+
+    def get(self, path, ttl=None):
+        with self._lock:
+            if self._file is None or self._pid != os.getpid():
+                self._open()
+
+            members = self._tar_members if self._tar_members is not None else self._zip_members
+            info = members.get(path)
+            if info is None:
+                logger.warning('Page {} not found in {}'.format(path, self.archive_path))
+                return None
+
+            if self._tar_members is not None:
+                offset, size = info
+                self._file.seek(offset)
+                content = self._file.read(size)
+            else:
+                content = self._file.read(info)
+
+        return scrape.Page(self.archive_path + ':' + path, content)
+
+    def close(self):
+        """Closes the archive, and deletes its temporary uncompressed copy if this process made one
+        """
+        with self._lock:
+            if self._file is not None and self._pid == os.getpid():
+                self._file.close()
+            self._file = None
+            self._zip_members = None
+            if self._temporary is not None:
+                self._temporary()
+
+    def __repr__(self):
+        return "<ArchiveSource(\'{}\')>".format(self.archive_path)
+
+
+def _remove_temporary(path, pid):
+    # Worker processes forked from the creator share the file but must not delete it
+    if os.getpid() == pid and os.path.exists(path):
+        os.remove(path)
+
+
+def open_source(location):
+    """Returns the page source for a location
+
+    Parameters
+    ----------
+    location : str
+        A directory, an archive file, or an 'http://' or 'https://' server URL
+
+    Returns
+    -------
+    PageSource
+    """
+    if location.startswith('http://') or location.startswith('https://'):
+        scheme, server = location.rstrip('/').split('://', 1)
+        return HttpSource(server, scheme)
+
+    if os.path.isdir(location):
+        return DirectorySource(location)
+
+    return ArchiveSource(location)
@@ -0,0 +1,380 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Provides bulk database writes of parsed GameDay records using SQLAlchemy Core
+
+Rather than adding ORM objects to a session and flushing them one row at a time, each table is written with a single
+executemany per batch of games. Primary keys generated for games and at bats are read back in parameter order, so
+the foreign keys of at bats, pitches and hits in play are assigned in bulk.
+"""
+import io
+import logging
+import time
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects import sqlite
+
+from .models import AtBat
+from .models import Game
+from .models import HitInPlay
+from .models import Pitch
+from .models import Player
+from .records import AtBatRecord
+from .records import GameRecord
+from .records import HitInPlayRecord
+from .records import PitchRecord
+
+logger = logging.getLogger(__name__)
+
+STAGING_PREFIX = 'pygameday_staging_'  # Prefix of the temporary tables used by the COPY loader
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+class WriteStats(object):
+    """Counts the rows written and the time spent writing them
+    """
+    def __init__(self):
+        self.games = 0
+        self.at_bats = 0
+        self.pitches = 0
+        self.hits_in_play = 0
+        self.players = 0
+        self.seconds = 0.0
+        self.existing = set()  # GameDay IDs of the games of one write that were left out, being in the DB already
+
+    @property
+    def rows(self):
+        return self.games + self.at_bats + self.pitches + self.hits_in_play + self.players
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def add(self, other):
+        """Adds the counts of another WriteStats to these (existing isn't added up)"""
+        for name in ('games', 'at_bats', 'pitches', 'hits_in_play', 'players', 'seconds'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def __repr__(self):
+        return ('<WriteStats(games={}, at_bats={}, pitches={}, hits_in_play={}, players={}, {:.0f} rows/s)>'
+                .format(self.games, self.at_bats, self.pitches, self.hits_in_play, self.players,
+                        self.rows_per_second))
+
+
+def insert_returning_ids(connection, table, rows):
+    """Inserts rows into a table, returning their generated primary keys in the same order as the rows
+
+    The rows are sent with a single executemany when the dialect can return primary keys in parameter order (e.g.,
+    SQLite 3.35+ and PostgreSQL with SQLAlchemy 2). Otherwise they are inserted one at a time.
+
+    Parameters
+    ----------
+    connection : sqlalchemy.engine.Connection
+    table : sqlalchemy.Table
+    rows : list of dict
+
+    Returns
+    -------
+    list
+        The primary key of each row
+    """
+    if not rows:
+        return []
+
+    primary_key = table.primary_key.columns.values()[0]
+    dialect = connection.dialect
+
+    if getattr(dialect, 'insert_executemany_returning_sort_by_parameter_order', False):
+        statement = table.insert().returning(primary_key, sort_by_parameter_order=True)
+        return [row[0] for row in connection.execute(statement, rows)]
+
+    return [connection.execute(table.insert(), row).inserted_primary_key[0] for row in rows]
+
+
+def insert_games(connection, parsed_games):
+    """Inserts parsed games, with their at bats, pitches and hits in play
+
+    Players are inserted separately, with upsert_players. The caller owns the transaction.
+
+    Parameters
+    ----------
+    connection : sqlalchemy.engine.Connection
+        A connection in a transaction
+    parsed_games : list of records.ParsedGame
+        The games to insert
+
+    Returns
+    -------
+    WriteStats
+        The number of rows written and the time it took
+    """
+    stats = WriteStats()
+    if not parsed_games:
+        return stats
+
+    start_time = time.perf_counter()
+
+    game_ids = insert_returning_ids(connection, Game.__table__, [p.game._asdict() for p in parsed_games])
+
+    at_bat_rows = []
+    hip_rows = []
+    for game_id, parsed in zip(game_ids, parsed_games):
+        for at_bat in parsed.at_bats:
+            row = at_bat._asdict()
+            row['game_id'] = game_id
+            at_bat_rows.append(row)
+
+        for hip in parsed.hits_in_play:
+            row = hip._asdict()
+            row['game_id'] = game_id
+            hip_rows.append(row)
+
+    at_bat_ids = insert_returning_ids(connection, AtBat.__table__, at_bat_rows)
+
+    pitch_rows = []
+    offset = 0  # Position of the game's first at bat in at_bat_ids
+    for parsed in parsed_games:
+        for pitch in parsed.pitches:
+            row = pitch._asdict()
+            row['at_bat_id'] = at_bat_ids[offset + row.pop('at_bat_index')]
+            pitch_rows.append(row)
+        offset += len(parsed.at_bats)
+
+    if pitch_rows:
+        connection.execute(Pitch.__table__.insert(), pitch_rows)
+    if hip_rows:
+        connection.execute(HitInPlay.__table__.insert(), hip_rows)
+
+    stats.games = len(game_ids)
+    stats.at_bats = len(at_bat_rows)
+    stats.pitches = len(pitch_rows)
+    stats.hits_in_play = len(hip_rows)
+    stats.seconds = time.perf_counter() - start_time
+
+    logger.debug('Inserted {} games: {}'.format(len(game_ids), stats))
+    return stats
+
+
+def upsert_players(connection, players):
+    """Inserts the players that are not in the database yet, ignoring the ones that are
+
+    On SQLite and PostgreSQL this is a single INSERT ... ON CONFLICT DO NOTHING statement. On other databases the
+    existing players are looked up with one query, and only the missing ones are inserted.
+
+    Parameters
+    ----------
+    connection : sqlalchemy.engine.Connection
+        A connection in a transaction
+    players : iterable of records.PlayerRecord
+        The players, possibly with duplicates
+
+    Returns
+    -------
+    set
+        The IDs of all the given players, which are now all in the database
+    """
+    rows = {}
+    for player in players:
+        rows.setdefault(player.player_id, player._asdict())
+
+    if not rows:
+        return set()
+
+    table = Player.__table__
+    dialect_name = connection.dialect.name
+
+    if dialect_name in ('sqlite', 'postgresql'):
+        insert = sqlite.insert if dialect_name == 'sqlite' else postgresql.insert
+        statement = insert(table).on_conflict_do_nothing(index_elements=[table.c.player_id])
+        connection.execute(statement, list(rows.values()))
+
+    else:
+        existing = set(connection.execute(select(table.c.player_id).where(table.c.player_id.in_(rows))).scalars())
+        missing = [row for player_id, row in rows.items() if player_id not in existing]
+        if missing:
+            connection.execute(table.insert(), missing)
+
+    logger.debug('Upserted {} players'.format(len(rows)))
+    return set(rows)
+
+
+def existing_gameday_ids(connection, gameday_ids):
+    """Returns which of the given games are already in the database, with one query
+
+    Parameters
+    ----------
+    connection : sqlalchemy.engine.Connection
+    gameday_ids : iterable of str
+        The GameDay IDs of the games to look up
+
+    Returns
+    -------
+    set
+        The GameDay IDs that are in the games table
+    """
+    gameday_ids = set(gameday_ids)
+    if not gameday_ids:
+        return set()
+
+    column = Game.__table__.c.gameday_id
+    return set(connection.execute(select(column).where(column.in_(gameday_ids))).scalars())
+
+
+def copy_games(connection, parsed_games):
+    """Loads parsed games into PostgreSQL with COPY
+
+    The records are streamed with COPY FROM STDIN into temporary staging tables that mirror the real tables plus
+    game-local keys (game_key, at_bat_index). Set-based SQL then draws primary keys from the tables' sequences, joins
+    the staging tables to assign foreign keys, and moves the rows into the real tables. The staging tables are
+    dropped when the transaction commits.
+
+    This requires a PostgreSQL connection through psycopg2 or psycopg. Players are inserted separately, with
+    upsert_players. The caller owns the transaction.
+
+    Parameters
+    ----------
+    connection : sqlalchemy.engine.Connection
+        A connection to PostgreSQL in a transaction
+    parsed_games : list of records.ParsedGame
+        The games to load
+
+    Returns
+    -------
+    WriteStats
+        The number of rows written and the time it took
+    """
+    stats = WriteStats()
+    if not parsed_games:
+        return stats
+
+    if connection.dialect.name != 'postgresql':
+        raise ValueError('The COPY loader requires PostgreSQL, not {}'.format(connection.dialect.name))
+
+    start_time = time.perf_counter()
+
+    game_rows = []
+    at_bat_rows = []
+    pitch_rows = []
+    hip_rows = []
+    for game_key, parsed in enumerate(parsed_games):
+        game_rows.append((game_key,) + tuple(parsed.game))
+        at_bat_rows.extend((game_key, index) + tuple(ab) for index, ab in enumerate(parsed.at_bats))
+        pitch_rows.extend((game_key,) + tuple(p) for p in parsed.pitches)
+        hip_rows.extend((game_key,) + tuple(h) for h in parsed.hits_in_play)
+
+    stages = (
+        (Game, ['game_key'] + list(GameRecord._fields), game_rows),
+        (AtBat, ['game_key', 'at_bat_index'] + list(AtBatRecord._fields), at_bat_rows),
+        (Pitch, ['game_key'] + list(PitchRecord._fields), pitch_rows),
+        (HitInPlay, ['game_key'] + list(HitInPlayRecord._fields), hip_rows),
+    )
+
+    for model, columns, rows in stages:
+        table = model.__table__
+        staging = STAGING_PREFIX + table.name
+        connection.exec_driver_sql('CREATE TEMPORARY TABLE {} ON COMMIT DROP AS SELECT * FROM {} WITH NO DATA'
+                                   .format(staging, table.name))
+        connection.exec_driver_sql('ALTER TABLE {} ADD COLUMN game_key INTEGER, ADD COLUMN at_bat_index INTEGER'
+                                   .format(staging))
+        _copy_rows(connection, staging, columns, rows)
+
+    for statement in _copy_move_statements():
+        connection.exec_driver_sql(statement)
+
+    stats.games = len(game_rows)
+    stats.at_bats = len(at_bat_rows)
+    stats.pitches = len(pitch_rows)
+    stats.hits_in_play = len(hip_rows)
+    stats.seconds = time.perf_counter() - start_time
+
+    logger.debug('Copied {} games: {}'.format(len(game_rows), stats))
+    return stats
+
+
+def _copy_move_statements():
+    """Returns the SQL that moves staged rows into the real tables, assigning primary and foreign keys"""
+    def columns(record_class, prefix):
+        return ', '.join(prefix + c for c in record_class._fields if c != 'at_bat_index')
+
+    def next_value(model):
+        primary_key = model.__table__.primary_key.columns.values()[0]
+        return "nextval('{}')".format(primary_key.default.name)
+
+    games = STAGING_PREFIX + 'games'
+    at_bats = STAGING_PREFIX + 'at_bats'
+    pitches = STAGING_PREFIX + 'pitches'
+    hits_in_play = STAGING_PREFIX + 'hits_in_play'
+
+    # Keys are drawn in game order, at bat order and pitch order, so IDs sort the same way the ORM relationships do
+    return [
+        'UPDATE {games} AS g SET game_id = s.game_id FROM (SELECT game_key, {pk} AS game_id FROM '
+        '(SELECT game_key FROM {games} ORDER BY game_key) AS o) AS s WHERE g.game_key = s.game_key'.format(
+            games=games, pk=next_value(Game)),
+        'INSERT INTO games (game_id, {cols}) SELECT game_id, {cols} FROM {staging}'.format(
+            cols=columns(GameRecord, ''), staging=games),
+
+        'UPDATE {at_bats} AS a SET at_bat_id = s.at_bat_id, game_id = g.game_id FROM (SELECT game_key, at_bat_index, '
+        '{pk} AS at_bat_id FROM (SELECT game_key, at_bat_index FROM {at_bats} ORDER BY game_key, at_bat_index) AS o) '
+        'AS s JOIN {games} AS g ON g.game_key = s.game_key '
+        'WHERE a.game_key = s.game_key AND a.at_bat_index = s.at_bat_index'.format(
+            at_bats=at_bats, games=games, pk=next_value(AtBat)),
+        'INSERT INTO at_bats (at_bat_id, game_id, {cols}) SELECT at_bat_id, game_id, {cols} FROM {staging}'.format(
+            cols=columns(AtBatRecord, ''), staging=at_bats),
+
+        'INSERT INTO pitches (pitch_id, at_bat_id, {cols}) SELECT {pk}, a.at_bat_id, {p_cols} FROM {staging} AS p '
+        'JOIN {at_bats} AS a ON p.game_key = a.game_key AND p.at_bat_index = a.at_bat_index '
+        'ORDER BY p.game_key, p.at_bat_index, p.at_bat_pitch_num'.format(
+            cols=columns(PitchRecord, ''), pk=next_value(Pitch), p_cols=columns(PitchRecord, 'p.'),
+            staging=pitches, at_bats=at_bats),
+
+        'INSERT INTO hits_in_play (hip_id, game_id, {cols}) SELECT {pk}, g.game_id, {h_cols} FROM {staging} AS h '
+        'JOIN {games} AS g ON h.game_key = g.game_key ORDER BY h.game_key'.format(
+            cols=columns(HitInPlayRecord, ''), pk=next_value(HitInPlay), h_cols=columns(HitInPlayRecord, 'h.'),
+            staging=hits_in_play, games=games),
+    ]
+
+
+def _copy_rows(connection, table_name, columns, rows):
+    """Streams rows into a table with COPY FROM STDIN, through psycopg2 or psycopg (3)"""
+    sql = 'COPY {} ({}) FROM STDIN'.format(table_name, ', '.join(columns))
+    data = copy_text(rows)
+
+    cursor = connection.connection.cursor()
+    try:
+        if hasattr(cursor, 'copy_expert'):
+            cursor.copy_expert(sql, io.StringIO(data))
+        else:
+            with cursor.copy(sql) as copy:
+                copy.write(data)
+    finally:
+        cursor.close()
+
+
+def copy_text(rows):
+    """Encodes rows in PostgreSQL's COPY text format
+
+    Parameters
+    ----------
+    rows : iterable of tuples
+
+    Returns
+    -------
+    str
+        One line per row, tab-separated, with NULL as \\N
+    """
+    lines = []
+    for row in rows:
+        lines.append('\t'.join(_copy_value(v) for v in row))
+    lines.append('')
+    return '\n'.join(lines)
+
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, str):
+        return value.translate(COPY_ESCAPES)
+    return repr(value) if isinstance(value, float) else str(value)
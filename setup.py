@@ -25,6 +25,15 @@ setuptools.setup(
         'requests',
         'lxml'
     ],
+    extras_require={
+        'postgres': ['psycopg2'],
+        'analysis': ['numpy', 'pandas'],
+        'parquet': ['pyarrow'],
+        'speedups': ['msgspec'],
+    },
+    entry_points={
+        'console_scripts': ['pygameday-mirror=pygameday.mirror:main'],
+    },
     download_url = 'https://github.com/chrander/pygameday/archive/v{}.tar.gz'.format(version),
     keywords = ['baseball', 'gameday', 'database', 'scraping'],
     classifiers=[
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""A local HTTP stand-in for the GameDay server, serving the files under tests/data
+"""
+import os
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+
+class GameDayHandler(SimpleHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Allow keep-alive
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+
+        try:
+            if self.path in server.failures and server.failures[self.path] > 0:
+                server.failures[self.path] -= 1
+                self.send_error(503)
+                return
+            if self.path in server.truncated and server.truncated[self.path] > 0:
+                server.truncated[self.path] -= 1
+                self._send_truncated()
+                return
+            if self.path in server.bodies:
+                self._send_body(server.bodies[self.path])
+                return
+
+            time.sleep(server.delay)
+            super().do_GET()
+
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _send_body(self, body):
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_truncated(self):
+        """Promises a longer body than it sends, then drops the connection"""
+        self.send_response(200)
+        self.send_header('Content-Length', '1000')
+        self.end_headers()
+        self.wfile.write(b'<game id="')
+        self.wfile.flush()
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        pass
+
+
+class GameDayServer(ThreadingHTTPServer):
+    """Serves tests/data over HTTP on a free local port, recording every request it receives
+
+    Parameters
+    ----------
+    delay : float
+        Seconds to wait before answering each request
+    """
+    daemon_threads = True
+
+    def __init__(self, delay=0.0):
+        super().__init__(('127.0.0.1', 0), partial(GameDayHandler, directory=DATA_DIR))
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.requests = []
+        self.failures = {}  # Path -> number of times to answer with 503 before serving it
+        self.truncated = {}  # Path -> number of times to cut the body short before serving it
+        self.bodies = {}  # Path -> body served instead of the file
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._thread = None
+
+    @property
+    def address(self):
+        return '{}:{}'.format(*self.server_address)
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
@@ -1,10 +1,32 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
+import json
+import os
+import pickle
+import shutil
+import tempfile
 import unittest
 from datetime import datetime
 import logging
+from unittest import mock
+
+from sqlalchemy import func
+from sqlalchemy import inspect
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
 
 from pygameday import GameDayClient
+from pygameday import client as client_module
+from pygameday import pipeline
+from pygameday import scrape
+from pygameday.models import Game, Player, AtBat, Pitch, HitInPlay
+from pygameday.models import IngestDate, IngestGame
+from pygameday.models import db_connect
+from pygameday.policy import FetchPolicy
+from pygameday.sources import DirectorySource
+
+from gameday_server import DATA_DIR
+from gameday_server import GameDayServer
 
 logging.getLogger('pygameday').setLevel(logging.INFO)
 
@@ -22,6 +44,203 @@ class TestGameDayClient(unittest.TestCase):
         client.process_date_range(start_date, end_date)
         client.db_stats()
 
+    def test_ingest_local_server(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            database_uri = 'sqlite:///' + os.path.join(tmp_dir, 'gameday.db')
+
+            with GameDayServer() as server, mock.patch.object(scrape, 'GD_SERVER', server.address):
+                client = GameDayClient(database_uri, n_workers=1, max_in_flight=4)
+                summary = client.process_date_range(datetime(2018, 4, 6), datetime(2018, 4, 7))
+                self.assertEqual(summary.succeeded, ['2018/04/06/nynmlb-wasmlb-1'])
+                self.assertEqual(list(summary.skipped), ['2018/04/06/phimlb-nymlb-1'])
+                self.assertEqual(summary.failed, {})
+
+                # Nothing is fetched again for games that are already in the database
+                n_requests = len(server.requests)
+                client.process_date(datetime(2018, 4, 6))
+                self.assertEqual(len(server.requests), n_requests + 1)
+                client.close()
+
+            engine = db_connect(database_uri)
+            session = sessionmaker(bind=engine)()
+            counts = {model.__name__: session.query(func.count()).select_from(model).scalar()
+                      for model in (Game, Player, AtBat, Pitch, HitInPlay)}
+            session.close()
+            engine.dispose()
+
+        self.assertEqual(counts, {'Game': 1, 'Player': 4, 'AtBat': 4, 'Pitch': 6, 'HitInPlay': 3})
+
+    def test_parallel_workers(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            database_uri = 'sqlite:///' + os.path.join(tmp_dir, 'gameday.db')
+
+            # Workers only fetch and parse; the client writes every game itself
+            with GameDayClient(database_uri, n_workers=2, source=DATA_DIR) as client:
+                summary = client.process_date(datetime(2018, 4, 6))
+                self.assertEqual(summary.succeeded, ['2018/04/06/nynmlb-wasmlb-1'])
+                self.assertIn('2018/04/06/nynmlb-wasmlb-1', client.gameday_ids)
+                self.assertEqual(len(client.player_ids), 4)
+
+            scrape.configure_source(None)
+
+    def test_bulk_load(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            database_uri = 'sqlite:///' + os.path.join(tmp_dir, 'gameday.db')
+
+            with GameDayClient(database_uri, n_workers=1, source=DATA_DIR, bulk_load=True) as client:
+                summary = client.process_date_range(datetime(2018, 4, 6), datetime(2018, 4, 6))
+                self.assertEqual(summary.succeeded, ['2018/04/06/nynmlb-wasmlb-1'])
+
+                with client.engine.connect() as connection:
+                    self.assertEqual(connection.exec_driver_sql('PRAGMA journal_mode').scalar(), 'wal')
+                self.assertIn('ix_games_gameday_id',
+                              {index['name'] for index in inspect(client.engine).get_indexes('games')})
+
+                # Indexes are only dropped and rebuilt for a long range
+                deferred_indexes = client_module.deferred_indexes
+                with mock.patch.object(client_module, 'deferred_indexes', wraps=deferred_indexes) as defer:
+                    client.process_date_range(datetime(2018, 4, 7), datetime(2018, 4, 8))
+                    self.assertEqual(defer.call_count, 0)
+
+                    with mock.patch.object(client_module, 'BULK_LOAD_DEFER_INDEXES_DATES', 2):
+                        client.process_date_range(datetime(2018, 4, 7), datetime(2018, 4, 8))
+                    self.assertEqual(defer.call_count, 1)
+
+            scrape.configure_source(None)
+
+    def test_one_pool_per_date_range(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            database_uri = 'sqlite:///' + os.path.join(tmp_dir, 'gameday.db')
+
+            with GameDayClient(database_uri, n_workers=2, source=DATA_DIR) as client, \
+                    mock.patch.object(pipeline, 'ProcessPoolExecutor', wraps=pipeline.ProcessPoolExecutor) as pool:
+                summary = client.process_date_range(datetime(2018, 4, 5), datetime(2018, 4, 8))
+
+            self.assertEqual(pool.call_count, 1)
+            self.assertEqual(summary.succeeded, ['2018/04/06/nynmlb-wasmlb-1'])
+            scrape.configure_source(None)
+
+    def test_dedupe(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            database_uri = 'sqlite:///' + os.path.join(tmp_dir, 'gameday.db')
+            scoreboard_path = scrape.date_path(datetime(2018, 4, 6), 'master_scoreboard.json')
+            scoreboard = DirectorySource(DATA_DIR).get(scoreboard_path).json()
+
+            # A game listed twice is only parsed and written once
+            games = scoreboard['data']['games']['game']
+            games.append(games[0])
+            with GameDayClient(database_uri, n_workers=2, source=DATA_DIR) as client:
+                stale_client = GameDayClient(database_uri, n_workers=1, source=DATA_DIR)
+                summary = client.process_scoreboard(datetime(2018, 4, 6), scoreboard)
+
+            self.assertEqual(summary.succeeded, ['2018/04/06/nynmlb-wasmlb-1'])
+            self.assertEqual(summary.skipped['2018/04/06/nynmlb-wasmlb-1'], "It's already being ingested.")
+            self.assertEqual(summary.failed, {})
+
+            # A client that hasn't seen the game being written looks it up instead of failing on the insert
+            summary = stale_client.process_date(datetime(2018, 4, 6))
+            self.assertEqual(summary.failed, {})
+            self.assertIn('2018/04/06/nynmlb-wasmlb-1', stale_client.gameday_ids)
+            stale_client.close()
+            scrape.configure_source(None)
+
+    def test_resume(self):
+        players_path = '/components/game/mlb/year_2018/month_04/day_06/gid_2018_04_06_nynmlb_wasmlb_1/players.xml'
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            database_uri = 'sqlite:///' + os.path.join(tmp_dir, 'gameday.db')
+
+            with GameDayServer() as server, mock.patch.object(scrape, 'GD_SERVER', server.address), \
+                    GameDayClient(database_uri, n_workers=1, fetch_policy=FetchPolicy(max_retries=0)) as client:
+                # The game fails, so its date is retried
+                server.failures[players_path] = 1
+                summary = client.process_date_range(datetime(2018, 4, 6), datetime(2018, 4, 6))
+                self.assertEqual(list(summary.failed), ['2018/04/06/nynmlb-wasmlb-1'])
+
+                summary = client.process_date_range(datetime(2018, 4, 6), datetime(2018, 4, 6))
+                self.assertEqual(summary.succeeded, ['2018/04/06/nynmlb-wasmlb-1'])
+
+                # Once every game on a date is done, the date isn't fetched again
+                n_requests = len(server.requests)
+                summary = client.process_date_range(datetime(2018, 4, 6), datetime(2018, 4, 6))
+                self.assertEqual(len(server.requests), n_requests)
+                self.assertEqual(summary.succeeded, [])
+
+                with client.engine.connect() as connection:
+                    statuses = dict(connection.execute(select(IngestGame.gameday_id, IngestGame.status)).all())
+                    date_status = connection.execute(select(IngestDate.status)).scalar_one()
+
+        self.assertEqual(statuses, {'2018/04/06/nynmlb-wasmlb-1': 'done', '2018/04/06/phimlb-nymlb-1': 'not_final'})
+        self.assertEqual(date_status, 'done')
+
+    def test_malformed_scoreboard(self):
+        scoreboard_path = scrape.date_path(datetime(2018, 4, 6), 'master_scoreboard.json')
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            database_uri = 'sqlite:///' + os.path.join(tmp_dir, 'gameday.db')
+
+            with GameDayServer() as server, mock.patch.object(scrape, 'GD_SERVER', server.address), \
+                    GameDayClient(database_uri, n_workers=1) as client:
+                # A scoreboard cut off mid-body leaves its date partial instead of ending the range
+                server.bodies[scoreboard_path] = b'{"data": {"games": {"game": [{"id": "2018/04/06/nyn'
+                summary = client.process_date_range(datetime(2018, 4, 5), datetime(2018, 4, 6))
+                self.assertEqual(summary.succeeded, [])
+
+                with client.engine.connect() as connection:
+                    statuses = dict(connection.execute(select(IngestDate.date, IngestDate.status)).all())
+                self.assertEqual(statuses[datetime(2018, 4, 6).date()], 'partial')
+
+    def test_resume_spring_training(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            database_uri = 'sqlite:///' + os.path.join(tmp_dir, 'gameday.db')
+            source_dir = os.path.join(tmp_dir, 'gameday')
+            shutil.copytree(DATA_DIR, source_dir)
+
+            # Make the date's final game a spring training game
+            scoreboard_path = source_dir + scrape.date_path(datetime(2018, 4, 6), 'master_scoreboard.json')
+            with open(scoreboard_path) as f:
+                scoreboard = json.load(f)
+            scoreboard['data']['games']['game'][0]['game_type'] = 'S'
+            with open(scoreboard_path, 'w') as f:
+                json.dump(scoreboard, f)
+
+            with GameDayClient(database_uri, n_workers=1, source=source_dir) as client:
+                summary = client.process_date_range(datetime(2018, 4, 6), datetime(2018, 4, 6))
+                self.assertEqual(summary.succeeded, [])
+                self.assertIn('2018/04/06/nynmlb-wasmlb-1', summary.skipped)
+
+                with client.engine.connect() as connection:
+                    self.assertEqual(connection.execute(select(IngestDate.status)).scalar_one(), 'spring')
+
+            # A client that ingests spring training goes back to the date
+            with GameDayClient(database_uri, n_workers=1, source=source_dir, ingest_spring_training=True) as client:
+                summary = client.process_date_range(datetime(2018, 4, 6), datetime(2018, 4, 6))
+                self.assertEqual(summary.succeeded, ['2018/04/06/nynmlb-wasmlb-1'])
+
+                with client.engine.connect() as connection:
+                    self.assertEqual(connection.execute(select(IngestDate.status)).scalar_one(), 'done')
+
+            scrape.configure_source(None)
+
+    def test_single_engine(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            database_uri = 'sqlite:///' + os.path.join(tmp_dir, 'gameday.db')
+
+            with GameDayClient(database_uri, n_workers=1, engine_options={'pool_pre_ping': True}) as client:
+                engine = client.engine
+                client.db_stats()
+                client.update_inserted_data()
+                self.assertIs(client.engine, engine)
+
+                # Copies sent to workers use their process's engine
+                self.assertIs(pickle.loads(pickle.dumps(client)).engine, engine)
+
+                # A forked worker builds its own
+                with mock.patch.object(client_module.os, 'getpid', return_value=-1):
+                    self.assertIsNot(client.engine, engine)
+
+            self.assertNotIn(client_module._engine_key(database_uri, {'pool_pre_ping': True}), client_module._engines)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
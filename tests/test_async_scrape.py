@@ -0,0 +1,65 @@
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from pygameday import async_scrape
+from pygameday import scrape
+
+from gameday_server import GameDayServer
+
+GAMEDAY_ID = '2018/04/06/nynmlb-wasmlb-1'
+
+
+class TestAsyncScraping(unittest.TestCase):
+
+    def test_fetch_dates(self):
+        with GameDayServer() as server, mock.patch.object(scrape, 'GD_SERVER', server.address):
+            results = async_scrape.fetch_dates([datetime(2018, 4, 6), datetime(2018, 4, 7)], max_in_flight=4)
+
+        date, scoreboard, pages = results[0]
+        self.assertEqual(date, datetime(2018, 4, 6))
+        self.assertEqual(len(async_scrape.scoreboard_games(scoreboard)), 2)
+
+        # Only the Final game's pages are fetched
+        self.assertEqual(list(pages), [GAMEDAY_ID])
+        self.assertEqual(set(pages[GAMEDAY_ID]), {'hit_chart', 'players', 'inning_all'})
+        self.assertIn(b'<hitchart>', pages[GAMEDAY_ID]['hit_chart'].content)
+
+        # There is no scoreboard for the second date
+        self.assertIsNone(results[1][1])
+        self.assertEqual(results[1][2], {})
+
+    def test_fetch_errors(self):
+        def fetch_players(game_directory):
+            raise RuntimeError('connection dropped')
+
+        def fetch_master_scoreboard(date, fetch=scrape.fetch_master_scoreboard):
+            if date.day == 7:
+                raise RuntimeError('connection dropped')
+            return fetch(date)
+
+        fetchers = (('hit_chart', scrape.fetch_hit_chart), ('players', fetch_players),
+                    ('inning_all', scrape.fetch_inning_all))
+        with GameDayServer() as server, mock.patch.object(scrape, 'GD_SERVER', server.address), \
+                mock.patch.object(async_scrape, 'GAME_PAGE_FETCHERS', fetchers), \
+                mock.patch.object(scrape, 'fetch_master_scoreboard', fetch_master_scoreboard):
+            results = async_scrape.fetch_dates([datetime(2018, 4, 6), datetime(2018, 4, 7)], max_in_flight=4)
+
+        # Only the page, and the date, whose fetch raised are missing
+        pages = results[0][2][GAMEDAY_ID]
+        self.assertIsNone(pages['players'])
+        self.assertIn(b'<hitchart>', pages['hit_chart'].content)
+        self.assertEqual(results[1], (datetime(2018, 4, 7), None, {}))
+
+    def test_in_flight_limit(self):
+        dates = [datetime(2018, 4, 6)] * 6
+        with GameDayServer(delay=0.05) as server, mock.patch.object(scrape, 'GD_SERVER', server.address):
+            async_scrape.fetch_dates(dates, max_in_flight=3)
+
+        self.assertEqual(len(server.requests), 6 * 4)
+        self.assertGreater(server.max_in_flight, 1)
+        self.assertLessEqual(server.max_in_flight, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from pygameday import scrape
+from pygameday.cache import PageCache
+from pygameday.constants import CACHE_SCOREBOARD_TTL
+
+from gameday_server import GameDayServer
+
+GAME_DIR = '/components/game/mlb/year_2018/month_04/day_06/gid_2018_04_06_nynmlb_wasmlb_1'
+
+
+class TestPageCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = PageCache(self.tmp_dir.name, max_bytes=10000)
+
+    def tearDown(self):
+        scrape.configure_cache(None)
+        self.tmp_dir.cleanup()
+
+    def test_put_get(self):
+        self.assertIsNone(self.cache.get('/a.xml'))
+        self.cache.put('/a.xml', b'<a/>')
+        self.assertEqual(self.cache.get('/a.xml'), b'<a/>')
+
+    def test_expiry(self):
+        self.cache.put('/a.xml', b'<a/>', ttl=-1)
+        self.assertIsNone(self.cache.get('/a.xml'))
+
+    def test_lru_eviction(self):
+        body = os.urandom(3000)  # Incompressible
+        for i in range(3):
+            self.cache.put('/{}.xml'.format(i), body)
+
+        # Make page 0 the most recently used, then go over budget
+        old = time.time() - 100
+        for i in range(3):
+            os.utime(self.cache._path('/{}.xml'.format(i)), (old + i, old + i))
+        self.cache.get('/0.xml')
+        self.cache.put('/3.xml', body)
+
+        self.assertLessEqual(self.cache.size(), self.cache.max_bytes)
+        self.assertIsNotNone(self.cache.get('/0.xml'))
+        self.assertIsNone(self.cache.get('/1.xml'))
+        self.assertIsNotNone(self.cache.get('/3.xml'))
+
+    def test_get_url_uses_cache(self):
+        scrape.configure_cache(self.cache)
+
+        with GameDayServer() as server, mock.patch.object(scrape, 'GD_SERVER', server.address):
+            first = scrape.fetch_players(GAME_DIR)
+            second = scrape.fetch_players(GAME_DIR)
+            scoreboard = scrape.fetch_master_scoreboard(datetime(2018, 4, 6))
+            missing = scrape.fetch_master_scoreboard(datetime(2018, 4, 7))
+
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(len(server.requests), 3)
+        self.assertEqual(len(scoreboard['data']['games']['game']), 2)
+        self.assertIsNone(missing)
+
+    def test_scoreboard_ttl(self):
+        page = scrape.Page('/master_scoreboard.json',
+                           b'{"data": {"games": {"game": [{"status": {"status": "Final"}}]}}}')
+        self.assertIsNone(scrape.scoreboard_ttl(datetime(2018, 4, 6), page))
+        self.assertEqual(scrape.scoreboard_ttl(datetime.now(), page), CACHE_SCOREBOARD_TTL)
+
+        page = scrape.Page('/master_scoreboard.json',
+                           b'{"data": {"games": {"game": {"status": {"status": "Suspended"}}}}}')
+        self.assertEqual(scrape.scoreboard_ttl(datetime(2018, 4, 6), page), CACHE_SCOREBOARD_TTL)
+
+    def test_malformed_scoreboard(self):
+        scrape.configure_cache(self.cache)
+        path = scrape.date_path(datetime(2018, 4, 6), 'master_scoreboard.json')
+        with GameDayServer() as server, mock.patch.object(scrape, 'GD_SERVER', server.address):
+            server.bodies[path] = b'{"data": {"games": {"game": [{"id": "2018/04/06/nyn'
+            self.assertIsNone(scrape.fetch_master_scoreboard(datetime(2018, 4, 6)))
+
+            # It is cached briefly, like a scoreboard that may still change
+            self.assertIsNotNone(self.cache.get(path))
+            server.bodies[scrape.date_path(datetime(2018, 4, 7), 'master_scoreboard.json')] = b'[]'
+            self.assertIsNone(scrape.fetch_master_scoreboard(datetime(2018, 4, 7)))
+
+
+if __name__ == '__main__':
+    unittest.main()
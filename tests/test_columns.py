@@ -0,0 +1,66 @@
+import unittest
+
+import numpy as np
+from sqlalchemy import Float
+from sqlalchemy import Integer
+from sqlalchemy import String
+
+from pygameday import parse
+from pygameday.columns import coerce_column
+from pygameday.columns import missing
+from pygameday.columns import pitch_columns
+
+from test_parse import load_page
+from test_parse import load_scoreboard_game
+
+
+class TestColumns(unittest.TestCase):
+
+    def test_coerce_floats(self):
+        array = coerce_column(['95.1', '', None, 'abc', '-1.5'], Float())
+        self.assertEqual(array.dtype, np.float64)
+        np.testing.assert_array_equal(array, [95.1, np.nan, np.nan, np.nan, -1.5])
+        np.testing.assert_array_equal(missing(array), [False, True, True, True, False])
+
+        np.testing.assert_array_equal(coerce_column([1.5, None], Float()), [1.5, np.nan])
+
+    def test_coerce_integers(self):
+        array = coerce_column(['11', '5', '3.0'], Integer())
+        self.assertEqual(array.dtype, np.int64)
+        np.testing.assert_array_equal(array, [11, 5, 3])
+        self.assertFalse(missing(array).any())
+
+        # Missing values make the column float, as with pandas.read_sql
+        array = coerce_column(['33', ''], Integer())
+        self.assertEqual(array.dtype, np.float64)
+        np.testing.assert_array_equal(missing(array), [False, True])
+
+    def test_coerce_strings(self):
+        array = coerce_column(['FF', None], String())
+        self.assertEqual(array.dtype, object)
+        np.testing.assert_array_equal(missing(array), [False, True])
+
+    def test_pitch_columns(self):
+        pages = [load_page('inning', 'inning_hit.xml'), load_page('players.xml'), load_page('inning', 'inning_all.xml')]
+        parsed = parse.parse_game_records(load_scoreboard_game(), *pages)
+        columns = pitch_columns([parsed, parsed])
+
+        self.assertEqual(len(columns['px']), 2 * len(parsed.pitches))
+        np.testing.assert_array_equal(columns['game_index'], [0] * 6 + [1] * 6)
+        self.assertEqual(columns['at_bat_index'].dtype, np.int64)
+        self.assertEqual(columns['pitch_type'].dtype, object)
+
+        for i, pitch in enumerate(parsed.pitches):
+            for name in ('start_speed', 'spin_rate', 'zone', 'pitch_type'):
+                value = getattr(pitch, name)
+                if value is None:
+                    self.assertTrue(missing(columns[name])[i])
+                else:
+                    self.assertEqual(columns[name][i], value)
+            self.assertEqual(columns['pitcher_id'][i], parsed.at_bats[pitch.at_bat_index].pitcher_id)
+
+        self.assertEqual(len(pitch_columns([])['px']), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from sqlalchemy import inspect
+from sqlalchemy import text
+
+from pygameday import models
+from pygameday.models import create_db_tables
+from pygameday.models import create_indexes
+from pygameday.models import db_connect
+from pygameday.models import deferred_indexes
+from pygameday.models import drop_indexes
+
+
+def index_names(engine):
+    inspector = inspect(engine)
+    return {index['name'] for table in inspector.get_table_names() for index in inspector.get_indexes(table)}
+
+
+class TestBulkLoadProfile(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.database_uri = 'sqlite:///' + os.path.join(self.tmp_dir.name, 'gameday.db')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_pragmas(self):
+        engine = db_connect(self.database_uri, bulk_load=True)
+        with engine.connect() as connection:
+            self.assertEqual(connection.execute(text('PRAGMA journal_mode')).scalar(), 'wal')
+            self.assertEqual(connection.execute(text('PRAGMA synchronous')).scalar(), 1)  # NORMAL
+            self.assertEqual(connection.execute(text('PRAGMA temp_store')).scalar(), 2)  # MEMORY
+        engine.dispose()
+
+        engine = db_connect(self.database_uri)
+        with engine.connect() as connection:
+            self.assertEqual(connection.execute(text('PRAGMA synchronous')).scalar(), 2)  # FULL, the default
+        engine.dispose()
+
+    def test_deferred_indexes(self):
+        engine = db_connect(self.database_uri)
+        create_db_tables(engine)
+        indexes = index_names(engine)
+        self.assertIn('ix_games_gameday_id', indexes)
+
+        with self.assertRaises(RuntimeError):
+            with deferred_indexes(engine):
+                # Unique indexes stay, so duplicates are still rejected
+                self.assertEqual(index_names(engine), {'ix_games_gameday_id'})
+                raise RuntimeError('interrupted')
+
+        # The indexes are rebuilt even though the load failed
+        self.assertEqual(index_names(engine), indexes)
+
+        # A failed rebuild doesn't hide the load's own error
+        with mock.patch.object(models, 'create_indexes', side_effect=ValueError('rebuild')):
+            with self.assertRaises(RuntimeError):
+                with deferred_indexes(engine):
+                    raise RuntimeError('interrupted')
+        create_indexes(engine)
+
+        # And indexes lost to a crash are created with the tables
+        drop_indexes(engine)
+        create_db_tables(engine)
+        self.assertEqual(index_names(engine), indexes)
+        engine.dispose()
+
+    def test_analytic_indexes(self):
+        engine = db_connect(self.database_uri)
+        create_db_tables(engine)
+        drop_indexes(engine)
+
+        created = create_indexes(engine)
+        self.assertTrue({'ix_at_bats_game_id', 'ix_at_bats_pitcher_id_game_id', 'ix_at_bats_batter_id_game_id',
+                         'ix_pitches_at_bat_id', 'ix_pitches_pitch_type', 'ix_hits_in_play_game_id'} <= set(created))
+        self.assertEqual(create_indexes(engine), [])
+
+        # Lookups of a pitcher's pitches use the indexes
+        with engine.connect() as connection:
+            plan = ' '.join(row[-1] for row in connection.exec_driver_sql(
+                'EXPLAIN QUERY PLAN SELECT p.* FROM pitches p JOIN at_bats a ON p.at_bat_id = a.at_bat_id '
+                'WHERE a.pitcher_id = 1'))
+        self.assertIn('ix_at_bats_pitcher_id_game_id', plan)
+        self.assertIn('ix_pitches_at_bat_id', plan)
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    unittest.main()
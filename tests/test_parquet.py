@@ -0,0 +1,127 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+import pyarrow.dataset as ds
+
+from pygameday import GameDayClient
+from pygameday import parquet
+from pygameday import scrape
+from pygameday.models import Game
+from pygameday.models import Pitch
+
+from gameday_server import DATA_DIR
+
+GAMEDAY_ID = '2018/04/06/nynmlb-wasmlb-1'
+
+
+class TestParquet(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.parquet_dir = os.path.join(self.tmp_dir.name, 'parquet')
+        database_uri = 'sqlite:///' + os.path.join(self.tmp_dir.name, 'gameday.db')
+        self.client = GameDayClient(database_uri, n_workers=1, source=DATA_DIR, parquet_dir=self.parquet_dir)
+        self.client.process_date(datetime(2018, 4, 6))
+        scrape.configure_source(None)
+
+    def tearDown(self):
+        self.client.close()
+        self.tmp_dir.cleanup()
+
+    def test_pipeline_sink(self):
+        pitches = ds.dataset(os.path.join(self.parquet_dir, 'pitches'), partitioning='hive').to_table(
+            columns=['gameday_id', 'at_bat_index', 'start_speed', 'season'], filter=ds.field('season') == 2018)
+        self.assertEqual(pitches.num_rows, 6)
+        self.assertEqual(set(pitches.column('gameday_id').to_pylist()), {GAMEDAY_ID})
+        self.assertEqual(str(pitches.schema.field('start_speed').type), 'double')
+
+        self.assertTrue(os.path.isdir(os.path.join(self.parquet_dir, 'games', 'season=2018', 'date=2018-04-06')))
+
+    def test_sink_skips_existing_games(self):
+        # A client that hasn't seen the game written leaves it out of the DB, and so out of Parquet too
+        self.client.gameday_ids.clear()
+        scrape.configure_source(self.client.source)
+        try:
+            summary = self.client.process_date(datetime(2018, 4, 6))
+        finally:
+            scrape.configure_source(None)
+        self.assertEqual(summary.failed, {})
+
+        for name, n_rows in (('games', 1), ('pitches', 6)):
+            table = ds.dataset(os.path.join(self.parquet_dir, name), partitioning='hive').to_table()
+            self.assertEqual(table.num_rows, n_rows)
+
+    def test_export_and_pipeline(self):
+        from_pipeline = parquet.read_parsed_games(self.parquet_dir)
+
+        export_dir = os.path.join(self.tmp_dir.name, 'export')
+        self.assertEqual(self.client.export_parquet(export_dir, datetime(2018, 4, 6), datetime(2018, 4, 6)), 1)
+        # Exporting again replaces the date rather than adding to it
+        self.client.export_parquet(export_dir, datetime(2018, 4, 5), datetime(2018, 4, 7))
+        from_db = parquet.read_parsed_games(export_dir, datetime(2018, 4, 6), datetime(2018, 4, 6))
+
+        self.assertEqual(len(from_db), 1)
+        # SQLite keeps the start time's wall time, but not its time zone
+        start_time = from_pipeline[0].game.start_time
+        self.assertEqual(start_time.utcoffset(), timedelta(hours=-4))
+        self.assertEqual(from_db[0].game, from_pipeline[0].game._replace(start_time=start_time.replace(tzinfo=None)))
+        self.assertEqual(from_db[0].at_bats, from_pipeline[0].at_bats)
+        self.assertEqual(from_db[0].pitches, from_pipeline[0].pitches)
+        self.assertEqual(from_db[0].hits_in_play, from_pipeline[0].hits_in_play)
+        self.assertEqual(parquet.dataset_schema('hits_in_play').names[:2], ['gameday_id', 'hip_index'])
+
+        # The export lists the players who batted or pitched
+        player_ids = {p.player_id for p in from_db[0].players}
+        self.assertTrue(player_ids <= {p.player_id for p in from_pipeline[0].players})
+        self.assertTrue({a.batter_id for a in from_db[0].at_bats} <= player_ids)
+
+    def test_start_time(self):
+        # Both paths store the same wall time; only the pipeline knows its offset
+        export_dir = os.path.join(self.tmp_dir.name, 'export')
+        self.client.export_parquet(export_dir, datetime(2018, 4, 6), datetime(2018, 4, 6))
+
+        columns = ['start_time', 'utc_offset']
+        from_pipeline = ds.dataset(os.path.join(self.parquet_dir, 'games')).to_table(columns=columns).to_pylist()
+        from_db = ds.dataset(os.path.join(export_dir, 'games')).to_table(columns=columns).to_pylist()
+        self.assertEqual(from_pipeline, [{'start_time': datetime(2018, 4, 6, 13, 5), 'utc_offset': -240}])
+        self.assertEqual(from_db, [{'start_time': datetime(2018, 4, 6, 13, 5), 'utc_offset': None}])
+
+    def test_db_start_time(self):
+        # Databases that store time zones return start times in the session's; they are exported in UTC
+        session_time = datetime(2018, 4, 6, 19, 5, tzinfo=timezone(timedelta(hours=2)))
+        self.assertEqual(parquet._split_time(parquet._utc(session_time)), (datetime(2018, 4, 6, 17, 5), 0))
+        self.assertEqual(parquet._utc(datetime(2018, 4, 6, 13, 5)), datetime(2018, 4, 6, 13, 5))
+
+    def test_iter_parsed_games(self):
+        days = list(parquet.iter_parsed_games(self.parquet_dir, datetime(2018, 4, 1), datetime(2018, 4, 30)))
+        self.assertEqual([[parsed.game.gameday_id for parsed in day] for day in days], [[GAMEDAY_ID]])
+
+    def test_date_filter(self):
+        self.assertEqual(parquet.read_parsed_games(self.parquet_dir, datetime(2018, 4, 7)), [])
+        self.assertEqual(len(parquet.read_parsed_games(self.parquet_dir, end_date=datetime(2018, 4, 6))), 1)
+
+    def test_ingest_parquet(self):
+        database_uri = 'sqlite:///' + os.path.join(self.tmp_dir.name, 'copy.db')
+        with GameDayClient(database_uri, n_workers=1) as client:
+            summary = client.ingest_parquet(self.parquet_dir)
+            self.assertEqual(summary.succeeded, [GAMEDAY_ID])
+            self.assertEqual(summary.stats.pitches, 6)
+
+            summary = client.ingest_parquet(self.parquet_dir)
+            self.assertEqual(list(summary.skipped), [GAMEDAY_ID])
+
+            with client.engine.connect() as connection:
+                game = connection.execute(Game.__table__.select()).all()[0]
+                self.assertEqual(game.gameday_id, GAMEDAY_ID)
+                # The same start time as ingesting from GameDay stores
+                with self.client.engine.connect() as direct:
+                    self.assertEqual(game.start_time, direct.execute(Game.__table__.select()).all()[0].start_time)
+                self.assertEqual(len(connection.execute(Pitch.__table__.select()).all()), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
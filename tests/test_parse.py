@@ -1,4 +1,31 @@
+import json
+import os
+import threading
 import unittest
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+from pygameday import parse
+from pygameday.records import ParsedGame
+from pygameday.records import to_float
+from pygameday.records import to_int
+from pygameday.scrape import Page
+
+from gameday_server import DATA_DIR
+
+GAME_DIR = os.path.join(DATA_DIR, 'components', 'game', 'mlb', 'year_2018', 'month_04', 'day_06',
+                        'gid_2018_04_06_nynmlb_wasmlb_1')
+
+
+def load_scoreboard_game():
+    with open(os.path.join(os.path.dirname(GAME_DIR), 'master_scoreboard.json')) as f:
+        return json.load(f)['data']['games']['game'][0]
+
+
+def load_page(*path):
+    with open(os.path.join(GAME_DIR, *path), 'rb') as f:
+        return Page(path[-1], f.read())
 
 
 class TestParsing(unittest.TestCase):
@@ -9,6 +36,117 @@ class TestParsing(unittest.TestCase):
     def test_parse_games(self):
         pass
 
+    def test_parse_inning_all(self):
+        at_bats = parse.parse_inning_all(load_page('inning', 'inning_all.xml'))
+
+        self.assertEqual([(ab.inning, ab.inning_half) for ab in at_bats],
+                         [('1', 'T'), ('1', 'T'), ('1', 'B'), ('9', 'T')])
+        self.assertEqual([ab.n_pitches for ab in at_bats], [3, 1, 1, 1])
+        self.assertEqual([len(ab.pitches) for ab in at_bats], [3, 1, 1, 1])
+
+        first = at_bats[0]
+        self.assertEqual(first.batter_id, '605204')
+        self.assertEqual(first.event, 'Single')
+        self.assertEqual([p.at_bat_pitch_num for p in first.pitches], [0, 1, 2])
+        self.assertEqual([p.pitch_type for p in first.pitches], ['FF', 'SL', ''])
+        self.assertEqual(first.pitches[0].spin_rate, '2414.371')
+        self.assertEqual(first.pitches[1].inning_half, 'T')
+
+    def test_parse_inning_all_matches_tree_parser(self):
+        page = load_page('inning', 'inning_all.xml')
+
+        # Build the same rows by walking the full tree
+        from lxml import etree
+        expected = []
+        for inning in etree.fromstring(page.content).xpath('descendant::inning'):
+            for half, half_tag in (('T', 'top'), ('B', 'bottom')):
+                for ab in inning.xpath('{}/descendant::atbat'.format(half_tag)):
+                    expected.append(parse.parse_at_bat(ab, inning.get('num'), half))
+
+        def rows(at_bats):
+            return [(ab.inning, ab.inning_half, ab.n_pitches, ab.des,
+                     [(p.at_bat_pitch_num, p.des, p.px, p.pz, p.gameday_sv_id) for p in ab.pitches])
+                    for ab in at_bats]
+
+        self.assertEqual(rows(parse.parse_inning_all(page)), rows(expected))
+
+    def test_parse_game_records(self):
+        parsed = parse.parse_game_records(load_scoreboard_game(), load_page('inning', 'inning_hit.xml'),
+                                          load_page('players.xml'), load_page('inning', 'inning_all.xml'))
+        self.assertIsInstance(parsed, ParsedGame)
+
+        self.assertEqual(parsed.game.gameday_id, '2018/04/06/nynmlb-wasmlb-1')
+        self.assertEqual((parsed.game.home_team_runs, parsed.game.away_team_runs), (2, 3))
+
+        self.assertEqual(len(parsed.at_bats), 4)
+        self.assertEqual(parsed.at_bats[2].inning, 1)
+        self.assertEqual(parsed.at_bats[2].batter_id, 547180)
+        self.assertEqual([p.at_bat_index for p in parsed.pitches], [0, 0, 0, 1, 2, 3])
+
+        # Numeric values are converted; empty ones become None
+        first, _, foul = parsed.pitches[:3]
+        self.assertEqual(first.spin_rate, 2414.371)
+        self.assertEqual(first.zone, 11)
+        self.assertIsNone(foul.start_speed)
+        self.assertIsNone(foul.nasty)
+
+        self.assertEqual([h.inning for h in parsed.hits_in_play], [1, 1, 9])
+        self.assertIsNone(parsed.hits_in_play[2].x)
+        self.assertEqual(sorted(p.player_id for p in parsed.players), [453286, 547180, 594798, 605204])
+
+    def test_records_match_database_objects(self):
+        page = load_page('inning', 'inning_all.xml')
+        at_bats, pitches = parse.parse_inning_all_records(page)
+        db_pitches = [p for ab in parse.parse_inning_all(page) for p in ab.pitches]
+
+        for record, db_pitch in zip(pitches, db_pitches):
+            self.assertEqual(record.result_type, db_pitch.result_type)
+            self.assertEqual(record.gameday_sv_id, db_pitch.gameday_sv_id)
+            self.assertEqual(record.px, to_float(db_pitch.px))
+            self.assertEqual(record.nasty, to_int(db_pitch.nasty))
+
+    def test_parse_game_records_not_final(self):
+        game = dict(load_scoreboard_game(), status={'status': 'Postponed'})
+        self.assertIsNone(parse.parse_game_records(game, None, None, None))
+
+    def test_xml_parser(self):
+        # Each thread reuses one parser
+        self.assertIs(parse.xml_parser(), parse.xml_parser())
+        other = []
+        thread = threading.Thread(target=lambda: other.append(parse.xml_parser()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], parse.xml_parser())
+
+        # Comments and processing instructions are dropped, and the pages parse as before
+        page = load_page('players.xml')
+        commented = page.content.replace(b'<player ', b'<!-- note --><?pi x?><player ', 1)
+        self.assertEqual(parse.parse_players_records(Page(page.url, commented)),
+                         parse.parse_players_records(page))
+
+    def test_parse_game_time(self):
+        def eastern(*args):
+            return datetime(*args, tzinfo=timezone(timedelta(hours=-4)))
+
+        self.assertEqual(parse.parse_game_time('2018/04/06 7:05', '-4', 'PM'), eastern(2018, 4, 6, 19, 5))
+        self.assertEqual(parse.parse_game_time('2018/04/06 12:05', '-4', 'PM'), eastern(2018, 4, 6, 12, 5))
+        self.assertEqual(parse.parse_game_time('2018/04/07 12:10', '-4', 'AM'), eastern(2018, 4, 7, 0, 10))
+        self.assertEqual(parse.parse_game_time('2018/04/06 1:05', '-4', 'AM'), eastern(2018, 4, 6, 1, 5))
+
+        # Other formats go through dateutil
+        self.assertEqual(parse.parse_game_time('2018-04-06 7:05', '-4', 'PM'), eastern(2018, 4, 6, 19, 5))
+        self.assertEqual(parse.parse_game_time('April 6, 2018 19:05', '-4', 'PM'), eastern(2018, 4, 6, 19, 5))
+
+        # The time zone of each offset is shared
+        self.assertIs(parse.parse_game_time('2018/04/06 7:05', '-5', 'PM').tzinfo,
+                      parse.parse_game_time('2018/05/06 7:05', '-5', 'PM').tzinfo)
+
+    def test_parse_game_record_start_time(self):
+        game = load_scoreboard_game()
+        record = parse.parse_game_records(game, load_page('inning', 'inning_hit.xml'), load_page('players.xml'),
+                                          load_page('inning', 'inning_all.xml')).game
+        self.assertEqual(record.start_time, datetime(2018, 4, 6, 13, 5, tzinfo=timezone(timedelta(hours=-4))))
+
 
 if __name__ == '__main__':
     unittest.main()
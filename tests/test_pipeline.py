@@ -0,0 +1,127 @@
+import json
+import os
+import unittest
+
+from pygameday import async_scrape
+from pygameday import pipeline
+from pygameday import scrape
+from pygameday.sources import DirectorySource
+from pygameday.writer import WriteStats
+
+from gameday_server import DATA_DIR
+
+GAMEDAY_ID = '2018/04/06/nynmlb-wasmlb-1'
+SCOREBOARD_PATH = os.path.join(DATA_DIR, 'components', 'game', 'mlb', 'year_2018', 'month_04', 'day_06',
+                               'master_scoreboard.json')
+
+
+def final_game():
+    with open(SCOREBOARD_PATH) as f:
+        games = async_scrape.scoreboard_games(json.load(f))
+    return [g for g in games if async_scrape.is_final(g)][0]
+
+
+def copy_game(game, gameday_id):
+    game = dict(game)
+    game['id'] = gameday_id
+    return game
+
+
+class RecordingWriter(object):
+    """Stands in for the database writer, recording the batches it is given"""
+    def __init__(self, fail_on=None):
+        self.batches = []
+        self.fail_on = fail_on
+
+    def __call__(self, parsed_games):
+        gameday_ids = [parsed.game.gameday_id for parsed in parsed_games]
+        if self.fail_on in gameday_ids:
+            raise RuntimeError('database is locked')
+        self.batches.append(gameday_ids)
+        stats = WriteStats()
+        stats.games = len(parsed_games)
+        return stats
+
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        scrape.configure_source(DirectorySource(DATA_DIR))
+
+    def tearDown(self):
+        scrape.configure_source(None)
+
+    def test_serial(self):
+        writer = RecordingWriter()
+        with pipeline.GamePipeline(writer, commit_every=2) as game_pipeline:
+            for i in range(3):
+                game_pipeline.submit(final_game())
+            game_pipeline.skip('2018/04/06/foo-bar-1', 'Not final')
+
+        summary = game_pipeline.summary
+        self.assertEqual([len(batch) for batch in writer.batches], [2, 1])
+        self.assertEqual(summary.succeeded, [GAMEDAY_ID] * 3)
+        self.assertEqual(summary.skipped, {'2018/04/06/foo-bar-1': 'Not final'})
+        self.assertEqual(summary.stats.games, 3)
+
+    def test_errors(self):
+        missing = copy_game(final_game(), '2018/04/06/missing-1')
+        missing['game_data_directory'] += '_missing'
+        writer = RecordingWriter(fail_on='2018/04/06/unwritable-1')
+
+        with pipeline.GamePipeline(writer) as game_pipeline:
+            game_pipeline.submit(missing)
+            game_pipeline.submit(copy_game(final_game(), '2018/04/06/unwritable-1'))
+            game_pipeline.submit(final_game())
+
+        summary = game_pipeline.summary
+        self.assertEqual(summary.succeeded, [GAMEDAY_ID])
+        self.assertEqual(set(summary.failed), {'2018/04/06/missing-1', '2018/04/06/unwritable-1'})
+        self.assertIn('ValueError', summary.failed['2018/04/06/missing-1'])
+        self.assertIn('database is locked', summary.failed['2018/04/06/unwritable-1'])
+
+    def test_commit_every_rows(self):
+        writer = RecordingWriter()
+        rows = pipeline.parsed_rows(pipeline.load_game(final_game()))
+
+        with pipeline.GamePipeline(writer, commit_every=10, commit_every_rows=2 * rows) as game_pipeline:
+            for i in range(5):
+                game_pipeline.submit(final_game())
+
+        self.assertEqual([len(batch) for batch in writer.batches], [2, 2, 1])
+
+    def test_bisect_failed_batch(self):
+        games = [copy_game(final_game(), '{}-{}'.format(GAMEDAY_ID, i)) for i in range(6)]
+        writer = RecordingWriter(fail_on=games[4]['id'])
+
+        with pipeline.GamePipeline(writer, commit_every=6) as game_pipeline:
+            for game in games:
+                game_pipeline.submit(game)
+
+        # The bad game is isolated; the rest of its batch is written
+        summary = game_pipeline.summary
+        self.assertEqual(list(summary.failed), [games[4]['id']])
+        self.assertEqual(sorted(summary.succeeded), sorted(g['id'] for i, g in enumerate(games) if i != 4))
+        self.assertEqual(game_pipeline.in_flight, set())
+
+    def test_workers(self):
+        games = [copy_game(final_game(), '{}-{}'.format(GAMEDAY_ID, i)) for i in range(8)]
+        games[3]['game_data_directory'] += '_missing'
+        writer = RecordingWriter()
+
+        game_pipeline = pipeline.GamePipeline(writer, n_workers=2, max_pending=3, initializer=scrape.configure_source,
+                                              initargs=(DirectorySource(DATA_DIR),))
+        with game_pipeline:
+            for game in games:
+                game_pipeline.submit(game)
+                self.assertLessEqual(game_pipeline.n_pending, 3)
+
+        summary = game_pipeline.summary
+        self.assertEqual(len(summary.succeeded), 7)
+        self.assertEqual(list(summary.failed), [games[3]['id']])
+        self.assertEqual(sorted(gameday_id for batch in writer.batches for gameday_id in batch),
+                         sorted(g['id'] for i, g in enumerate(games) if i != 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
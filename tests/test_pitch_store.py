@@ -0,0 +1,119 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+from pygameday import GameDayClient
+from pygameday import scrape
+from pygameday.pitch_store import PITCH_STORE_COLUMNS
+from pygameday.pitch_store import PitchStore
+from pygameday.pitch_store import PitchStoreWriter
+
+from gameday_server import DATA_DIR
+
+
+class TestPitchStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store_dir = os.path.join(self.tmp_dir.name, 'store')
+        database_uri = 'sqlite:///' + os.path.join(self.tmp_dir.name, 'gameday.db')
+        self.client = GameDayClient(database_uri, n_workers=1, source=DATA_DIR, pitch_store_dir=self.store_dir)
+        self.client.process_date(datetime(2018, 4, 6))
+        scrape.configure_source(None)
+
+    def tearDown(self):
+        self.client.close()
+        self.tmp_dir.cleanup()
+
+    def test_pipeline_sink(self):
+        store = PitchStore(self.store_dir)
+        self.assertEqual(len(store), 6)
+        self.assertIn('spin_rate', store.columns)
+        self.assertNotIn('zone', store.columns)
+        self.assertTrue(os.path.exists(os.path.join(self.store_dir, 'pitcher_order-6.i8')))
+
+        pitches = self.client.load_pitches(['game_id', 'pitcher_id'] + list(PITCH_STORE_COLUMNS))
+        for name in PITCH_STORE_COLUMNS:
+            np.testing.assert_array_equal(store[name], pitches[name])
+        self.assertIsInstance(store['px'], np.memmap)
+
+        game_id = int(pitches['game_id'][0])
+        self.assertEqual(store.game_ids, [game_id])
+        self.assertEqual(store.game_rows(game_id), slice(0, 6))
+
+        for pitcher_id in set(pitches['pitcher_id'].tolist()):
+            rows = store.pitcher_rows(pitcher_id)
+            np.testing.assert_array_equal(rows, np.flatnonzero(pitches['pitcher_id'] == pitcher_id))
+            selected = store.select(['px'], pitcher_id=pitcher_id)
+            np.testing.assert_array_equal(selected['px'], pitches['px'][pitches['pitcher_id'] == pitcher_id])
+
+        self.assertEqual(len(store.pitcher_rows(-2)), 0)
+
+    def test_build_from_db(self):
+        store_dir = os.path.join(self.tmp_dir.name, 'built')
+        self.assertEqual(self.client.build_pitch_store(store_dir), 1)
+        self.assertEqual(self.client.build_pitch_store(store_dir), 0)
+
+        built, kept = PitchStore(store_dir), PitchStore(self.store_dir)
+        self.assertEqual(built.game_ids, kept.game_ids)
+        for name in PITCH_STORE_COLUMNS:
+            np.testing.assert_array_equal(built[name], kept[name])
+
+    def test_one_writer(self):
+        database_uri = 'sqlite:///' + os.path.join(self.tmp_dir.name, 'other.db')
+        with self.assertRaises(RuntimeError):
+            GameDayClient(database_uri, n_workers=1, pitch_store_dir=self.store_dir)
+        with self.assertRaises(RuntimeError):
+            PitchStoreWriter(self.store_dir)
+
+        # The store can be written again once the client is closed
+        self.client.close()
+        PitchStoreWriter(self.store_dir).close()
+
+    def test_index_only_written_after_appends(self):
+        # Processing a game that is already in the store doesn't rewrite the index
+        index_path = os.path.join(self.store_dir, 'pitcher_order-6.i8')
+        os.utime(index_path, (0, 0))
+        scrape.configure_source(self.client.source)
+        try:
+            summary = self.client.process_date(datetime(2018, 4, 6))
+        finally:
+            scrape.configure_source(None)
+        self.assertEqual(list(summary.skipped), ['2018/04/06/nynmlb-wasmlb-1', '2018/04/06/phimlb-nymlb-1'])
+        self.assertEqual(os.path.getmtime(index_path), 0)
+
+        self.client.close()
+        writer = PitchStoreWriter(self.store_dir)
+        self.assertFalse(writer.write_index())
+        writer.append([10], [1], {name: [1.0] for name in PITCH_STORE_COLUMNS})
+        self.assertTrue(writer.write_index())
+        self.assertFalse(writer.write_index())
+        writer.close()
+
+    def test_append(self):
+        self.client.close()
+        writer = PitchStoreWriter(self.store_dir)
+        columns = {name: np.arange(4, dtype=np.float64) for name in PITCH_STORE_COLUMNS}
+        # The two games are interleaved; each ends up contiguous
+        self.assertEqual(writer.append([10, 11, 10, 11], [1, 2, 2, 1], columns), 2)
+        self.assertEqual(writer.append([10], [1], {name: [9.0] for name in PITCH_STORE_COLUMNS}), 0)
+
+        store = PitchStore(self.store_dir)
+        self.assertEqual(len(store), 10)
+        np.testing.assert_array_equal(store.select(['px'], game_id=10)['px'], [0, 2])
+        np.testing.assert_array_equal(store.select(['px'], game_id=11)['px'], [1, 3])
+        np.testing.assert_array_equal(store.select(['px'], game_id=11, pitcher_id=1)['px'], [3])
+
+        # Rows that no game covers, e.g. from an interrupted writer, are dropped
+        with open(os.path.join(self.store_dir, 'columns', 'px.f8'), 'ab') as f:
+            np.zeros(3).tofile(f)
+        writer.close()
+        PitchStoreWriter(self.store_dir).close()
+        self.assertEqual(os.path.getsize(os.path.join(self.store_dir, 'columns', 'px.f8')), 10 * 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import multiprocessing
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+from pygameday import scrape
+from pygameday.client import _init_worker
+from pygameday.policy import AdaptiveLimiter
+from pygameday.policy import FetchPolicy
+
+from gameday_server import GameDayServer
+
+PLAYERS_PATH = '/components/game/mlb/year_2018/month_04/day_06/gid_2018_04_06_nynmlb_wasmlb_1/players.xml'
+
+
+class TestFetchPolicy(unittest.TestCase):
+
+    def tearDown(self):
+        scrape.configure_policy(None)
+
+    def test_backoff_is_bounded(self):
+        policy = FetchPolicy(backoff_factor=1, backoff_max=10)
+        self.assertLessEqual(policy.backoff(0), 1)
+        self.assertGreaterEqual(policy.backoff(0), 0.5)
+        self.assertLessEqual(policy.backoff(20), 10)
+        self.assertEqual(policy.backoff(0, retry_after='4'), 4)
+        self.assertEqual(policy.backoff(0, retry_after='60'), 10)
+        self.assertLessEqual(policy.backoff(0, retry_after='soon'), 1)
+
+    def test_retry_server_errors(self):
+        scrape.configure_policy(FetchPolicy(max_retries=2, backoff_factor=0.01))
+        with GameDayServer() as server, mock.patch.object(scrape, 'GD_SERVER', server.address):
+            server.failures[PLAYERS_PATH] = 2
+            page = scrape.get_page(PLAYERS_PATH)
+
+        self.assertIn(b'<player', page.content)
+        self.assertEqual(len(server.requests), 3)
+
+    def test_give_up(self):
+        scrape.configure_policy(FetchPolicy(max_retries=1, backoff_factor=0.01))
+        with GameDayServer() as server, mock.patch.object(scrape, 'GD_SERVER', server.address):
+            server.failures[PLAYERS_PATH] = 5
+            self.assertIsNone(scrape.get_page(PLAYERS_PATH))
+            self.assertIsNone(scrape.get_page('/not_found.xml'))
+
+        # 404s are not retried
+        self.assertEqual(len(server.requests), 3)
+
+    def test_retry_truncated_body(self):
+        scrape.configure_policy(FetchPolicy(max_retries=1, backoff_factor=0.01))
+        limiter = scrape.get_limiter()
+        with GameDayServer() as server, mock.patch.object(scrape, 'GD_SERVER', server.address):
+            server.truncated[PLAYERS_PATH] = 1
+            page = scrape.get_page(PLAYERS_PATH)
+            self.assertIn(b'<player', page.content)
+
+            server.truncated[PLAYERS_PATH] = 5
+            self.assertIsNone(scrape.get_page(PLAYERS_PATH))
+
+        # Every slot taken is given back
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_read_timeout(self):
+        scrape.configure_policy(FetchPolicy(read_timeout=0.05, max_retries=1, backoff_factor=0.01))
+        with GameDayServer(delay=0.5) as server, mock.patch.object(scrape, 'GD_SERVER', server.address):
+            self.assertIsNone(scrape.get_page(PLAYERS_PATH))
+        self.assertEqual(len(server.requests), 2)
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+
+    def test_backs_off_and_recovers(self):
+        limiter = AdaptiveLimiter(8, FetchPolicy(latency_target=1.0, error_threshold=0.2))
+
+        for _ in range(40):
+            limiter.acquire()
+            limiter.release(False, 0.1)
+        self.assertEqual(limiter.limit, 1)
+
+        for _ in range(400):
+            limiter.acquire()
+            limiter.release(True, 0.1)
+        self.assertEqual(limiter.limit, 8)
+
+        for _ in range(40):
+            limiter.acquire()
+            limiter.release(True, 3.0)
+        self.assertLess(limiter.limit, 8)
+
+    def test_shared_across_processes(self):
+        # Workers make one request at a time, so only a limiter they share can hold them back
+        policy = FetchPolicy(latency_target=0.01)
+        limiter = AdaptiveLimiter(4, policy, context=multiprocessing.get_context())
+
+        with GameDayServer(delay=0.05) as server, mock.patch.object(scrape, 'GD_SERVER', server.address), \
+                ProcessPoolExecutor(max_workers=4, initializer=_init_worker,
+                                    initargs=(4, None, None, policy, limiter)) as executor:
+            self.assertTrue(all(executor.map(scrape.get_page, [PLAYERS_PATH] * 12)))
+            self.assertEqual(limiter.limit, 1)
+
+            server.max_in_flight = 0
+            self.assertTrue(all(executor.map(scrape.get_page, [PLAYERS_PATH] * 8)))
+            self.assertEqual(server.max_in_flight, 1)
+
+        self.assertEqual(limiter.in_flight, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+import numpy as np
+
+from pygameday import GameDayClient
+from pygameday import reader
+from pygameday import scrape
+
+from gameday_server import DATA_DIR
+
+
+class TestReader(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        database_uri = 'sqlite:///' + os.path.join(cls.tmp_dir.name, 'gameday.db')
+        cls.client = GameDayClient(database_uri, n_workers=1, source=DATA_DIR)
+        cls.client.process_date(datetime(2018, 4, 6))
+        scrape.configure_source(None)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.close()
+        cls.tmp_dir.cleanup()
+
+    def test_iter_pitches(self):
+        chunks = list(self.client.iter_pitches(chunk_size=4))
+        self.assertEqual([len(chunk['pitch_id']) for chunk in chunks], [4, 2])
+        self.assertEqual(list(chunks[0]), list(reader.PITCH_COLUMNS))
+
+        pitches = chunks[0]
+        self.assertEqual(pitches['pitch_id'].dtype, np.int64)
+        self.assertEqual(pitches['start_speed'].dtype, np.float64)
+        self.assertEqual(pitches['pitch_type'].dtype, object)
+
+    def test_missing_values(self):
+        pitches = self.client.load_pitches(['pitch_id', 'start_speed', 'zone', 'pitch_type'])
+        self.assertEqual(len(pitches['pitch_id']), 6)
+
+        # One pitch has no values at all
+        self.assertEqual(np.isnan(pitches['start_speed']).sum(), 1)
+        self.assertEqual(pitches['zone'].dtype, np.float64)
+        self.assertEqual(np.isnan(pitches['zone']).sum(), 1)
+
+    def test_filters(self):
+        pitches = self.client.load_pitches(['pitch_id', 'pitcher_id', 'px'], filters={'pitcher_id': 594798})
+        self.assertTrue(len(pitches['pitch_id']) > 0)
+        self.assertTrue((pitches['pitcher_id'] == 594798).all())
+
+        pitches = self.client.load_pitches(['pitch_type', 'gameday_id'], filters={'pitch_type': ['FF', 'SL']})
+        self.assertEqual(sorted(pitches['pitch_type']), ['FF', 'FF', 'FF', 'SL'])
+        self.assertEqual(set(pitches['gameday_id']), {'2018/04/06/nynmlb-wasmlb-1'})
+
+        pitches = self.client.load_pitches(['pitch_id'], filters={'pitcher_id': -1})
+        self.assertEqual(len(pitches['pitch_id']), 0)
+
+        with self.assertRaises(ValueError):
+            self.client.load_pitches(['no_such_column'])
+
+    def test_frames(self):
+        frame = self.client.load_pitches(['pitch_id', 'px', 'pz'], chunk_size=4, as_frame=True)
+        self.assertEqual(list(frame.columns), ['pitch_id', 'px', 'pz'])
+        self.assertEqual(len(frame), 6)
+
+        chunks = list(self.client.iter_pitches({'pitch_type': 'FF'}, columns=['px'], as_frame=True))
+        self.assertEqual(sum(len(chunk) for chunk in chunks), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import json
+import os
+import unittest
+
+from pygameday import parse
+from pygameday.scoreboard import decode_scoreboard
+
+from test_parse import GAME_DIR
+from test_parse import load_page
+
+SCOREBOARD_PATH = os.path.join(os.path.dirname(GAME_DIR), 'master_scoreboard.json')
+GAME_FIELDS = ['id', 'game_type', 'game_data_directory', 'time_date_hm_lg', 'time_zone_hm_lg', 'hm_lg_ampm', 'venue',
+               'league', 'home_name_abbrev', 'home_team_city', 'home_team_name', 'away_name_abbrev', 'away_team_city',
+               'away_team_name']
+
+
+class TestScoreboard(unittest.TestCase):
+
+    def setUp(self):
+        with open(SCOREBOARD_PATH, 'rb') as f:
+            self.content = f.read()
+
+    def test_decode_scoreboard(self):
+        decoded = decode_scoreboard(self.content)['data']['games']['game']
+        expected = json.loads(self.content)['data']['games']['game']
+        self.assertEqual(len(decoded), len(expected))
+
+        for game, expected_game in zip(decoded, expected):
+            for field in GAME_FIELDS:
+                self.assertEqual(game.get(field), expected_game.get(field))
+            self.assertEqual(game['status']['status'], expected_game['status']['status'])
+            if 'linescore' in expected_game:
+                runs, expected_runs = game['linescore']['r'], expected_game['linescore']['r']
+                self.assertEqual((runs['home'], runs['away']), (expected_runs['home'], expected_runs['away']))
+
+        # Fields that aren't read are skipped, and missing ones stay missing
+        self.assertNotIn('game_media', decoded[0])
+        self.assertNotIn('linescore', decoded[1])
+
+    def test_single_game(self):
+        scoreboard = json.loads(self.content)
+        scoreboard['data']['games']['game'] = scoreboard['data']['games']['game'][0]
+        decoded = decode_scoreboard(json.dumps(scoreboard).encode())
+        self.assertEqual(decoded['data']['games']['game']['id'], scoreboard['data']['games']['game']['id'])
+
+        scoreboard['data']['games'] = {}
+        self.assertEqual(decode_scoreboard(json.dumps(scoreboard).encode()), {'data': {'games': {}}})
+
+    def test_unexpected_types(self):
+        # A scoreboard that doesn't fit the structs is decoded whole
+        scoreboard = json.loads(self.content)
+        scoreboard['data']['games']['game'][0]['linescore']['r']['home'] = 2
+        self.assertEqual(decode_scoreboard(json.dumps(scoreboard).encode()), scoreboard)
+
+    def test_parse_decoded_game(self):
+        game = decode_scoreboard(self.content)['data']['games']['game'][0]
+        expected_game = json.loads(self.content)['data']['games']['game'][0]
+        pages = [load_page('inning', 'inning_hit.xml'), load_page('players.xml'), load_page('inning', 'inning_all.xml')]
+        self.assertEqual(parse.parse_game_records(game, *pages), parse.parse_game_records(expected_game, *pages))
+
+
+if __name__ == '__main__':
+    unittest.main()
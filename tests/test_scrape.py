@@ -18,6 +18,18 @@ class TestScraping(unittest.TestCase):
             json.dump(sb, f)
         pprint(sb)
 
+    def test_session_is_reused(self):
+        scrape.configure_session(pool_maxsize=2)
+        session = scrape.get_session()
+        self.assertIs(session, scrape.get_session())
+        self.assertEqual(session.get_adapter('http://gd2.mlb.com')._pool_maxsize, 2)
+        self.assertIn('gzip', session.headers['Accept-Encoding'])
+
+    def test_session_is_recreated_in_child_process(self):
+        session = scrape.get_session()
+        scrape._session_pid = -1  # Pretend the session was created by a parent process
+        self.assertIsNot(session, scrape.get_session())
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,99 @@
+import os
+import pickle
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from datetime import datetime
+from unittest import mock
+
+from pygameday import mirror
+from pygameday import scrape
+from pygameday.sources import ArchiveSource
+from pygameday.sources import DirectorySource
+from pygameday.sources import HttpSource
+from pygameday.sources import open_source
+
+from gameday_server import DATA_DIR
+from gameday_server import GameDayServer
+
+GAME_DIR = '/components/game/mlb/year_2018/month_04/day_06/gid_2018_04_06_nynmlb_wasmlb_1'
+
+
+class TestPageSources(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        scrape.configure_source(None)
+        self.tmp_dir.cleanup()
+
+    def check_source(self, source):
+        scrape.configure_source(source)
+        scoreboard = scrape.fetch_master_scoreboard(datetime(2018, 4, 6))
+        self.assertEqual(len(scoreboard['data']['games']['game']), 2)
+        self.assertIn(b'<hitchart>', scrape.fetch_hit_chart(GAME_DIR).content)
+        self.assertIsNone(scrape.fetch_master_scoreboard(datetime(2018, 4, 7)))
+
+    def test_directory_source(self):
+        self.check_source(DirectorySource(DATA_DIR))
+
+    def test_tar_source(self):
+        for extension, mode in (('tar', 'w'), ('tar.gz', 'w:gz'), ('tar.bz2', 'w:bz2'), ('tar.xz', 'w:xz')):
+            with self.subTest(extension):
+                archive_path = os.path.join(self.tmp_dir.name, 'mirror.' + extension)
+                with tarfile.open(archive_path, mode) as archive:
+                    archive.add(os.path.join(DATA_DIR, 'components'), arcname='season_2018/components')
+
+                source = open_source(archive_path)
+                self.assertIsInstance(source, ArchiveSource)
+
+                # A compressed tar is decompressed once; copies for workers read the same uncompressed file
+                tar_path = source._tar_path
+                self.assertEqual(tar_path == archive_path, mode == 'w')
+                copy = pickle.loads(pickle.dumps(source))
+                self.assertEqual(copy._tar_path, tar_path)
+                self.check_source(copy)
+                copy.close()
+                self.assertTrue(os.path.exists(tar_path))
+
+                source.close()
+                self.assertEqual(os.path.exists(tar_path), mode == 'w')
+
+    def test_zip_source(self):
+        archive_path = os.path.join(self.tmp_dir.name, 'mirror.zip')
+        with zipfile.ZipFile(archive_path, 'w') as archive:
+            for root, _, files in os.walk(DATA_DIR):
+                for name in files:
+                    path = os.path.join(root, name)
+                    archive.write(path, os.path.relpath(path, DATA_DIR))
+
+        self.check_source(ArchiveSource(archive_path))
+
+    def test_http_source(self):
+        with GameDayServer() as server:
+            self.check_source(open_source('http://' + server.address))
+        self.assertIsInstance(open_source('http://' + server.address), HttpSource)
+
+    def test_mirror(self):
+        mirror_dir = os.path.join(self.tmp_dir.name, 'mirror')
+        with GameDayServer() as server, mock.patch.object(scrape, 'GD_SERVER', server.address):
+            n_written = mirror.mirror_date_range(datetime(2018, 4, 6), datetime(2018, 4, 7), mirror_dir)
+            n_requests = len(server.requests)
+            mirror.mirror_date_range(datetime(2018, 4, 6), datetime(2018, 4, 6), mirror_dir)
+
+        # One scoreboard plus three pages of the Final game; pages already mirrored aren't fetched again
+        self.assertEqual(n_written, 4)
+        self.assertEqual(len(server.requests), n_requests + 1)
+
+        relative_path = GAME_DIR.strip('/') + '/inning/inning_all.xml'
+        with open(os.path.join(mirror_dir, relative_path), 'rb') as f, \
+                open(os.path.join(DATA_DIR, relative_path), 'rb') as g:
+            self.assertEqual(f.read(), g.read())
+
+        self.check_source(DirectorySource(mirror_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()